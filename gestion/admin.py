@@ -1,35 +1,167 @@
-from django.contrib import admin
-from django.contrib.auth.hashers import make_password
-from .models import Estudiante, Asignatura, Calificacion, Horario
+import csv
+
+from django.contrib import admin, messages
+from django.contrib.auth.hashers import identify_hasher
+from django.db import IntegrityError
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from .forms import ImportarCalificacionesForm
+from .hashers import hashear_clave
+from .horarios import detectar_conflictos, franjas
+from .importacion import ReporteImportacion, importar_calificaciones, leer_archivo
+from .models import MENSAJE_CUPO, Estudiante, Asignatura, Calificacion, Horario, Inscripcion, viola_cupo
 
 
 @admin.register(Estudiante)
 class EstudianteAdmin(admin.ModelAdmin):
-    list_display = ("matricula", "apellido", "nombre", "carrera", "correo")
+    list_display = ("matricula", "apellido", "nombre", "carrera", "correo", "promedio", "creditos_totales")
     search_fields = ("matricula", "nombre", "apellido", "correo", "carrera")
+    list_select_related = ("resumen",)
+
+    # Columnas leídas de ResumenEstudiante (una fila por estudiante, sin agregar)
+    @admin.display(description="Promedio", ordering="resumen__promedio")
+    def promedio(self, obj):
+        resumen = getattr(obj, "resumen", None)
+        return resumen.promedio if resumen else None
+
+    @admin.display(description="Créditos", ordering="resumen__creditos_totales")
+    def creditos_totales(self, obj):
+        resumen = getattr(obj, "resumen", None)
+        return resumen.creditos_totales if resumen else 0
 
     def save_model(self, request, obj, form, change):
-        # Si se edita la clave y no parece hasheada, la hasheamos automáticamente.
-        if obj.clave and not obj.clave.startswith(('pbkdf2_', 'argon2$', 'bcrypt$', 'scrypt$')):
-            obj.clave = make_password(obj.clave)
+        # Si se edita la clave y no es un hash reconocido, la hasheamos con la política vigente.
+        if obj.clave:
+            try:
+                identify_hasher(obj.clave)
+            except ValueError:
+                obj.clave = hashear_clave(obj.clave)
         super().save_model(request, obj, form, change)
 
 
 @admin.register(Asignatura)
 class AsignaturaAdmin(admin.ModelAdmin):
-    list_display = ("codigo", "nombre", "creditos", "profesor")
+    list_display = ("codigo", "nombre", "creditos", "profesor", "inscritos", "cupo")
+    readonly_fields = ("inscritos",)
     search_fields = ("codigo", "nombre", "profesor")
 
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        # Asignatura.clean valida el cupo; si se inscriben estudiantes entre la
+        # validación y el guardado, la restricción de la tabla lo rechaza
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except IntegrityError as e:
+            if not viola_cupo(e):
+                raise
+            messages.error(request, MENSAJE_CUPO)
+            return redirect(request.path)
+
 
 @admin.register(Calificacion)
 class CalificacionAdmin(admin.ModelAdmin):
     list_display = ("estudiante", "asignatura", "nota")
     search_fields = ("estudiante__nombre", "estudiante__apellido", "asignatura__nombre", "asignatura__codigo")
+    change_list_template = "admin/gestion/calificacion/change_list.html"
+
+    def get_urls(self):
+        urls = [
+            path(
+                "importar/",
+                self.admin_site.admin_view(self.importar_view),
+                name="gestion_calificacion_importar",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def importar_view(self, request):
+        """Carga masiva de calificaciones desde un archivo CSV o XLSX"""
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            messages.error(request, "No tienes permiso para importar calificaciones.")
+            return redirect("admin:gestion_calificacion_changelist")
+
+        reporte = None
+        if request.method == "POST":
+            form = ImportarCalificacionesForm(request.POST, request.FILES)
+            if form.is_valid():
+                archivo = form.cleaned_data["archivo"]
+                parcial = ReporteImportacion()
+                try:
+                    reporte = importar_calificaciones(leer_archivo(archivo.file, archivo.name), reporte=parcial)
+                except (ValueError, csv.Error) as e:
+                    # Los lotes anteriores al error ya quedaron guardados
+                    messages.error(
+                        request,
+                        f"No se pudo leer el archivo: {e}. Calificaciones importadas antes del error: "
+                        f"{parcial.importadas}.",
+                    )
+                else:
+                    nivel = messages.WARNING if reporte.errores else messages.SUCCESS
+                    messages.add_message(
+                        request, nivel,
+                        f"{reporte.importadas} calificaciones importadas de {reporte.procesadas} filas "
+                        f"({len(reporte.errores)} con errores).",
+                    )
+        else:
+            form = ImportarCalificacionesForm()
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Importar calificaciones",
+            "form": form,
+            "reporte": reporte,
+        }
+        return TemplateResponse(request, "admin/gestion/calificacion/importar.html", context)
+
+
+@admin.register(Inscripcion)
+class InscripcionAdmin(admin.ModelAdmin):
+    list_display = ("estudiante", "asignatura", "fecha")
+    search_fields = ("estudiante__matricula", "estudiante__apellido", "asignatura__codigo", "asignatura__nombre")
+    list_select_related = ("estudiante", "asignatura")
+
+    # Las altas ocupan cupo: se hacen con gestion.inscripciones (vista del
+    # estudiante o comando inscribir_cohorte). Las bajas liberan el lugar en una señal.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Horario)
 class HorarioAdmin(admin.ModelAdmin):
-    list_display = ("asignatura", "dia", "hora", "aula")
+    list_display = ("asignatura", "dia", "hora", "fin", "aula")
     list_filter = ("dia",)
+    list_select_related = ("asignatura",)
+    actions = ["detectar_choques"]
+    # Choques que se listan en el mensaje de la acción
+    MAXIMO_MOSTRADOS = 10
+
+    @admin.display(description="Fin")
+    def fin(self, obj):
+        return obj.fin
+
+    @admin.action(description="Detectar choques de aula de los horarios seleccionados")
+    def detectar_choques(self, request, queryset):
+        # Se comparan con todos los horarios de sus días, no solo con los seleccionados
+        seleccionados = set(queryset.values_list("pk", flat=True))
+        dias = set(queryset.values_list("dia", flat=True))
+        conflictos = [
+            c for c in detectar_conflictos(franjas(Horario.objects.filter(dia__in=dias)))
+            if c.primero.id in seleccionados or c.segundo.id in seleccionados
+        ]
+        if not conflictos:
+            self.message_user(request, "Sin choques de aula.", messages.SUCCESS)
+            return
+        for conflicto in conflictos[:self.MAXIMO_MOSTRADOS]:
+            self.message_user(request, str(conflicto), messages.WARNING)
+        if len(conflictos) > self.MAXIMO_MOSTRADOS:
+            self.message_user(
+                request,
+                f"{len(conflictos)} choques en total; el listado completo con `manage.py detectar_conflictos`.",
+                messages.WARNING,
+            )
 
 
@@ -0,0 +1,199 @@
+"""API JSON de solo lectura: calificaciones y horario semanal del estudiante, catálogo de asignaturas y horarios.
+
+Las filas se leen con ``values()`` y se serializan tal cual, sin instanciar
+modelos. Parámetros de las listas:
+
+- ``campos=codigo,nombre``: subconjunto de columnas (por defecto, todas).
+- ``ids=1,2,3``: lote de registros por id (hasta ``MAXIMO_IDS``), sin paginar;
+  los ids inexistentes se devuelven en ``faltantes``.
+- ``cursor`` y ``limite``: paginación por cursor (``KeysetPaginator``); la
+  respuesta trae ``siguiente`` y ``anterior``.
+
+Los parámetros inválidos responden 400 con ``{"error": ...}``.
+"""
+from decimal import Decimal
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+
+from .condicional import etag_asignaturas, etag_notas, modificacion_notas
+from .horarios import horario_semanal
+from .models import Asignatura, Calificacion, Horario, ResumenEstudiante
+from .paginacion import KeysetPaginator
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+MAXIMO_IDS = 100
+
+# Nombre público -> campo de values()
+CAMPOS_CALIFICACION = {
+    'id': 'id',
+    'asignatura_id': 'asignatura_id',
+    'codigo': 'asignatura__codigo',
+    'asignatura': 'asignatura__nombre',
+    'creditos': 'asignatura__creditos',
+    'nota': 'nota',
+    'actualizado': 'actualizado',
+}
+CAMPOS_ASIGNATURA = {
+    'id': 'id',
+    'codigo': 'codigo',
+    'nombre': 'nombre',
+    'creditos': 'creditos',
+    'profesor': 'profesor',
+    'cupo': 'cupo',
+}
+CAMPOS_HORARIO = {
+    'id': 'id',
+    'asignatura_id': 'asignatura_id',
+    'codigo': 'asignatura__codigo',
+    'dia': 'dia',
+    'hora': 'hora',
+    'duracion': 'duracion',
+    'aula': 'aula',
+}
+
+
+class ParametroInvalido(ValueError):
+    pass
+
+
+class CodificadorAPI(DjangoJSONEncoder):
+    # Notas y promedios como números, igual que la exportación NDJSON
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return super().default(o)
+
+
+def _respuesta(datos, status: int = 200) -> JsonResponse:
+    return JsonResponse(datos, status=status, encoder=CodificadorAPI, json_dumps_params={'ensure_ascii': False})
+
+
+def _api(vista):
+    """Sesión de estudiante o usuario staff; errores de parámetros como 400"""
+    @wraps(vista)
+    def _wrapped_view(request, *args, **kwargs):
+        if not request.session.get('estudiante_id') and not request.user.is_staff:
+            return _respuesta({'error': 'Autenticación requerida.'}, status=401)
+        try:
+            return vista(request, *args, **kwargs)
+        except ParametroInvalido as e:
+            return _respuesta({'error': str(e)}, status=400)
+    return _wrapped_view
+
+
+def _dueno(vista):
+    """Solo el estudiante de la sesión lee sus datos; deja cargado ``request.estudiante``"""
+    @wraps(vista)
+    def _wrapped_view(request, pk, *args, **kwargs):
+        if request.session.get('estudiante_id') != pk:
+            return _respuesta({'error': 'No tienes permiso para acceder a esta información.'}, status=403)
+        if not request.estudiante:
+            return _respuesta({'error': 'El estudiante de la sesión ya no existe.'}, status=404)
+        return vista(request, pk, *args, **kwargs)
+    return _wrapped_view
+
+
+def _campos(request, disponibles: dict) -> dict:
+    pedidos = [c for c in request.GET.get('campos', '').split(',') if c]
+    if not pedidos:
+        return disponibles
+    desconocidos = [c for c in pedidos if c not in disponibles]
+    if desconocidos:
+        raise ParametroInvalido(f'Campos desconocidos: {", ".join(desconocidos)} (opciones: {", ".join(disponibles)})')
+    return {c: disponibles[c] for c in dict.fromkeys(pedidos)}
+
+
+def _ids(valor: str, nombre: str = 'ids') -> list:
+    try:
+        ids = list(dict.fromkeys(int(i) for i in valor.split(',') if i))
+    except ValueError:
+        raise ParametroInvalido(f'{nombre} debe ser una lista de enteros separados por comas')
+    if len(ids) > MAXIMO_IDS:
+        raise ParametroInvalido(f'Como máximo {MAXIMO_IDS} {nombre} por petición')
+    return ids
+
+
+def _limite(request) -> int:
+    valor = request.GET.get('limite', str(LIMITE_POR_DEFECTO))
+    if not valor.isdigit() or not 1 <= int(valor) <= LIMITE_MAXIMO:
+        raise ParametroInvalido(f'limite debe estar entre 1 y {LIMITE_MAXIMO}')
+    return int(valor)
+
+
+def _proyectar(filas, campos: dict) -> list:
+    return [{nombre: fila[campo] for nombre, campo in campos.items()} for fila in filas]
+
+
+def _listado(request, queryset, disponibles: dict, orden: list):
+    """Lote por ``ids`` o página por cursor de un queryset, proyectado a los campos pedidos"""
+    campos = _campos(request, disponibles)
+    # El cursor y el lote necesitan las columnas de orden y el id aunque no se pidan
+    columnas = list(dict.fromkeys([*campos.values(), *(c.lstrip('-') for c in orden)]))
+    if 'ids' in request.GET:
+        ids = _ids(request.GET['ids'])
+        por_id = {fila['id']: fila for fila in queryset.filter(pk__in=ids).values(*columnas)}
+        return _respuesta({
+            'resultados': _proyectar((por_id[i] for i in ids if i in por_id), campos),
+            'faltantes': [i for i in ids if i not in por_id],
+        })
+    pagina = KeysetPaginator(queryset.values(*columnas), orden, _limite(request)).get_page(request.GET.get('cursor'))
+    return _respuesta({
+        'resultados': _proyectar(pagina, campos),
+        'siguiente': pagina.next_cursor,
+        'anterior': pagina.previous_cursor,
+    })
+
+
+@require_GET
+@_api
+@_dueno
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etag_notas, last_modified_func=modificacion_notas)
+def notas(request, pk):
+    """Calificaciones y resumen del estudiante de la sesión (el equivalente de notas_estudiante)"""
+    estudiante = request.estudiante
+    campos = _campos(request, CAMPOS_CALIFICACION)
+    filas = Calificacion.objects.filter(estudiante_id=pk).order_by('asignatura__codigo').values(*campos.values())
+    try:
+        resumen = estudiante.resumen.como_dict()
+    except ResumenEstudiante.DoesNotExist:
+        resumen = None
+    return _respuesta({
+        'estudiante': {
+            'id': estudiante.pk, 'matricula': estudiante.matricula, 'nombre': estudiante.nombre,
+            'apellido': estudiante.apellido, 'carrera': estudiante.carrera,
+        },
+        'resumen': resumen,
+        'calificaciones': _proyectar(filas, campos),
+    })
+
+
+@require_GET
+@_api
+@_dueno
+def horario(request, pk):
+    """Horario semanal del estudiante de la sesión, con sus choques (el equivalente de horario_estudiante)"""
+    return _respuesta({'estudiante_id': pk, **horario_semanal(pk)})
+
+
+@require_GET
+@_api
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etag_asignaturas)
+def asignaturas(request):
+    return _listado(request, Asignatura.objects.all(), CAMPOS_ASIGNATURA, ['codigo', 'id'])
+
+
+@require_GET
+@_api
+def horarios(request):
+    """Horarios, opcionalmente de las asignaturas ``asignatura=1,2,3``"""
+    queryset = Horario.objects.all()
+    if request.GET.get('asignatura'):
+        queryset = queryset.filter(asignatura_id__in=_ids(request.GET['asignatura'], 'asignatura'))
+    return _listado(request, queryset, CAMPOS_HORARIO, ['id'])
@@ -1,8 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def reinstalar_indices_busqueda(sender, using, **kwargs):
+    # En SQLite reconstruir una tabla en una migración borra sus triggers
+    from django.db import connections
+    from .busqueda import CAMPOS_BUSQUEDA, instalar_indices
+    conexion = connections[using]
+    tablas = set(conexion.introspection.table_names())
+    if all(modelo._meta.db_table in tablas for modelo in CAMPOS_BUSQUEDA):
+        instalar_indices(conexion)
 
 
 class GestionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gestion'
 
-
+    def ready(self):
+        # Registrar señales de mantenimiento de datos derivados
+        from . import signals  # noqa: F401
+        post_migrate.connect(reinstalar_indices_busqueda, sender=self)
@@ -0,0 +1,153 @@
+"""Búsqueda de texto sobre estudiantes y asignaturas.
+
+- SQLite: tabla virtual FTS5 (tokenizador trigram) sincronizada con triggers.
+- PostgreSQL: extensión pg_trgm con índice GIN sobre los campos concatenados.
+- Otros motores o términos de menos de 3 caracteres: cadena de ``icontains``.
+
+Los resultados se anotan con ``relevancia`` (mayor es mejor).
+"""
+from functools import reduce
+import operator
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Estudiante, Asignatura
+
+# Campos indexados por modelo
+CAMPOS_BUSQUEDA = {
+    Estudiante: ('nombre', 'apellido', 'matricula', 'correo', 'carrera'),
+    Asignatura: ('codigo', 'nombre', 'profesor'),
+}
+
+# Los trigramas necesitan al menos 3 caracteres por término
+LONGITUD_MINIMA = 3
+
+
+def _tabla_fts(modelo) -> str:
+    return f'{modelo._meta.db_table}_fts'
+
+
+def _expresion_pg(modelo, tabla: str = '') -> str:
+    # Sin calificar debe coincidir exactamente con la expresión del índice GIN
+    prefijo = f'"{tabla}".' if tabla else ''
+    return '(' + " || ' ' || ".join(prefijo + campo for campo in CAMPOS_BUSQUEDA[modelo]) + ')'
+
+
+def _sql_sqlite(modelo) -> list:
+    tabla = modelo._meta.db_table
+    fts = _tabla_fts(modelo)
+    campos = CAMPOS_BUSQUEDA[modelo]
+    columnas = ', '.join(campos)
+    nuevos = ', '.join(f'new.{c}' for c in campos)
+    viejos = ', '.join(f'old.{c}' for c in campos)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columnas}, "
+        f"content='{tabla}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabla} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columnas}) VALUES (new.id, {nuevos}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabla} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columnas}) VALUES ('delete', old.id, {viejos}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columnas} ON {tabla} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columnas}) VALUES ('delete', old.id, {viejos}); "
+        f"INSERT INTO {fts}(rowid, {columnas}) VALUES (new.id, {nuevos}); END",
+    ]
+
+
+def instalar_indices(conexion=None) -> None:
+    """Crea (si faltan) los índices de búsqueda del motor actual.
+
+    Es idempotente. En SQLite las migraciones que reconstruyen una tabla
+    eliminan sus triggers, así que también se invoca tras cada migración y
+    reindexa cuando tuvo que recrearlos.
+    """
+    conexion = conexion or connection
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'sqlite':
+            for modelo in CAMPOS_BUSQUEDA:
+                fts = _tabla_fts(modelo)
+                cursor.execute(
+                    "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                    [f'{fts}_a_'],
+                )
+                completo = cursor.fetchone()[0] == 3
+                if completo:
+                    continue
+                for sentencia in _sql_sqlite(modelo):
+                    cursor.execute(sentencia)
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        elif conexion.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for modelo in CAMPOS_BUSQUEDA:
+                tabla = modelo._meta.db_table
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {tabla}_busqueda_trgm ON {tabla} '
+                    f'USING gin ({_expresion_pg(modelo)} gin_trgm_ops)'
+                )
+
+
+def eliminar_indices(conexion=None) -> None:
+    conexion = conexion or connection
+    with conexion.cursor() as cursor:
+        for modelo in CAMPOS_BUSQUEDA:
+            if conexion.vendor == 'sqlite':
+                fts = _tabla_fts(modelo)
+                for sufijo in ('ai', 'ad', 'au'):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {fts}_{sufijo}')
+                cursor.execute(f'DROP TABLE IF EXISTS {fts}')
+            elif conexion.vendor == 'postgresql':
+                cursor.execute(f'DROP INDEX IF EXISTS {modelo._meta.db_table}_busqueda_trgm')
+
+
+def busqueda_clasica(queryset, texto: str):
+    """Cadena de icontains sobre todos los campos (sin índice)"""
+    condicion = reduce(
+        operator.or_,
+        (Q(**{f'{campo}__icontains': texto}) for campo in CAMPOS_BUSQUEDA[queryset.model]),
+    )
+    return queryset.filter(condicion).annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+
+def _escapar_like(texto: str) -> str:
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def buscar(queryset, texto: str):
+    """Filtra el queryset por el texto y lo ordena por relevancia.
+
+    Cada palabra debe aparecer en alguno de los campos indexados.
+    """
+    texto = texto.strip()
+    palabras = texto.split()
+    modelo = queryset.model
+    if not palabras:
+        return queryset
+    if any(len(p) < LONGITUD_MINIMA for p in palabras) or connection.vendor not in ('sqlite', 'postgresql'):
+        return busqueda_clasica(queryset, texto).order_by(*modelo._meta.ordering)
+
+    tabla = modelo._meta.db_table
+    if connection.vendor == 'sqlite':
+        fts = _tabla_fts(modelo)
+        consulta = ' '.join('"' + p.replace('"', '""') + '"' for p in palabras)
+        # Se une la tabla FTS con extra() para que SQLite resuelva el MATCH
+        # una sola vez; una subconsulta correlacionada lo repetiría por fila.
+        # La relevancia es una anotación para poder filtrar por ella.
+        queryset = queryset.extra(
+            tables=[fts],
+            where=[f'{fts}.rowid = {tabla}.id', f'{fts} MATCH %s'],
+            params=[consulta],
+        ).annotate(relevancia=RawSQL(f'-{fts}.rank', [], output_field=FloatField()))
+    else:
+        condicion = ' AND '.join([f'{_expresion_pg(modelo)} ILIKE %s'] * len(palabras))
+        queryset = queryset.filter(
+            pk__in=RawSQL(
+                f'SELECT id FROM {tabla} WHERE {condicion}',
+                [f'%{_escapar_like(p)}%' for p in palabras],
+            )
+        ).annotate(
+            relevancia=RawSQL(
+                f'word_similarity(%s, {_expresion_pg(modelo, tabla)})', [texto], output_field=FloatField()
+            )
+        )
+    return queryset.order_by('-relevancia', *modelo._meta.ordering)
@@ -0,0 +1,85 @@
+"""Utilidades de cache con versiones por espacio de nombres.
+
+En lugar de borrar claves dispersas, cada escritura incrementa la versión de
+su espacio (por ejemplo ``estadisticas``). Las entradas guardan la versión con
+la que se calcularon y se consideran vencidas cuando no coincide.
+
+Una versión perdida (expulsada por la cache o tras ``clear()``) no reinicia en
+1: volvería a valores ya usados, y las entradas y ETags calculados con ellos
+parecerían vigentes. Se siembra con la hora en nanosegundos, mayor que
+cualquier versión anterior.
+"""
+import time
+
+from django.core.cache import caches
+
+from .metricas import registrar_cache
+
+# Tiempo extra que una entrada vencida se conserva para servirse mientras otro
+# proceso la recalcula.
+GRACIA_OBSOLETA = 3600
+# Duración máxima del candado de recálculo
+TIMEOUT_CANDADO = 30
+
+
+def _clave_version(espacio: str) -> str:
+    return f'version:{espacio}'
+
+
+def obtener_version(espacio: str, alias: str = 'default') -> int:
+    cache = caches[alias]
+    version = cache.get(_clave_version(espacio))
+    if version is None:
+        semilla = time.time_ns()
+        cache.add(_clave_version(espacio), semilla, None)
+        version = cache.get(_clave_version(espacio), semilla)
+    return version
+
+
+def incrementar_version(espacio: str, alias: str = 'default') -> int:
+    """Invalida todas las entradas del espacio incrementando su versión"""
+    cache = caches[alias]
+    clave = _clave_version(espacio)
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        # La clave no existía (primer uso o expulsada de la cache)
+        cache.add(clave, time.time_ns(), None)
+        return cache.incr(clave)
+
+
+def obtener_o_calcular(espacio: str, clave: str, calcular, timeout: int = 300, alias: str = 'default'):
+    """Devuelve el valor cacheado o lo recalcula con protección contra estampidas.
+
+    Cuando la entrada venció (por tiempo o por cambio de versión) solo el
+    proceso que obtiene el candado la recalcula; los demás sirven el valor
+    obsoleto hasta que el nuevo esté disponible.
+    """
+    cache = caches[alias]
+    version = obtener_version(espacio, alias)
+    clave_cache = f'{espacio}:{clave}'
+    entrada = cache.get(clave_cache)
+
+    if entrada is not None:
+        version_entrada, expira_en, valor = entrada
+        if version_entrada == version and expira_en > time.time():
+            registrar_cache(True)
+            return valor
+        clave_candado = f'{clave_cache}:candado'
+        if not cache.add(clave_candado, 1, TIMEOUT_CANDADO):
+            # Otro proceso está recalculando: servir el valor obsoleto
+            registrar_cache(True)
+            return valor
+        registrar_cache(False)
+        try:
+            return _guardar(cache, clave_cache, version, calcular(), timeout)
+        finally:
+            cache.delete(clave_candado)
+
+    registrar_cache(False)
+    return _guardar(cache, clave_cache, version, calcular(), timeout)
+
+
+def _guardar(cache, clave_cache: str, version: int, valor, timeout: int):
+    cache.set(clave_cache, (version, time.time() + timeout, valor), timeout + GRACIA_OBSOLETA)
+    return valor
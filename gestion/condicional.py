@@ -0,0 +1,82 @@
+"""Respuestas condicionales (ETag / Last-Modified) de las páginas que más se recargan.
+
+Estas funciones se pasan a ``django.views.decorators.http.condition``: corren
+antes de la vista y, si el navegador ya tiene la versión vigente, la respuesta
+es un 304 sin agregaciones ni render.
+
+- Notas: fecha del último cambio del estudiante (``services.ultima_modificacion_notas``),
+  que llega en la misma consulta que carga su identidad.
+- Listas y exportaciones: versiones de cache de sus espacios, que incrementan
+  las señales y las escrituras masivas. Los borrados no dejan fecha, así que
+  estas respuestas solo llevan ETag.
+
+Las etiquetas incluyen la cookie CSRF, porque las páginas llevan formularios
+con el token, y no se emiten con mensajes pendientes: un 304 los dejaría sin
+mostrar.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+
+from .cache_utils import obtener_version
+from .services import (
+    CACHE_ESTADISTICAS, ESPACIO_ASIGNATURAS, ESPACIO_ESTADISTICAS, ESPACIO_ESTUDIANTES,
+    ultima_modificacion_notas, version_notas,
+)
+
+
+def _condicional(request) -> bool:
+    return not messages.get_messages(request)
+
+
+def _etiqueta(request, *partes):
+    if not _condicional(request):
+        return None
+    partes = (*partes, request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    return hashlib.sha256(':'.join(map(str, partes)).encode()).hexdigest()[:32]
+
+
+def version_de_notas(request):
+    """``services.version_notas`` del estudiante de la sesión, memoizada en la petición"""
+    if not hasattr(request, '_version_notas'):
+        request._version_notas = version_notas(request.estudiante)
+    return request._version_notas
+
+
+def precargar_version_notas(vista):
+    """Para vistas async: lee la versión (una consulta a la cache) en un hilo, antes de ``condition``.
+
+    ``condition`` llama a las funciones de ETag de forma síncrona, dentro del
+    event loop; con la versión ya memoizada no bloquean.
+    """
+    @wraps(vista)
+    async def _wrapped_async_view(request, *args, **kwargs):
+        await sync_to_async(version_de_notas)(request)
+        return await vista(request, *args, **kwargs)
+    return _wrapped_async_view
+
+
+def etag_notas(request, pk):
+    # El decorador de dueño ya cargó al estudiante: no hay consultas aquí
+    version = version_de_notas(request)
+    return _etiqueta(request, 'notas', pk, version) if version else None
+
+
+def modificacion_notas(request, pk):
+    return ultima_modificacion_notas(request.estudiante) if _condicional(request) else None
+
+
+def etag_estudiantes(request):
+    return _etiqueta(request, 'estudiantes', obtener_version(ESPACIO_ESTUDIANTES, CACHE_ESTADISTICAS))
+
+
+def etag_asignaturas(request):
+    return _etiqueta(request, 'asignaturas', obtener_version(ESPACIO_ASIGNATURAS, CACHE_ESTADISTICAS))
+
+
+def etag_exportacion(request):
+    # Cualquier escritura de estudiantes, asignaturas o calificaciones
+    return _etiqueta(request, 'exportacion', obtener_version(ESPACIO_ESTADISTICAS, CACHE_ESTADISTICAS))
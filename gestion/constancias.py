@@ -0,0 +1,173 @@
+"""Constancias de calificaciones en PDF con caché en disco.
+
+Cada archivo se nombra con una huella (SHA-256) del contenido de la
+constancia: datos del estudiante y sus calificaciones. Si nada cambió, la
+huella coincide y el PDF se sirve desde disco; cualquier cambio en una
+calificación produce otra huella y el archivo anterior se descarta al
+generar el nuevo. No hace falta invalidar por señales.
+
+La generación corre en un ``ThreadPoolExecutor`` fuera del ciclo de la
+petición; la vista responde 202 mientras el archivo no está listo.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from decimal import Decimal
+from itertools import groupby
+from pathlib import Path
+
+from django.conf import settings
+
+from .models import Estudiante, Calificacion
+from .pdf import ALTO_CARTA, DocumentoPDF
+from .services import NOTA_APROBATORIA, DOS_DECIMALES
+
+logger = logging.getLogger(__name__)
+
+# Cambiar al modificar el diseño para descartar los PDF ya generados
+VERSION_FORMATO = 1
+
+CAMPOS_ESTUDIANTE = ('id', 'matricula', 'nombre', 'apellido', 'carrera')
+CAMPOS_CALIFICACION = ('asignatura__codigo', 'asignatura__nombre', 'asignatura__creditos', 'nota')
+
+_pool = None
+_pendientes = {}  # ruta -> Future
+_candado = threading.Lock()
+
+
+def _datos(estudiante: dict, calificaciones) -> dict:
+    return {
+        **estudiante,
+        'calificaciones': [[codigo, nombre, creditos, str(nota)] for codigo, nombre, creditos, nota in calificaciones],
+    }
+
+
+def datos_constancia(estudiante: Estudiante) -> dict:
+    """Contenido de la constancia como tipos simples (serializable y hasheable)"""
+    calificaciones = Calificacion.objects.filter(estudiante=estudiante).order_by('asignatura__codigo')
+    return _datos(
+        {campo: getattr(estudiante, campo) for campo in CAMPOS_ESTUDIANTE},
+        calificaciones.values_list(*CAMPOS_CALIFICACION),
+    )
+
+
+def datos_cohorte(carrera: str):
+    """Itera los datos de constancia de todos los estudiantes de una carrera con dos consultas"""
+    estudiantes = Estudiante.objects.filter(carrera=carrera).order_by('pk').values(*CAMPOS_ESTUDIANTE)
+    calificaciones = groupby(
+        Calificacion.objects.filter(estudiante__carrera=carrera)
+        .order_by('estudiante_id', 'asignatura__codigo')
+        .values_list('estudiante_id', *CAMPOS_CALIFICACION)
+        .iterator(chunk_size=2000),
+        key=lambda fila: fila[0],
+    )
+    pendiente = next(calificaciones, None)
+    for estudiante in estudiantes.iterator(chunk_size=2000):
+        filas = []
+        if pendiente is not None and pendiente[0] == estudiante['id']:
+            filas = [fila[1:] for fila in pendiente[1]]
+            pendiente = next(calificaciones, None)
+        yield _datos(estudiante, filas)
+
+
+def huella(datos: dict) -> str:
+    contenido = json.dumps([VERSION_FORMATO, datos], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode()).hexdigest()[:32]
+
+
+def ruta_constancia(datos: dict) -> Path:
+    return Path(settings.CONSTANCIAS_DIR) / f'{datos["id"]}-{huella(datos)}.pdf'
+
+
+def renderizar_constancia(datos: dict) -> bytes:
+    documento = DocumentoPDF(f'Constancia de calificaciones - {datos["matricula"]}')
+    izquierda, derecha = 50, 562
+    columnas = (izquierda, 120, 380, 450, 500)
+
+    def encabezado():
+        documento.nueva_pagina()
+        documento.texto(izquierda, ALTO_CARTA - 60, 'Constancia de calificaciones', 18, negrita=True)
+        documento.texto(izquierda, ALTO_CARTA - 85, f'{datos["nombre"]} {datos["apellido"]}', 12, negrita=True)
+        documento.texto(izquierda, ALTO_CARTA - 102, f'Matrícula: {datos["matricula"]}    Carrera: {datos["carrera"]}')
+        y = ALTO_CARTA - 135
+        for x, titulo in zip(columnas, ('Código', 'Asignatura', 'Créditos', 'Nota', 'Estado')):
+            documento.texto(x, y, titulo, negrita=True)
+        documento.linea(izquierda, y - 5, derecha, y - 5)
+        return y - 20
+
+    y = encabezado()
+    total = aprobadas = creditos = 0
+    suma = suma_ponderada = Decimal(0)
+    for codigo, nombre, creditos_asignatura, nota in datos['calificaciones']:
+        if y < 90:
+            y = encabezado()
+        nota = Decimal(nota)
+        aprobada = nota >= NOTA_APROBATORIA
+        for x, valor in zip(columnas, (codigo, nombre[:45], creditos_asignatura, nota, 'Aprobada' if aprobada else 'Reprobada')):
+            documento.texto(x, y, valor)
+        y -= 16
+        total += 1
+        aprobadas += aprobada
+        creditos += creditos_asignatura
+        suma += nota
+        suma_ponderada += nota * creditos_asignatura
+
+    if y < 110:
+        y = encabezado()
+    documento.linea(izquierda, y + 8, derecha, y + 8)
+    promedio = f'{(suma / total).quantize(DOS_DECIMALES)}' if total else '-'
+    ponderado = f'{(suma_ponderada / creditos).quantize(DOS_DECIMALES)}' if creditos else '-'
+    documento.texto(izquierda, y - 10, f'Promedio: {promedio}    Ponderado: {ponderado}    Créditos: {creditos}', negrita=True)
+    documento.texto(izquierda, y - 26, f'Asignaturas: {total}    Aprobadas: {aprobadas}    Reprobadas: {total - aprobadas}')
+    return documento.como_bytes()
+
+
+def escribir_constancia(datos: dict, ruta) -> str:
+    """Genera el PDF en ``ruta`` (escritura atómica) y borra versiones anteriores del estudiante"""
+    ruta = Path(ruta)
+    if not ruta.exists():
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        contenido = renderizar_constancia(datos)
+        descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+        logger.debug(f'Constancia generada: {ruta.name}')
+    for anterior in ruta.parent.glob(f'{datos["id"]}-*.pdf'):
+        if anterior != ruta:
+            anterior.unlink(missing_ok=True)
+    return str(ruta)
+
+
+def _obtener_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(settings.CONSTANCIAS_TRABAJADORES, thread_name_prefix='constancias')
+    return _pool
+
+
+def solicitar_constancia(estudiante: Estudiante, espera: float = 0):
+    """Devuelve la ruta del PDF si está listo; si no, encola su generación y devuelve None.
+
+    ``espera`` permite aguardar unos instantes a que termine, para no obligar
+    a un segundo pedido cuando la constancia es pequeña.
+    """
+    datos = datos_constancia(estudiante)
+    ruta = ruta_constancia(datos)
+    if ruta.exists():
+        return ruta
+    with _candado:
+        futuro = _pendientes.get(ruta)
+        if futuro is None:
+            futuro = _obtener_pool().submit(escribir_constancia, datos, ruta)
+            _pendientes[ruta] = futuro
+            futuro.add_done_callback(lambda f: _pendientes.pop(ruta, None))
+    try:
+        futuro.result(timeout=espera)
+    except TimeoutError:
+        return None
+    return ruta
@@ -1,7 +1,16 @@
+import logging
+import math
 from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import Http404
 from django.shortcuts import redirect
 from django.contrib import messages
 
+from .limites import identificador, liberar, reservar
+
+logger = logging.getLogger(__name__)
+
 
 def admin_required(view_func):
     """Decorador que requiere que el usuario sea admin (autenticado en Django admin)"""
@@ -27,16 +36,100 @@ def estudiante_required(view_func):
 
 
 def estudiante_owner_required(view_func):
-    """Decorador que requiere que el estudiante autenticado sea el dueño del recurso"""
-    @wraps(view_func)
-    def _wrapped_view(request, pk, *args, **kwargs):
-        estudiante_id = request.session.get('estudiante_id')
+    """Decorador que requiere que el estudiante autenticado sea el dueño del recurso (vistas sync o async).
+
+    Deja cargado ``request.estudiante`` (ver ``gestion.identidad``) para que la vista no lo vuelva a buscar.
+    """
+    def _rechazar(request, estudiante_id, pk):
         if not estudiante_id:
             messages.error(request, 'Debes iniciar sesión como estudiante.')
             return redirect('dashboard')
         if estudiante_id != pk:
             messages.error(request, 'No tienes permiso para acceder a esta información.')
             return redirect('notas_estudiante', pk=estudiante_id)
+        return None
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _wrapped_async_view(request, pk, *args, **kwargs):
+            # aget carga la sesión sin bloquear; después la sesión queda en memoria
+            rechazo = _rechazar(request, await request.session.aget('estudiante_id'), pk)
+            if rechazo is not None:
+                return rechazo
+            if await request.aestudiante() is None:
+                raise Http404('El estudiante de la sesión ya no existe.')
+            return await view_func(request, pk, *args, **kwargs)
+        return _wrapped_async_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, pk, *args, **kwargs):
+        rechazo = _rechazar(request, request.session.get('estudiante_id'), pk)
+        if rechazo is not None:
+            return rechazo
+        if not request.estudiante:
+            raise Http404('El estudiante de la sesión ya no existe.')
         return view_func(request, pk, *args, **kwargs)
     return _wrapped_view
 
+
+def limitar(nombre, por=('ip',), destino='dashboard', metodos=('POST',)):
+    """Decorador que limita los intentos fallidos por cliente (ver ``gestion.limites``).
+
+    ``nombre`` indexa ``settings.LIMITES_PETICIONES`` (máximo y ventana en
+    segundos) y ``por`` elige la identidad: ``ip``, ``matricula``,
+    ``estudiante`` o una combinación. Al alcanzar el límite redirige a
+    ``destino`` (con los argumentos de la URL) sin ejecutar la vista. Cada
+    petición reserva un intento antes de la vista y lo conserva solo si la
+    vista marca ``request.intento_fallido``.
+    """
+    def verificar(request):
+        """(reserva o None, permitido, segundos de espera)"""
+        if not settings.LIMITES_ACTIVOS or request.method not in metodos:
+            return None, True, 0
+        ident = identificador(request, por)
+        if ident is None:
+            return None, True, 0
+        reserva, espera = reservar(nombre, ident)
+        if reserva is None:
+            logger.warning(f'Límite {nombre} excedido para {ident}')
+            return None, False, espera
+        return reserva, True, 0
+
+    def cerrar(request, reserva):
+        # Solo los fallos conservan el intento reservado
+        if reserva is not None and not getattr(request, 'intento_fallido', False):
+            liberar(reserva)
+
+    def rechazar(request, espera, args, kwargs):
+        messages.error(
+            request,
+            f'Demasiados intentos. Por favor, intenta nuevamente en {math.ceil(espera / 60)} minutos.'
+        )
+        response = redirect(destino, *args, **kwargs)
+        response['Retry-After'] = str(espera)
+        return response
+
+    def decorador(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_async_view(request, *args, **kwargs):
+                reserva, permitido, espera = await sync_to_async(verificar)(request)
+                if not permitido:
+                    return rechazar(request, espera, args, kwargs)
+                try:
+                    return await view_func(request, *args, **kwargs)
+                finally:
+                    await sync_to_async(cerrar)(request, reserva)
+            return _wrapped_async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            reserva, permitido, espera = verificar(request)
+            if not permitido:
+                return rechazar(request, espera, args, kwargs)
+            try:
+                return view_func(request, *args, **kwargs)
+            finally:
+                cerrar(request, reserva)
+        return _wrapped_view
+    return decorador
@@ -0,0 +1,106 @@
+"""Exportación en streaming de planillas y historiales de calificaciones.
+
+Las filas se leen con ``values_list(...).iterator(chunk_size=...)`` (cursor
+del lado del servidor en PostgreSQL) y se serializan por bloques, así que la
+memoria no depende del número de filas. El encabezado se emite antes de
+ejecutar la consulta para que el primer byte salga de inmediato.
+"""
+import csv
+import io
+import json
+
+from django.utils.text import slugify
+
+from .models import Calificacion
+from .services import NOTA_APROBATORIA
+
+TAMANO_BLOQUE = 2000
+FORMATOS = ('csv', 'ndjson')
+
+# tipo -> (columnas, campos de values_list, orden)
+TIPOS = {
+    # Planilla por asignatura: una sección por asignatura, estudiantes por apellido
+    'planilla': (
+        ('codigo', 'asignatura', 'matricula', 'apellido', 'nombre', 'carrera', 'nota'),
+        ('asignatura__codigo', 'asignatura__nombre', 'estudiante__matricula', 'estudiante__apellido',
+         'estudiante__nombre', 'estudiante__carrera', 'nota'),
+        ('asignatura__codigo', 'estudiante__apellido', 'estudiante__nombre', 'estudiante_id'),
+    ),
+    # Historial por estudiante: sus asignaturas con créditos y estado
+    'historial': (
+        ('matricula', 'apellido', 'nombre', 'carrera', 'codigo', 'asignatura', 'creditos', 'nota', 'estado'),
+        ('estudiante__matricula', 'estudiante__apellido', 'estudiante__nombre', 'estudiante__carrera',
+         'asignatura__codigo', 'asignatura__nombre', 'asignatura__creditos', 'nota'),
+        ('estudiante__apellido', 'estudiante__nombre', 'estudiante_id', 'asignatura__codigo'),
+    ),
+}
+
+TIPOS_CONTENIDO = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def calificaciones_exportables(tipo: str, asignatura: str = '', carrera: str = '', matricula: str = ''):
+    """Queryset de tuplas para el tipo de exportación, con los filtros opcionales"""
+    _, campos, orden = TIPOS[tipo]
+    queryset = Calificacion.objects.all()
+    if asignatura:
+        queryset = queryset.filter(asignatura__codigo=asignatura)
+    if carrera:
+        queryset = queryset.filter(estudiante__carrera=carrera)
+    if matricula:
+        queryset = queryset.filter(estudiante__matricula=matricula)
+    return queryset.order_by(*orden).values_list(*campos)
+
+
+def _filas(tipo: str, queryset, tamano_bloque: int):
+    for fila in queryset.iterator(chunk_size=tamano_bloque):
+        if tipo == 'historial':
+            fila = (*fila, 'Aprobada' if fila[-1] >= NOTA_APROBATORIA else 'Reprobada')
+        yield fila
+
+
+def exportar(tipo: str, formato: str, queryset=None, tamano_bloque: int = TAMANO_BLOQUE):
+    """Genera el contenido exportado como bloques de texto.
+
+    ``queryset`` por defecto son todas las calificaciones del tipo pedido.
+    """
+    if tipo not in TIPOS:
+        raise ValueError(f'Tipo de exportación desconocido: {tipo}')
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato desconocido: {formato}')
+    columnas = TIPOS[tipo][0]
+    if queryset is None:
+        queryset = calificaciones_exportables(tipo)
+
+    bufer = io.StringIO()
+    if formato == 'csv':
+        escritor = csv.writer(bufer)
+        # BOM para que Excel reconozca UTF-8 al abrir el CSV
+        bufer.write('\ufeff')
+        escritor.writerow(columnas)
+        escribir = escritor.writerow
+    else:
+        def escribir(fila):
+            datos = dict(zip(columnas, fila))
+            datos['nota'] = float(datos['nota'])
+            bufer.write(json.dumps(datos, ensure_ascii=False))
+            bufer.write('\n')
+    yield bufer.getvalue()
+    bufer.seek(0)
+    bufer.truncate()
+
+    for i, fila in enumerate(_filas(tipo, queryset, tamano_bloque), start=1):
+        escribir(fila)
+        if i % tamano_bloque == 0:
+            yield bufer.getvalue()
+            bufer.seek(0)
+            bufer.truncate()
+    if bufer.tell():
+        yield bufer.getvalue()
+
+
+def nombre_archivo(tipo: str, formato: str, filtro: str = '') -> str:
+    sufijo = f'_{slugify(filtro)}' if slugify(filtro) else ''
+    return f'{tipo}{sufijo}.{formato}'
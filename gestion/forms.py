@@ -20,39 +20,37 @@ class EstudianteForm(BaseBootstrapModelForm):
 class AsignaturaForm(BaseBootstrapModelForm):
     class Meta:
         model = Asignatura
-        fields = ['codigo', 'nombre', 'creditos', 'profesor']
+        fields = ['codigo', 'nombre', 'creditos', 'profesor', 'cupo']
 
 
 class ConsultaNotasForm(forms.Form):
     matricula = forms.CharField(label='Matrícula', max_length=20)
     clave = forms.CharField(label='Contraseña', widget=forms.PasswordInput())
 
-    def clean(self):
-        cleaned = super().clean()
-        matricula = cleaned.get('matricula')
-        clave = cleaned.get('clave')
-        
-        if matricula and clave:
-            try:
-                estudiante = Estudiante.objects.get(matricula=matricula)
-            except Estudiante.DoesNotExist:
-                raise forms.ValidationError(
-                    'No existe un estudiante con esa matrícula. Verifica que la matrícula sea correcta.'
-                )
-            
-            if not estudiante.clave:
-                raise forms.ValidationError(
-                    'Este estudiante no tiene contraseña asignada. Contacta al administrador.'
-                )
-            
-            if not estudiante.check_clave(clave):
-                raise forms.ValidationError(
-                    'Contraseña incorrecta. Si olvidaste tu contraseña, contacta al administrador.'
-                )
-            
-            cleaned['estudiante'] = estudiante
-        
-        return cleaned
+    async def autenticar(self):
+        """Valida el formulario y devuelve el estudiante, o None dejando el error en el formulario.
+
+        Es async (ORM async y hash en el pool de claves) para que la vista de
+        login no bloquee al worker mientras se calcula el hash.
+        """
+        if not self.is_valid():
+            return None
+        try:
+            estudiante = await Estudiante.objects.aget(matricula=self.cleaned_data['matricula'])
+        except Estudiante.DoesNotExist:
+            self.add_error(None, 'No existe un estudiante con esa matrícula. Verifica que la matrícula sea correcta.')
+            return None
+
+        if not estudiante.clave:
+            self.add_error(None, 'Este estudiante no tiene contraseña asignada. Contacta al administrador.')
+            return None
+
+        if not await estudiante.acheck_clave(self.cleaned_data['clave']):
+            self.add_error(None, 'Contraseña incorrecta. Si olvidaste tu contraseña, contacta al administrador.')
+            return None
+
+        self.cleaned_data['estudiante'] = estudiante
+        return estudiante
 
 
 class CambiarClaveForm(forms.Form):
@@ -93,3 +91,14 @@ class CambiarClaveForm(forms.Form):
         return cleaned
 
 
+class ImportarCalificacionesForm(forms.Form):
+    archivo = forms.FileField(
+        label='Archivo CSV o XLSX',
+        help_text='Columnas: matricula, codigo, nota. Las calificaciones existentes se actualizan.',
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('El archivo debe ser .csv o .xlsx.')
+        return archivo
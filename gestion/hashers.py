@@ -0,0 +1,85 @@
+"""Política de hash para las claves de estudiantes.
+
+El algoritmo y sus parámetros se configuran con ``CLAVES_ALGORITMO`` y
+``CLAVES_PARAMETROS`` (ver ``manage.py calibrar_hash``), independientes de
+``PASSWORD_HASHERS`` de los usuarios del admin. Las claves guardadas con otro
+algoritmo u otros parámetros siguen validando y se re-hashean con la política
+vigente en el siguiente login correcto.
+
+La verificación usa los hashers de Django, que en scrypt fijan ``maxmem`` al
+límite por defecto de OpenSSL (32 MiB): por eso el costo de scrypt se ajusta
+con ``parallelism`` y no subiendo ``work_factor`` por encima de 2**14.
+
+Las vistas async verifican con ``averificar_clave``, que calcula el hash en un
+pool de hilos acotado (``CLAVES_HILOS``): hashlib y argon2-cffi liberan el GIL,
+así que los hashes corren en paralelo sin bloquear el event loop.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher, check_password, make_password,
+)
+from django.core.exceptions import ImproperlyConfigured
+
+ALGORITMOS = {
+    'argon2': Argon2PasswordHasher,
+    'scrypt': ScryptPasswordHasher,
+    'pbkdf2_sha256': PBKDF2PasswordHasher,
+}
+
+
+def crear_hasher(algoritmo: str, parametros: dict = None):
+    """Instancia el hasher del algoritmo con los parámetros dados (p. ej. ``time_cost``)"""
+    if algoritmo not in ALGORITMOS:
+        raise ImproperlyConfigured(f'Algoritmo de claves desconocido: {algoritmo} (opciones: {", ".join(ALGORITMOS)})')
+    clase = ALGORITMOS[algoritmo]
+    hasher = clase()
+    for nombre, valor in (parametros or {}).items():
+        if not hasattr(clase, nombre) or nombre == 'algorithm':
+            raise ImproperlyConfigured(f'Parámetro desconocido para {algoritmo}: {nombre}')
+        setattr(hasher, nombre, valor)
+    if algoritmo == 'argon2':
+        try:
+            hasher._load_library()
+        except ValueError:
+            raise ImproperlyConfigured('CLAVES_ALGORITMO=argon2 requiere instalar argon2-cffi.')
+    return hasher
+
+
+@lru_cache(maxsize=None)
+def _hasher(algoritmo: str, parametros: tuple):
+    return crear_hasher(algoritmo, dict(parametros))
+
+
+def hasher_estudiantes():
+    """Hasher de la política vigente (se reconstruye si cambian los ajustes)"""
+    return _hasher(settings.CLAVES_ALGORITMO, tuple(sorted(settings.CLAVES_PARAMETROS.items())))
+
+
+def hashear_clave(clave: str) -> str:
+    return make_password(clave, hasher=hasher_estudiantes())
+
+
+def verificar_clave(clave: str, encoded: str, actualizar=None) -> bool:
+    """Verifica la clave; si el hash no sigue la política vigente llama a ``actualizar(clave)``"""
+    return check_password(clave, encoded, setter=actualizar, preferred=hasher_estudiantes())
+
+
+def _verificar_y_rehashear(clave: str, encoded: str) -> tuple:
+    nuevos = []
+    correcta = verificar_clave(clave, encoded, lambda raw: nuevos.append(hashear_clave(raw)))
+    return correcta, nuevos[0] if nuevos else None
+
+
+@lru_cache(maxsize=None)
+def _pool_claves(hilos: int) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='claves')
+
+
+async def averificar_clave(clave: str, encoded: str) -> tuple:
+    """Verifica en el pool de claves; devuelve (correcta, hash nuevo o None si no hace falta re-hashear)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool_claves(settings.CLAVES_HILOS), _verificar_y_rehashear, clave, encoded)
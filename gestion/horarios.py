@@ -0,0 +1,155 @@
+"""Detección de choques de aula entre horarios.
+
+Cada horario ocupa su aula el día ``dia`` en el intervalo [hora, hora +
+duración). Los horarios se agrupan por (día, aula) y cada grupo se recorre
+ordenado por inicio con un montículo de los intervalos aún en curso: al
+empezar uno, choca exactamente con los que todavía no terminaron. El costo es
+O(n log n + k) para n horarios y k choques, en lugar de comparar todos los
+pares. Las filas se leen con ``values_list``, sin instanciar modelos.
+
+El mismo barrido, agrupando solo por día, encuentra los choques personales
+del horario semanal de un estudiante (dos de sus asignaturas a la misma hora).
+"""
+import heapq
+from collections import defaultdict
+from typing import NamedTuple
+
+from .cache_utils import obtener_o_calcular
+from .models import Horario, Inscripcion, normalizar_aula
+from .services import CACHE_ESTADISTICAS, ESPACIO_HORARIOS, clave_horario
+
+CAMPOS = ('id', 'asignatura__codigo', 'dia', 'hora', 'duracion', 'aula')
+ORDEN_DIAS = {dia: i for i, (dia, _) in enumerate(Horario.DIAS)}
+# Las entradas se invalidan explícitamente; el tiempo solo acota las huérfanas
+TIMEOUT_HORARIO = 24 * 3600
+
+
+def _hhmm(minutos: int) -> str:
+    return f'{minutos // 60:02d}:{minutos % 60:02d}'
+
+
+def clave_aula(aula: str) -> str:
+    # Las guardadas ya vienen normalizadas; también agrupa franjas armadas a mano
+    return normalizar_aula(aula)
+
+
+class Franja(NamedTuple):
+    id: int
+    codigo: str
+    dia: str
+    inicio: int  # minutos desde medianoche
+    fin: int
+    aula: str
+
+    def __str__(self) -> str:
+        return f'{self.codigo} {self.dia} {_hhmm(self.inicio)}-{_hhmm(self.fin)} ({self.aula})'
+
+
+class Conflicto(NamedTuple):
+    primero: Franja
+    segundo: Franja
+
+    @property
+    def minutos(self) -> int:
+        return min(self.primero.fin, self.segundo.fin) - max(self.primero.inicio, self.segundo.inicio)
+
+    def __str__(self) -> str:
+        return f'{self.primero} choca con {self.segundo} ({self.minutos} min)'
+
+
+def _franja(id, codigo, dia, hora, duracion, aula) -> Franja:
+    inicio = hora.hour * 60 + hora.minute
+    return Franja(id, codigo, dia, inicio, inicio + duracion, aula)
+
+
+def franjas(queryset=None):
+    """Franjas de los horarios del queryset (por defecto, todos)"""
+    queryset = Horario.objects.all() if queryset is None else queryset
+    for fila in queryset.order_by().values_list(*CAMPOS).iterator(chunk_size=5000):
+        yield _franja(*fila)
+
+
+def detectar_conflictos(franjas, por_aula: bool = True) -> list:
+    """Pares de franjas que se solapan en el mismo día y aula, ordenados por día, aula e inicio.
+
+    Con ``por_aula=False`` basta con que coincidan el día y la hora.
+    """
+    grupos = defaultdict(list)
+    for franja in franjas:
+        grupos[(franja.dia, clave_aula(franja.aula) if por_aula else '')].append(franja)
+
+    conflictos = []
+    for _, grupo in sorted(grupos.items(), key=lambda g: (ORDEN_DIAS.get(g[0][0], 99), g[0][1])):
+        grupo.sort(key=lambda f: (f.inicio, f.fin, f.id))
+        en_curso = []  # montículo de (fin, id, franja)
+        for franja in grupo:
+            while en_curso and en_curso[0][0] <= franja.inicio:
+                heapq.heappop(en_curso)
+            conflictos.extend(Conflicto(otra, franja) for _, _, otra in sorted(en_curso))
+            heapq.heappush(en_curso, (franja.fin, franja.id, franja))
+    return conflictos
+
+
+def conflictos_de(horario) -> list:
+    """Choques de un horario (guardado o no) con los ya guardados en su día y aula.
+
+    Usa el índice (dia, aula) con igualdad: solo lee los horarios de esa aula
+    ese día (``aula`` se guarda normalizada).
+    """
+    propia = _franja(horario.pk, horario.asignatura.codigo if horario.asignatura_id else '',
+                     horario.dia, horario.hora, horario.duracion, horario.aula)
+    candidatos = Horario.objects.filter(dia=horario.dia, aula=normalizar_aula(horario.aula)).exclude(pk=horario.pk)
+    return [
+        Conflicto(otra, propia) for otra in franjas(candidatos)
+        if otra.inicio < propia.fin and propia.inicio < otra.fin
+    ]
+
+
+def calcular_horario_semanal(estudiante_id) -> dict:
+    """Clases de la semana del estudiante por día y choques entre sus asignaturas.
+
+    Dos consultas: las asignaturas inscritas y, con ``prefetch_related``, los
+    horarios de todas ellas.
+    """
+    inscripciones = (
+        Inscripcion.objects.filter(estudiante_id=estudiante_id)
+        .select_related('asignatura')
+        .prefetch_related('asignatura__horarios')
+    )
+    clases = {}
+    for inscripcion in inscripciones:
+        asignatura = inscripcion.asignatura
+        for horario in asignatura.horarios.all():
+            franja = _franja(horario.pk, asignatura.codigo, horario.dia, horario.hora, horario.duracion, horario.aula)
+            clases[franja] = {
+                'horario_id': horario.pk, 'asignatura_id': asignatura.pk, 'codigo': asignatura.codigo,
+                'asignatura': asignatura.nombre, 'profesor': asignatura.profesor,
+                'inicio': _hhmm(franja.inicio), 'fin': _hhmm(franja.fin), 'aula': horario.aula, 'choque': False,
+            }
+
+    choques = []
+    for conflicto in detectar_conflictos(clases, por_aula=False):
+        if conflicto.primero.codigo == conflicto.segundo.codigo:
+            continue  # dos sesiones de la misma asignatura
+        primera, segunda = clases[conflicto.primero], clases[conflicto.segundo]
+        primera['choque'] = segunda['choque'] = True
+        choques.append({
+            'dia': conflicto.primero.dia, 'minutos': conflicto.minutos, 'primera': primera, 'segunda': segunda,
+        })
+
+    por_dia = defaultdict(list)
+    for franja in sorted(clases, key=lambda f: (f.inicio, f.fin, f.codigo)):
+        por_dia[franja.dia].append(clases[franja])
+    return {
+        'dias': [{'dia': dia, 'nombre': nombre, 'clases': por_dia[dia]} for dia, nombre in Horario.DIAS],
+        'total_clases': len(clases),
+        'choques': choques,
+    }
+
+
+def horario_semanal(estudiante_id) -> dict:
+    """Horario semanal del estudiante, cacheado (ver ``services.ESPACIO_HORARIOS``)"""
+    return obtener_o_calcular(
+        ESPACIO_HORARIOS, clave_horario(estudiante_id), lambda: calcular_horario_semanal(estudiante_id),
+        timeout=TIMEOUT_HORARIO, alias=CACHE_ESTADISTICAS,
+    )
@@ -0,0 +1,68 @@
+"""Estudiante de la sesión, cargado a lo sumo una vez por petición.
+
+``EstudianteMiddleware`` deja en ``request.estudiante`` un objeto perezoso (la
+consulta se hace al primer acceso) y en ``request.aestudiante()`` su versión
+async; ambos comparten el resultado. La consulta trae solo las columnas que
+usan las páginas del estudiante, con su resumen académico en el mismo JOIN y
+la fecha de su última calificación (para las respuestas condicionales).
+"""
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.models import OuterRef, Subquery
+from django.utils.functional import SimpleLazyObject
+
+from .models import Calificacion, Estudiante
+
+CAMPOS_IDENTIDAD = ('nombre', 'apellido', 'matricula', 'carrera', 'actualizado')
+# Los que usa ResumenEstudiante.como_dict, más la fecha que versiona la tabla de notas
+CAMPOS_RESUMEN = tuple(
+    f'resumen__{campo}'
+    for campo in (
+        'promedio', 'promedio_ponderado', 'total_asignaturas', 'aprobadas', 'reprobadas', 'creditos_totales',
+        'actualizado',
+    )
+)
+
+
+ULTIMA_CALIFICACION = Subquery(
+    Calificacion.objects.filter(estudiante=OuterRef('pk')).order_by('-actualizado').values('actualizado')[:1]
+)
+
+
+def _consulta(estudiante_id):
+    return (
+        Estudiante.objects.select_related('resumen').only(*CAMPOS_IDENTIDAD, *CAMPOS_RESUMEN)
+        .annotate(ultima_calificacion=ULTIMA_CALIFICACION).filter(pk=estudiante_id)
+    )
+
+
+def obtener_estudiante(request):
+    """El estudiante de la sesión o None; memoizado en la petición"""
+    if not hasattr(request, '_estudiante'):
+        estudiante_id = request.session.get('estudiante_id')
+        request._estudiante = _consulta(estudiante_id).first() if estudiante_id else None
+    return request._estudiante
+
+
+async def aobtener_estudiante(request):
+    if not hasattr(request, '_estudiante'):
+        estudiante_id = await request.session.aget('estudiante_id')
+        request._estudiante = await _consulta(estudiante_id).afirst() if estudiante_id else None
+    return request._estudiante
+
+
+class EstudianteMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.estudiante = SimpleLazyObject(partial(obtener_estudiante, request))
+        request.aestudiante = partial(aobtener_estudiante, request)
+        # En modo async get_response devuelve la corrutina que espera Django
+        return self.get_response(request)
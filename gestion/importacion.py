@@ -0,0 +1,286 @@
+"""Importación masiva de calificaciones y estudiantes desde CSV o XLSX.
+
+Las filas se procesan por lotes: cada lote resuelve estudiantes y
+asignaturas con ``in_bulk`` y hace un upsert con ``bulk_create`` sobre la
+clave única (estudiante, asignatura), así que la memoria queda acotada por
+el tamaño del lote y no por el del archivo.
+
+En la carga de estudiantes el costo dominante es hashear las claves (decenas
+de ms de CPU por clave con la política por defecto), por eso las claves de cada lote se hashean
+en paralelo en un ``ProcessPoolExecutor``.
+"""
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+import django
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .hashers import hashear_clave
+from .models import Estudiante, Asignatura, Calificacion
+from .services import invalidar_por_calificaciones, invalidar_por_estudiantes
+
+TAMANO_LOTE = 2000
+COLUMNAS = ('matricula', 'codigo', 'nota')
+COLUMNAS_ESTUDIANTES = ('nombre', 'apellido', 'matricula', 'carrera', 'correo', 'clave')
+# La clave es opcional: sin ella el estudiante queda sin acceso a sus notas
+OBLIGATORIAS_ESTUDIANTES = ('nombre', 'apellido', 'matricula', 'carrera', 'correo')
+# Claves por tarea enviada al pool; amortiza el costo de serializar entre procesos
+CLAVES_POR_TAREA = 64
+
+
+class ReporteImportacion:
+    def __init__(self):
+        self.procesadas = 0
+        self.importadas = 0
+        self.errores = []  # (número de fila, mensaje)
+        self.rechazadas = []  # (número de fila, datos originales, mensaje)
+        self.estudiantes_afectados = set()
+
+    def error(self, fila: int, mensaje: str, datos: dict = None) -> None:
+        self.errores.append((fila, mensaje))
+        if datos is not None:
+            self.rechazadas.append((fila, datos, mensaje))
+
+    def escribir_errores(self, salida) -> None:
+        escritor = csv.writer(salida)
+        escritor.writerow(['fila', 'error'])
+        escritor.writerows(self.errores)
+
+    def escribir_rechazos(self, salida, columnas) -> None:
+        """Escribe las filas rechazadas con sus columnas originales, para corregirlas y reenviarlas"""
+        escritor = csv.writer(salida)
+        escritor.writerow(['fila', *columnas, 'error'])
+        for fila, datos, mensaje in sorted(self.rechazadas, key=lambda r: r[0]):
+            escritor.writerow([fila, *(datos.get(c, '') for c in columnas), mensaje])
+
+
+def leer_csv(archivo, columnas=COLUMNAS):
+    """Itera (número de fila, dict) sobre un CSV cuyo encabezado incluye ``columnas``.
+
+    ``archivo`` puede ser de texto o binario (se decodifica como UTF-8).
+    """
+    if not isinstance(archivo, io.TextIOBase):
+        archivo = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    lector = csv.DictReader(archivo)
+    faltantes = set(columnas) - {c.strip().lower() for c in (lector.fieldnames or [])}
+    if faltantes:
+        raise ValueError(f'Faltan columnas en el encabezado: {", ".join(sorted(faltantes))}')
+    for numero, fila in enumerate(lector, start=2):
+        yield numero, {k.strip().lower(): (v or '').strip() for k, v in fila.items() if k}
+
+
+def leer_xlsx(archivo, columnas=COLUMNAS):
+    """Itera (número de fila, dict) sobre la primera hoja de un XLSX en modo de solo lectura"""
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = [str(c or '').strip().lower() for c in next(filas, ())]
+        faltantes = set(columnas) - set(encabezado)
+        if faltantes:
+            raise ValueError(f'Faltan columnas en el encabezado: {", ".join(sorted(faltantes))}')
+        for numero, valores in enumerate(filas, start=2):
+            yield numero, {k: str(v).strip() if v is not None else '' for k, v in zip(encabezado, valores)}
+    finally:
+        libro.close()
+
+
+def leer_archivo(archivo, nombre: str, columnas=COLUMNAS):
+    if nombre.lower().endswith('.xlsx'):
+        return leer_xlsx(archivo, columnas)
+    return leer_csv(archivo, columnas)
+
+
+def _importar_lote(lote, reporte: ReporteImportacion, asignaturas: dict) -> None:
+    validas = []
+    for numero, fila in lote:
+        matricula, codigo = fila.get('matricula', ''), fila.get('codigo', '')
+        if not matricula or not codigo:
+            reporte.error(numero, 'Matrícula y código son obligatorios.')
+            continue
+        try:
+            nota = Decimal(fila.get('nota', '').replace(',', '.'))
+        except InvalidOperation:
+            reporte.error(numero, f'Nota inválida: {fila.get("nota")!r}.')
+            continue
+        if not nota.is_finite() or not 0 <= nota <= 100:
+            reporte.error(numero, f'La nota debe estar entre 0 y 100: {nota}.')
+            continue
+        validas.append((numero, matricula, codigo, nota.quantize(Decimal('0.01'))))
+
+    # Resolución por lotes: una consulta por modelo, solo para lo que falta
+    estudiantes = Estudiante.objects.only('id', 'matricula').in_bulk(
+        {m for _, m, _, _ in validas}, field_name='matricula'
+    )
+    faltantes = {c for _, _, c, _ in validas} - asignaturas.keys()
+    if faltantes:
+        asignaturas.update(Asignatura.objects.only('id', 'codigo').in_bulk(faltantes, field_name='codigo'))
+
+    # Una misma pareja repetida en el lote conserva la última nota
+    calificaciones = {}
+    for numero, matricula, codigo, nota in validas:
+        estudiante = estudiantes.get(matricula)
+        asignatura = asignaturas.get(codigo)
+        if estudiante is None:
+            reporte.error(numero, f'No existe un estudiante con matrícula {matricula}.')
+        elif asignatura is None:
+            reporte.error(numero, f'No existe una asignatura con código {codigo}.')
+        else:
+            clave = (estudiante.pk, asignatura.pk)
+            if clave in calificaciones:
+                reporte.error(calificaciones[clave][0], 'Fila reemplazada por otra posterior con la misma matrícula y código.')
+            calificaciones[clave] = (numero, nota)
+
+    with transaction.atomic():
+        Calificacion.objects.bulk_create(
+            [
+                Calificacion(estudiante_id=estudiante_id, asignatura_id=asignatura_id, nota=nota)
+                for (estudiante_id, asignatura_id), (_, nota) in calificaciones.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['estudiante', 'asignatura'],
+            update_fields=['nota', 'actualizado'],
+        )
+    reporte.importadas += len(calificaciones)
+    reporte.estudiantes_afectados.update(estudiante_id for estudiante_id, _ in calificaciones)
+
+
+def importar_calificaciones(filas, tamano_lote: int = TAMANO_LOTE, reporte: ReporteImportacion = None) -> ReporteImportacion:
+    """Importa (o actualiza) calificaciones desde un iterable de (número de fila, dict).
+
+    ``bulk_create`` no dispara señales, así que al final se actualizan los
+    resúmenes de los estudiantes afectados y se invalidan las estadísticas.
+    Cada lote se confirma por separado: si uno falla (archivo mal codificado,
+    error de la base) los anteriores quedan guardados y también se
+    invalidan; el ``reporte`` recibido refleja lo importado hasta el error.
+    """
+    reporte = reporte or ReporteImportacion()
+    asignaturas = {}
+    filas = iter(filas)
+    try:
+        while True:
+            lote = list(islice(filas, tamano_lote))
+            if not lote:
+                break
+            reporte.procesadas += len(lote)
+            _importar_lote(lote, reporte, asignaturas)
+    finally:
+        invalidar_por_calificaciones(reporte.estudiantes_afectados)
+    return reporte
+
+
+def inicializar_proceso() -> None:
+    # Con el método "spawn" (macOS, Windows) el proceso hijo arranca sin Django configurado
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'universidad.settings')
+    django.setup()
+
+
+def _hashear(claves: list) -> list:
+    return [hashear_clave(clave) for clave in claves]
+
+
+def hashear_claves(claves: list, pool: ProcessPoolExecutor = None) -> list:
+    """Hashea las claves en orden; en paralelo si se recibe un pool"""
+    if pool is None or len(claves) <= CLAVES_POR_TAREA:
+        return _hashear(claves)
+    bloques = [claves[i:i + CLAVES_POR_TAREA] for i in range(0, len(claves), CLAVES_POR_TAREA)]
+    return [h for bloque in pool.map(_hashear, bloques) for h in bloque]
+
+
+def _validar_estudiante(fila: dict):
+    """Devuelve (Estudiante sin guardar, None) o (None, mensaje de error)"""
+    estudiante = Estudiante(**{c: fila.get(c, '') for c in OBLIGATORIAS_ESTUDIANTES})
+    try:
+        # La unicidad se comprueba aparte, por lote, para no consultar fila por fila
+        estudiante.clean_fields(exclude=['clave'])
+    except ValidationError as e:
+        return None, '; '.join(f'{campo}: {" ".join(mensajes)}' for campo, mensajes in e.message_dict.items())
+    return estudiante, None
+
+
+def _inscribir_lote(lote, reporte: ReporteImportacion, vistos: dict, pool) -> None:
+    candidatos = []
+    for numero, fila in lote:
+        estudiante, mensaje = _validar_estudiante(fila)
+        if estudiante is None:
+            reporte.error(numero, mensaje, fila)
+            continue
+        if estudiante.matricula in vistos['matricula']:
+            reporte.error(numero, f'Matrícula repetida en el archivo (fila {vistos["matricula"][estudiante.matricula]}).', fila)
+            continue
+        if estudiante.correo in vistos['correo']:
+            reporte.error(numero, f'Correo repetido en el archivo (fila {vistos["correo"][estudiante.correo]}).', fila)
+            continue
+        vistos['matricula'][estudiante.matricula] = numero
+        vistos['correo'][estudiante.correo] = numero
+        candidatos.append((numero, fila, estudiante))
+
+    # Duplicados contra la base: dos consultas por lote
+    matriculas = set(Estudiante.objects.filter(
+        matricula__in=[e.matricula for _, _, e in candidatos]
+    ).values_list('matricula', flat=True))
+    correos = set(Estudiante.objects.filter(
+        correo__in=[e.correo for _, _, e in candidatos]
+    ).values_list('correo', flat=True))
+    nuevos = []
+    for numero, fila, estudiante in candidatos:
+        if estudiante.matricula in matriculas:
+            reporte.error(numero, f'Ya existe un estudiante con matrícula {estudiante.matricula}.', fila)
+        elif estudiante.correo in correos:
+            reporte.error(numero, f'Ya existe un estudiante con correo {estudiante.correo}.', fila)
+        else:
+            nuevos.append((numero, fila, estudiante))
+
+    # Solo se hashean las claves de las filas que se van a insertar
+    con_clave = [(e, fila['clave']) for _, fila, e in nuevos if fila.get('clave')]
+    for (estudiante, _), hash_ in zip(con_clave, hashear_claves([c for _, c in con_clave], pool)):
+        estudiante.clave = hash_
+
+    try:
+        with transaction.atomic():
+            Estudiante.objects.bulk_create([e for _, _, e in nuevos])
+        reporte.importadas += len(nuevos)
+    except IntegrityError:
+        # Otra escritura concurrente ganó la carrera: se reintenta fila por fila
+        for numero, fila, estudiante in nuevos:
+            try:
+                with transaction.atomic():
+                    estudiante.save(force_insert=True)
+                reporte.importadas += 1
+            except IntegrityError:
+                estudiante.pk = None
+                reporte.error(numero, 'Matrícula o correo ya registrados.', fila)
+
+
+def inscribir_estudiantes(filas, tamano_lote: int = TAMANO_LOTE, procesos: int = None) -> ReporteImportacion:
+    """Da de alta estudiantes desde un iterable de (número de fila, dict).
+
+    Las filas inválidas o con matrícula/correo duplicados (en el archivo o en
+    la base) se rechazan sin detener la carga. ``procesos=1`` hashea en el
+    proceso actual; por defecto se usa un proceso por CPU.
+    """
+    reporte = ReporteImportacion()
+    vistos = {'matricula': {}, 'correo': {}}
+    procesos = procesos or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(procesos, initializer=inicializar_proceso) if procesos > 1 else None
+    filas = iter(filas)
+    try:
+        while True:
+            lote = list(islice(filas, tamano_lote))
+            if not lote:
+                break
+            reporte.procesadas += len(lote)
+            _inscribir_lote(lote, reporte, vistos, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        # También tras un lote fallido: los anteriores ya se confirmaron
+        if reporte.importadas:
+            invalidar_por_estudiantes()
+    return reporte
@@ -0,0 +1,135 @@
+"""Inscripciones con cupo por asignatura, seguras ante inscripciones concurrentes.
+
+``Asignatura.inscritos`` es un contador desnormalizado. Nunca se cuenta y
+luego se inserta (dos peticiones simultáneas verían el mismo lugar libre):
+
+- ``inscribir`` ocupa el lugar con un UPDATE condicional
+  (``inscritos < cupo``) y luego crea la inscripción, en la misma transacción;
+  la base de datos serializa los UPDATE sobre la fila, así que a lo sumo
+  ``cupo`` de ellos afectan una fila.
+- ``inscribir_lote`` bloquea la asignatura con ``select_for_update`` y, como
+  SQLite lo ignora, confirma el contador leído en el UPDATE final; si otro
+  proceso lo movió, reintenta.
+
+Ambos caminos bloquean primero la fila de la asignatura y después insertan,
+así que no se interbloquean entre sí. La restricción ``inscritos <= cupo`` de
+la tabla es la última defensa. Las bajas (borrados de ``Inscripcion``, en
+cascada o no) descuentan el lugar en una señal.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Asignatura, Inscripcion
+from .services import invalidar_horarios
+
+TAMANO_LOTE = 2000
+REINTENTOS_LOTE = 5
+
+
+class InscripcionError(Exception):
+    pass
+
+
+class YaInscrito(InscripcionError):
+    pass
+
+
+class CupoAgotado(InscripcionError):
+    pass
+
+
+class ReporteCohorte:
+    def __init__(self):
+        self.inscritos = 0
+        self.ya_inscritos = 0
+        self.sin_cupo = 0
+
+
+def inscribir(estudiante_id, asignatura_id) -> Inscripcion:
+    """Inscribe al estudiante si queda cupo; ``YaInscrito`` o ``CupoAgotado`` si no"""
+    with transaction.atomic():
+        # Primero la fila de la asignatura, como inscribir_lote: con el mismo
+        # orden de bloqueos los dos caminos no se interbloquean
+        ocupado = Asignatura.objects.filter(pk=asignatura_id, inscritos__lt=F('cupo')).update(
+            inscritos=F('inscritos') + 1
+        )
+        if not ocupado:
+            if Inscripcion.objects.filter(estudiante_id=estudiante_id, asignatura_id=asignatura_id).exists():
+                raise YaInscrito('El estudiante ya está inscrito en esta asignatura.')
+            raise CupoAgotado('La asignatura no tiene cupo disponible.')
+        try:
+            with transaction.atomic():
+                inscripcion = Inscripcion.objects.create(estudiante_id=estudiante_id, asignatura_id=asignatura_id)
+        except IntegrityError:
+            # La excepción revierte también el lugar ocupado
+            raise YaInscrito('El estudiante ya está inscrito en esta asignatura.')
+    return inscripcion
+
+
+def inscribir_lote(estudiante_ids, asignatura_id, reporte: ReporteCohorte = None) -> ReporteCohorte:
+    """Inscribe a los estudiantes en orden hasta agotar el cupo, en una transacción"""
+    reporte = reporte or ReporteCohorte()
+    ids = list(dict.fromkeys(estudiante_ids))
+    for _ in range(REINTENTOS_LOTE):
+        with transaction.atomic():
+            asignatura = Asignatura.objects.select_for_update().only('cupo', 'inscritos').get(pk=asignatura_id)
+            ya = set(
+                Inscripcion.objects.filter(asignatura_id=asignatura_id, estudiante_id__in=ids)
+                .values_list('estudiante_id', flat=True)
+            )
+            nuevos = [i for i in ids if i not in ya]
+            admitidos = nuevos[:max(asignatura.cupo - asignatura.inscritos, 0)]
+            if admitidos:
+                Inscripcion.objects.bulk_create(
+                    [Inscripcion(estudiante_id=i, asignatura_id=asignatura_id) for i in admitidos]
+                )
+                confirmado = Asignatura.objects.filter(pk=asignatura_id, inscritos=asignatura.inscritos).update(
+                    inscritos=F('inscritos') + len(admitidos)
+                )
+                if not confirmado:
+                    # Otro proceso inscribió entre la lectura y el UPDATE: se descarta el lote
+                    transaction.set_rollback(True)
+                    continue
+        break
+    else:
+        raise InscripcionError(f'La asignatura {asignatura_id} cambió durante {REINTENTOS_LOTE} intentos; reintenta.')
+
+    # bulk_create no dispara señales; dentro de una transacción externa se
+    # invalida al confirmarla, como en las señales
+    transaction.on_commit(lambda admitidos=admitidos: invalidar_horarios(admitidos))
+    reporte.inscritos += len(admitidos)
+    reporte.ya_inscritos += len(ya)
+    reporte.sin_cupo += len(nuevos) - len(admitidos)
+    return reporte
+
+
+def inscribir_cohorte(estudiantes, asignatura_id, tamano_lote: int = TAMANO_LOTE) -> ReporteCohorte:
+    """Inscribe un queryset de estudiantes por lotes, en el orden del queryset"""
+    reporte = ReporteCohorte()
+    ids = estudiantes.values_list('pk', flat=True)
+    lote = []
+    for estudiante_id in ids.iterator(chunk_size=tamano_lote):
+        lote.append(estudiante_id)
+        if len(lote) == tamano_lote:
+            inscribir_lote(lote, asignatura_id, reporte)
+            lote = []
+    if lote:
+        inscribir_lote(lote, asignatura_id, reporte)
+    return reporte
+
+
+def recontar_inscritos(queryset=None, ampliar_cupo: bool = False) -> int:
+    """Recalcula ``inscritos`` desde las inscripciones (tras cargas masivas o reparaciones).
+
+    Con ``ampliar_cupo`` el cupo sube donde hay más inscritos que lugares.
+    """
+    conteo = Coalesce(Subquery(
+        Inscripcion.objects.filter(asignatura=OuterRef('pk')).order_by()
+        .values('asignatura').annotate(n=Count('*')).values('n')
+    ), 0)
+    cambios = {'inscritos': conteo}
+    if ampliar_cupo:
+        cambios['cupo'] = Greatest(F('cupo'), conteo)
+    queryset = Asignatura.objects.all() if queryset is None else queryset
+    return queryset.update(**cambios)
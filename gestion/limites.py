@@ -0,0 +1,145 @@
+"""Límites de intentos fallidos con ventana deslizante y estado compartido.
+
+Cada límite cuenta fallos con dos contadores de ventana fija: el de la ventana
+actual y el de la anterior, ponderado por la parte de ella que aún cae dentro
+de la ventana deslizante.
+
+Antes de ejecutar la vista se reserva un intento con un incremento atómico y
+se rechaza si el valor devuelto supera el límite: N peticiones simultáneas
+obtienen N valores distintos, así que a lo sumo las que caben llegan a
+calcular el hash de la clave. Al terminar, el intento se libera salvo que la
+vista lo marque como fallido (``request.intento_fallido``); los logins
+correctos no consumen el límite.
+
+Los contadores viven en la cache ``ratelimit`` cuando ésta incrementa de forma
+atómica (Redis, memoria local). La cache de archivos o de base de datos lee y
+escribe en ``incr`` y perdería conteos bajo concurrencia: con ellas los
+contadores se guardan en ``ContadorIntentos`` con un UPDATE ``F() + 1``.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import ContadorIntentos
+
+ALIAS_CACHE = 'ratelimit'
+CACHES_ATOMICAS = (LocMemCache, RedisCache)
+
+
+def _ip(request):
+    """IP del cliente; detrás de ``LIMITES_PROXIES`` proxies confiables se lee de X-Forwarded-For"""
+    proxies = settings.LIMITES_PROXIES
+    if proxies:
+        reenviadas = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        # Cada proxy agrega la dirección de quien le habló: la del cliente queda
+        # en la posición ``proxies`` contando desde el final
+        if len(reenviadas) >= proxies:
+            return reenviadas[-proxies]
+    return request.META.get('REMOTE_ADDR')
+
+
+def identificador(request, por: tuple):
+    """Identidad del cliente según los criterios (``ip``, ``matricula``, ``estudiante``), o None si falta alguno"""
+    partes = []
+    for criterio in por:
+        if criterio == 'ip':
+            valor = _ip(request)
+        elif criterio == 'matricula':
+            valor = request.POST.get('matricula', '').strip().upper()
+        elif criterio == 'estudiante':
+            valor = request.session.get('estudiante_id')
+        else:
+            raise ValueError(f'Criterio de límite desconocido: {criterio}')
+        if not valor:
+            return None
+        partes.append(f'{criterio}={valor}')
+    return '|'.join(partes)
+
+
+def _atomica(cache) -> bool:
+    return isinstance(cache, CACHES_ATOMICAS)
+
+
+def _ventana(nombre: str, ident: str, ahora):
+    limite, ventana = settings.LIMITES_PETICIONES[nombre]
+    ahora = time.time() if ahora is None else ahora
+    indice, transcurrido = divmod(ahora, ventana)
+    base = f'limite:{nombre}:{hashlib.sha256(ident.encode()).hexdigest()[:32]}'
+    return limite, ventana, ahora, transcurrido, f'{base}:{int(indice)}', f'{base}:{int(indice) - 1}'
+
+
+def _leer(clave: str, ahora: float) -> int:
+    cache = caches[ALIAS_CACHE]
+    if _atomica(cache):
+        return cache.get(clave, 0)
+    return (
+        ContadorIntentos.objects.filter(clave=clave, expira__gt=ahora)
+        .values_list('intentos', flat=True).first() or 0
+    )
+
+
+def _incrementar(clave: str, ahora: float, timeout: int) -> int:
+    """Suma un intento y devuelve el valor resultante, sin que otro incremento se intercale"""
+    cache = caches[ALIAS_CACHE]
+    if _atomica(cache):
+        cache.add(clave, 0, timeout)
+        try:
+            return cache.incr(clave)
+        except ValueError:
+            # Expiró entre add e incr
+            return 1 if cache.add(clave, 1, timeout) else cache.incr(clave)
+
+    with transaction.atomic():
+        # El UPDATE bloquea la fila hasta el fin de la transacción: la lectura
+        # siguiente devuelve el valor que dejó este incremento
+        if not ContadorIntentos.objects.filter(clave=clave).update(intentos=F('intentos') + 1):
+            try:
+                with transaction.atomic():
+                    ContadorIntentos.objects.create(clave=clave, intentos=1, expira=ahora + timeout)
+            except IntegrityError:
+                # Otro proceso creó el contador al mismo tiempo
+                ContadorIntentos.objects.filter(clave=clave).update(intentos=F('intentos') + 1)
+            else:
+                # Una fila nueva por ventana e identidad: buen momento para barrer las vencidas
+                ContadorIntentos.objects.filter(expira__lte=ahora).delete()
+                return 1
+        return ContadorIntentos.objects.values_list('intentos', flat=True).get(clave=clave)
+
+
+def _decrementar(clave: str) -> None:
+    cache = caches[ALIAS_CACHE]
+    if _atomica(cache):
+        try:
+            cache.decr(clave)
+        except ValueError:
+            # El contador ya expiró
+            pass
+        return
+    ContadorIntentos.objects.filter(clave=clave, intentos__gt=0).update(intentos=F('intentos') - 1)
+
+
+def reservar(nombre: str, ident: str, ahora: float = None) -> tuple:
+    """(clave de la reserva o None si se rechaza, segundos hasta reintentar).
+
+    Se rechaza cuando los intentos previos a éste ya alcanzan el límite; el
+    intento rechazado no queda contado.
+    """
+    limite, ventana, ahora, transcurrido, actual, anterior = _ventana(nombre, ident, ahora)
+    previos = _incrementar(actual, ahora, 2 * ventana) - 1
+    if previos + _leer(anterior, ahora) * (1 - transcurrido / ventana) < limite:
+        return actual, 0
+    _decrementar(actual)
+    # Cota de la espera: fin de la ventana actual, o de la siguiente si la actual ya alcanza el límite
+    espera = ventana - transcurrido if previos < limite else 2 * ventana - transcurrido
+    return None, int(espera) + 1
+
+
+def liberar(reserva: str) -> None:
+    """Devuelve un intento reservado que no resultó fallido"""
+    _decrementar(reserva)
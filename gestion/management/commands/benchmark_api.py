@@ -0,0 +1,90 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.forms.models import model_to_dict
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from gestion.api import CAMPOS_ASIGNATURA, CodificadorAPI
+from gestion.models import Asignatura, Estudiante
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la API JSON con la página HTML equivalente (latencia, bytes y consultas) y la '
+        'serialización desde values() con la de instancias de modelo. Las sesiones se revierten al final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=50)
+
+    def handle(self, *args, **options):
+        estudiante = Estudiante.objects.filter(resumen__total_asignaturas__gt=0).order_by('pk').first()
+        if estudiante is None:
+            raise CommandError('No hay estudiantes con calificaciones. Ejecuta antes: manage.py generar_datos')
+        repeticiones = options['repeticiones']
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), transaction.atomic():
+            cliente_estudiante = Client()
+            sesion = cliente_estudiante.session
+            sesion['estudiante_id'] = estudiante.pk
+            sesion.save()
+            cliente_admin = Client()
+            cliente_admin.force_login(User.objects.create_user('benchmark_api', password=None, is_staff=True))
+
+            pares = [
+                ('notas', cliente_estudiante, reverse('notas_estudiante', args=[estudiante.pk]), {},
+                 reverse('api_notas', args=[estudiante.pk]), {}),
+                ('asignaturas (15 filas)', cliente_admin, reverse('asignaturas_list'), {},
+                 reverse('api_asignaturas'), {'limite': 15}),
+                ('asignaturas (15, 2 campos)', cliente_admin, reverse('asignaturas_list'), {},
+                 reverse('api_asignaturas'), {'limite': 15, 'campos': 'codigo,nombre'}),
+            ]
+            self.stdout.write(f'{"caso":<28} {"formato":<6} {"ms (mediana)":>13} {"bytes":>8} {"consultas":>10}')
+            for nombre, cliente, url_html, parametros_html, url_api, parametros_api in pares:
+                for formato, url, parametros in (('html', url_html, parametros_html), ('json', url_api, parametros_api)):
+                    ms, tamano, consultas = self.medir(cliente, url, parametros, repeticiones)
+                    self.stdout.write(f'{nombre:<28} {formato:<6} {ms:>13.2f} {tamano:>8} {consultas:>10.1f}')
+            transaction.set_rollback(True)
+
+        self.serializacion(repeticiones)
+
+    def medir(self, cliente, url, parametros, repeticiones):
+        cliente.get(url, parametros)
+        tiempos = []
+        with CaptureQueriesContext(connection) as contexto:
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                response = cliente.get(url, parametros)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        if response.status_code != 200:
+            raise CommandError(f'{url} respondió {response.status_code}')
+        return statistics.median(tiempos), len(response.content), len(contexto.captured_queries) / repeticiones
+
+    def serializacion(self, repeticiones):
+        campos = list(CAMPOS_ASIGNATURA)
+        total = Asignatura.objects.count()
+
+        def desde_values():
+            return json.dumps(list(Asignatura.objects.order_by('codigo').values(*campos)), cls=CodificadorAPI)
+
+        def desde_modelos():
+            return json.dumps(
+                [model_to_dict(a, fields=campos) | {'id': a.pk} for a in Asignatura.objects.order_by('codigo')],
+                cls=CodificadorAPI,
+            )
+
+        self.stdout.write(f'\nSerialización de las {total} asignaturas:')
+        for nombre, serializar in (('values()', desde_values), ('instancias + model_to_dict', desde_modelos)):
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                serializar()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            self.stdout.write(f'  {nombre:<28} {statistics.median(tiempos):>8.2f} ms')
@@ -0,0 +1,57 @@
+import statistics
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from gestion.busqueda import buscar, busqueda_clasica
+from gestion.models import Estudiante
+from gestion.sinteticos import estudiantes_sinteticos
+
+TERMINOS = ['Rodríguez', 'medicina', 'S0004', 'ana pérez', 'universidad.test', 'inexistente']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la búsqueda indexada con la cadena de icontains. '
+        'Los datos sintéticos se insertan en una transacción que se revierte al final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudiantes', type=int, default=100_000)
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--pagina', type=int, default=15, help='Filas leídas por consulta')
+
+    def medir(self, consulta, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            consulta()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos)
+
+    def handle(self, *args, **options):
+        cantidad = options['estudiantes']
+        repeticiones = options['repeticiones']
+        pagina = options['pagina']
+
+        with transaction.atomic():
+            self.stdout.write(f'Insertando {cantidad} estudiantes sintéticos...')
+            generador = estudiantes_sinteticos(cantidad)
+            while True:
+                lote = list(islice(generador, 5000))
+                if not lote:
+                    break
+                Estudiante.objects.bulk_create(lote)
+
+            self.stdout.write(f'{"término":<20} {"coinciden":>10} {"icontains ms":>14} {"indexada ms":>13}')
+            for termino in TERMINOS:
+                clasica = busqueda_clasica(Estudiante.objects.all(), termino).order_by('apellido', 'nombre')
+                indexada = buscar(Estudiante.objects.all(), termino)
+                total = indexada.count()
+                ms_clasica = self.medir(lambda: list(clasica[:pagina]), repeticiones)
+                ms_indexada = self.medir(lambda: list(indexada[:pagina]), repeticiones)
+                self.stdout.write(f'{termino:<20} {total:>10} {ms_clasica:>14.1f} {ms_indexada:>13.1f}')
+
+            transaction.set_rollback(True)
@@ -0,0 +1,78 @@
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from gestion.exportacion import FORMATOS, TIPOS, calificaciones_exportables, exportar
+from gestion.models import Asignatura, Calificacion, Estudiante
+from gestion.sinteticos import estudiantes_sinteticos
+
+ASIGNATURAS = 20
+
+
+def memoria_residente_mb() -> float:
+    """RSS actual del proceso (Linux); 0 si /proc no está disponible"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        return 0.0
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la exportación en streaming: tiempo al primer byte, filas por segundo y memoria. '
+        'Los datos sintéticos se insertan en una transacción que se revierte al final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calificaciones', type=int, default=1_000_000)
+        parser.add_argument('--bloque', type=int, default=2000)
+
+    def poblar(self, cantidad):
+        asignaturas = Asignatura.objects.bulk_create(
+            Asignatura(codigo=f'BX{i:03d}', nombre=f'Asignatura {i}', creditos=3 + i % 3, profesor='Benchmark')
+            for i in range(ASIGNATURAS)
+        )
+        generador = estudiantes_sinteticos(-(-cantidad // ASIGNATURAS), inicio=90_000_000)
+        restantes = cantidad
+        while restantes > 0:
+            estudiantes = Estudiante.objects.bulk_create(list(islice(generador, 2000)))
+            calificaciones = [
+                Calificacion(estudiante=e, asignatura=a, nota=(e.pk * 7 + a.pk * 13) % 101)
+                for e in estudiantes for a in asignaturas
+            ][:restantes]
+            Calificacion.objects.bulk_create(calificaciones, batch_size=5000)
+            restantes -= len(calificaciones)
+
+    def handle(self, *args, **options):
+        cantidad = options['calificaciones']
+        with transaction.atomic():
+            self.stdout.write(f'Insertando {cantidad} calificaciones sintéticas...')
+            self.poblar(cantidad)
+
+            self.stdout.write(f'{"tipo":<10} {"formato":<8} {"primer byte ms":>15} {"total s":>8} {"filas/s":>9} {"MB":>7} {"Δ RSS MB":>9}')
+            with open(os.devnull, 'w') as nulo:
+                for tipo in TIPOS:
+                    for formato in FORMATOS:
+                        rss_inicial = pico = memoria_residente_mb()
+                        inicio = time.perf_counter()
+                        bloques = exportar(tipo, formato, calificaciones_exportables(tipo), options['bloque'])
+                        primero = next(bloques)
+                        primer_byte = (time.perf_counter() - inicio) * 1000
+                        escritos = len(primero)
+                        for i, bloque in enumerate(bloques):
+                            nulo.write(bloque)
+                            escritos += len(bloque)
+                            if i % 50 == 0:
+                                pico = max(pico, memoria_residente_mb())
+                        total = time.perf_counter() - inicio
+                        delta = pico - rss_inicial
+                        self.stdout.write(
+                            f'{tipo:<10} {formato:<8} {primer_byte:>15.2f} {total:>8.2f} '
+                            f'{cantidad / total:>9.0f} {escritos / 1e6:>7.1f} {delta:>9.1f}'
+                        )
+
+            transaction.set_rollback(True)
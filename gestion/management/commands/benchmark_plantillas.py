@@ -0,0 +1,91 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.forms import AuthenticationForm
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template import engines
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from gestion.forms import CambiarClaveForm, ConsultaNotasForm
+from gestion.models import Calificacion, Estudiante
+from gestion.services import version_notas
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el tiempo de render de las páginas más visitadas: compilando la plantilla en cada '
+        'petición, con la plantilla compilada en memoria y, en las notas, con el fragmento cacheado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=50)
+
+    def handle(self, *args, **options):
+        estudiante = (
+            Estudiante.objects.select_related('resumen')
+            .filter(resumen__total_asignaturas__gt=0).order_by('pk').first()
+        )
+        if estudiante is None:
+            raise CommandError('No hay estudiantes con calificaciones. Ejecuta antes: manage.py generar_datos')
+        cargadores = [
+            cargador for cargador in engines['django'].engine.template_loaders if hasattr(cargador, 'reset')
+        ]
+        if not cargadores:
+            raise CommandError('Las plantillas no usan django.template.loaders.cached.Loader')
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        request.session = {}
+        request.estudiante = estudiante
+        version = version_notas(estudiante)
+
+        def notas(tiempo_fragmento):
+            return lambda: render_to_string('notas_estudiante.html', {
+                'estudiante': estudiante,
+                'calificaciones': Calificacion.objects.filter(estudiante_id=estudiante.pk)
+                .select_related('asignatura').order_by('asignatura__codigo'),
+                **estudiante.resumen.como_dict(),
+                'version_notas': version,
+                'tiempo_fragmento': tiempo_fragmento,
+                'cambiar_clave_form': CambiarClaveForm(estudiante),
+            }, request)
+
+        def dashboard():
+            return render_to_string('dashboard.html', {
+                'consulta_form': ConsultaNotasForm(),
+                'admin_form': AuthenticationForm(request),
+                'next': '/admin/',
+            }, request)
+
+        def compilando(render):
+            def medida():
+                for cargador in cargadores:
+                    cargador.reset()
+                return render()
+            return medida
+
+        casos = [
+            ('notas: compilando', compilando(notas(0))),
+            ('notas: compilada', notas(0)),
+            ('notas: compilada + fragmento', notas(settings.FRAGMENTOS_TIMEOUT)),
+            ('dashboard: compilando', compilando(dashboard)),
+            ('dashboard: compilada', dashboard),
+        ]
+        self.stdout.write(f'{"caso":<30} {"ms (mediana)":>13} {"consultas":>10}')
+        for nombre, render in casos:
+            # Calentamiento; guarda el fragmento (la clave lleva la versión de las notas,
+            # así que no hace falta vaciar la cache, compartida con las demás en Redis)
+            render()
+            tiempos = []
+            with CaptureQueriesContext(connection) as contexto:
+                for _ in range(options['repeticiones']):
+                    inicio = time.perf_counter()
+                    render()
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+            consultas = len(contexto.captured_queries) / options['repeticiones']
+            self.stdout.write(f'{nombre:<30} {statistics.median(tiempos):>13.2f} {consultas:>10.1f}')
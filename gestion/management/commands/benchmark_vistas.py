@@ -0,0 +1,210 @@
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from gestion import urls as urls_gestion
+from gestion.metricas import CUANTILES, percentil
+from gestion.models import Asignatura, Calificacion, Estudiante
+
+# Nombre de ruta -> (cliente, función que arma los argumentos de reverse,
+# parámetros GET o función que los arma).
+# Las rutas que modifican la sesión o solo aceptan POST quedan fuera; se
+# reportan como omitidas para que una ruta nueva no pase desapercibida.
+ESCENARIOS = {
+    'dashboard': ('anonimo', lambda d: {}, {}),
+    'notas_estudiante': ('estudiante', lambda d: {'pk': d['estudiante'].pk}, {}),
+    'horario_estudiante': ('estudiante', lambda d: {'pk': d['estudiante'].pk}, {}),
+    'inscribir_asignatura': ('estudiante', lambda d: {'pk': d['estudiante'].pk}, {}),
+    'cambiar_clave': ('estudiante', lambda d: {'pk': d['estudiante'].pk}, {}),
+    'constancia_pdf': ('estudiante', lambda d: {'pk': d['estudiante'].pk}, {}),
+    'estudiantes_list': ('admin', lambda d: {}, {}),
+    'estudiantes_create': ('admin', lambda d: {}, {}),
+    'estudiantes_update': ('admin', lambda d: {'pk': d['estudiante'].pk}, {}),
+    'estudiantes_delete': ('admin', lambda d: {'pk': d['estudiante'].pk}, {}),
+    'asignaturas_list': ('admin', lambda d: {}, {}),
+    'asignaturas_create': ('admin', lambda d: {}, {}),
+    'asignaturas_update': ('admin', lambda d: {'pk': d['asignatura'].pk}, {}),
+    'asignaturas_delete': ('admin', lambda d: {'pk': d['asignatura'].pk}, {}),
+    'exportar_calificaciones': (
+        'admin', lambda d: {}, lambda d: {'tipo': 'historial', 'matricula': d['estudiante'].matricula},
+    ),
+    'metricas': ('admin', lambda d: {}, {}),
+    'api_notas': ('estudiante', lambda d: {'pk': d['estudiante'].pk}, {}),
+    'api_horario': ('estudiante', lambda d: {'pk': d['estudiante'].pk}, {}),
+    'api_asignaturas': ('estudiante', lambda d: {}, {}),
+    'api_horarios': ('estudiante', lambda d: {}, {}),
+}
+OMITIDAS = {
+    'notas_login': 'solo POST (hashea la clave; ver prueba de carga)',
+    'notas_logout': 'cierra la sesión del cliente',
+}
+# Variantes adicionales de una misma ruta: nombre -> (ruta, parámetros GET)
+VARIANTES = {
+    'estudiantes_list?q': ('estudiantes_list', {'q': 'rodríguez'}),
+    'estudiantes_list?carrera': ('estudiantes_list', {'carrera': 'Medicina'}),
+    'asignaturas_list?q': ('asignaturas_list', {'q': 'cálculo'}),
+    'api_asignaturas?limite=15': ('api_asignaturas', {'limite': 15}),
+    'api_asignaturas?campos': ('api_asignaturas', {'campos': 'codigo,nombre', 'limite': 15}),
+}
+
+
+def revision_git() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except OSError:
+        return ''
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta cada ruta de gestion/urls.py con el cliente de pruebas y reporta en JSON '
+        'rendimiento, percentiles de latencia y consultas SQL por vista. '
+        'Las escrituras (sesiones, usuario temporal) se revierten al final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=30)
+        parser.add_argument('--calentamiento', type=int, default=3)
+        parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto, salida estándar)')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para mostrar la diferencia')
+
+    def handle(self, *args, **options):
+        estudiante = (
+            Estudiante.objects.filter(calificaciones__isnull=False).exclude(clave='').order_by('pk').first()
+            or Estudiante.objects.order_by('pk').first()
+        )
+        asignatura = Asignatura.objects.order_by('pk').first()
+        if estudiante is None or asignatura is None:
+            raise CommandError('No hay datos. Ejecuta antes: manage.py generar_datos')
+        datos = {'estudiante': estudiante, 'asignatura': asignatura}
+        # Una línea de log por petición distorsionaría las latencias
+        registro_metricas = logging.getLogger('gestion.metricas')
+        nivel = registro_metricas.level
+        registro_metricas.setLevel(logging.WARNING)
+
+        resultados = {}
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        try:
+            with override_settings(ALLOWED_HOSTS=hosts), transaction.atomic():
+                clientes = self.clientes(estudiante)
+                for nombre, (ruta, argumentos, parametros) in self.casos(datos).items():
+                    if ruta is None:
+                        resultados[nombre] = {'omitida': argumentos}
+                        continue
+                    url = reverse(ruta, kwargs=argumentos)
+                    resultados[nombre] = self.medir(clientes[ESCENARIOS[ruta][0]], url, parametros, options)
+                    self.stderr.write(
+                        f'{nombre:<28} p50 {resultados[nombre]["latencia_ms"]["p50"]:>8.2f} ms  '
+                        f'{resultados[nombre]["consultas"]:>3} consultas'
+                    )
+                transaction.set_rollback(True)
+        finally:
+            registro_metricas.setLevel(nivel)
+
+        informe = {
+            'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'revision': revision_git(),
+            'entorno': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'base_de_datos': connection.vendor,
+                'estudiantes': Estudiante.objects.count(),
+                'calificaciones': Calificacion.objects.count(),
+            },
+            'repeticiones': options['repeticiones'],
+            'vistas': resultados,
+        }
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as archivo:
+                self.comparar(json.load(archivo), informe)
+
+        contenido = json.dumps(informe, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(contenido + '\n')
+        else:
+            self.stdout.write(contenido)
+
+    def casos(self, datos) -> dict:
+        casos = {}
+        for patron in urls_gestion.urlpatterns:
+            if not isinstance(patron, URLPattern) or not patron.name:
+                continue
+            if patron.name in ESCENARIOS:
+                _, argumentos, parametros = ESCENARIOS[patron.name]
+                parametros = parametros(datos) if callable(parametros) else parametros
+                casos[patron.name] = (patron.name, argumentos(datos), parametros)
+            else:
+                casos[patron.name] = (None, OMITIDAS.get(patron.name, 'sin escenario definido'), None)
+        for nombre, (ruta, parametros) in VARIANTES.items():
+            casos[nombre] = (ruta, ESCENARIOS[ruta][1](datos), parametros)
+        return casos
+
+    def clientes(self, estudiante) -> dict:
+        admin = User.objects.create_user('benchmark_vistas', password=None, is_staff=True)
+        cliente_admin = Client()
+        cliente_admin.force_login(admin)
+        cliente_estudiante = Client()
+        sesion = cliente_estudiante.session
+        sesion['estudiante_id'] = estudiante.pk
+        sesion.save()
+        return {'anonimo': Client(), 'admin': cliente_admin, 'estudiante': cliente_estudiante}
+
+    def medir(self, cliente, url, parametros, options) -> dict:
+        def pedir():
+            response = cliente.get(url, parametros)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+            return response
+
+        for _ in range(options['calentamiento']):
+            pedir()
+        latencias = []
+        estados = set()
+        with CaptureQueriesContext(connection) as contexto:
+            inicio = time.perf_counter()
+            for _ in range(options['repeticiones']):
+                t0 = time.perf_counter()
+                estados.add(pedir().status_code)
+                latencias.append((time.perf_counter() - t0) * 1000)
+            total = time.perf_counter() - inicio
+        latencias.sort()
+        return {
+            'url': url,
+            'estados': sorted(estados),
+            'peticiones_por_segundo': round(options['repeticiones'] / total, 1),
+            'latencia_ms': {
+                'media': round(statistics.fmean(latencias), 3),
+                **{f'p{int(q * 100)}': round(percentil(latencias, q), 3) for q in CUANTILES},
+                'max': round(latencias[-1], 3),
+            },
+            'consultas': round(len(contexto.captured_queries) / options['repeticiones'], 2),
+        }
+
+    def comparar(self, anterior: dict, actual: dict) -> None:
+        self.stderr.write(f'\nComparación con {anterior.get("revision") or anterior.get("fecha")}:')
+        for nombre, datos in actual['vistas'].items():
+            previo = anterior.get('vistas', {}).get(nombre)
+            if 'omitida' in datos or not previo or 'omitida' in previo:
+                continue
+            antes, ahora = previo['latencia_ms']['p50'], datos['latencia_ms']['p50']
+            cambio = (ahora - antes) / antes * 100 if antes else 0
+            self.stderr.write(
+                f'{nombre:<28} p50 {antes:>8.2f} -> {ahora:>8.2f} ms ({cambio:+.0f}%)  '
+                f'consultas {previo["consultas"]} -> {datos["consultas"]}'
+            )
@@ -0,0 +1,95 @@
+import json
+import os
+import statistics
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.hashers import ALGORITMOS, crear_hasher
+
+# Punto de partida y parámetro que se escala, por algoritmo
+INICIALES = {
+    'argon2': {'time_cost': 1, 'memory_cost': 65536, 'parallelism': 1},
+    # work_factor fijo en 2**14 (r=8): más memoria excede el maxmem con el que Django verifica
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+    'pbkdf2_sha256': {'iterations': 100_000},
+}
+ESCALADO = {'argon2': 'time_cost', 'scrypt': 'parallelism', 'pbkdf2_sha256': 'iterations'}
+MEMORIA_MINIMA_ARGON2 = 8192  # KiB
+
+
+def medir_ms(hasher, muestras: int) -> float:
+    """Mediana de milisegundos por hash"""
+    tiempos = []
+    for _ in range(muestras):
+        inicio = time.perf_counter()
+        hasher.encode('clave-de-calibracion', hasher.salt())
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el costo de hashear claves en esta máquina y busca los parámetros del algoritmo que '
+        'se acercan (sin pasarse) al tiempo objetivo por hash. Imprime las variables de entorno '
+        'CLAVES_ALGORITMO y CLAVES_PARAMETROS a configurar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algoritmo', choices=list(ALGORITMOS), default='argon2')
+        parser.add_argument('--objetivo-ms', type=float, default=250, help='Tiempo máximo por hash (ms)')
+        parser.add_argument('--muestras', type=int, default=3, help='Hashes por medición (se usa la mediana)')
+        parser.add_argument('--maximo-intentos', type=int, default=20)
+
+    def handle(self, *args, **options):
+        algoritmo = options['algoritmo']
+        objetivo = options['objetivo_ms']
+        parametros = dict(INICIALES[algoritmo])
+        escalado = ESCALADO[algoritmo]
+
+        self.stdout.write(f'Calibrando {algoritmo} para {objetivo:g} ms por hash ({os.cpu_count()} CPU)')
+        elegido = None
+        for _ in range(options['maximo_intentos']):
+            try:
+                ms = medir_ms(crear_hasher(algoritmo, parametros), options['muestras'])
+            except ImproperlyConfigured as e:
+                raise CommandError(str(e))
+            self.stdout.write(f'  {json.dumps(parametros)}: {ms:.1f} ms/hash, {1000 / ms:.1f} logins/s por núcleo')
+
+            if ms <= objetivo:
+                elegido = (dict(parametros), ms)
+                siguiente = self.escalar(algoritmo, parametros, ms, objetivo)
+                if siguiente is None:
+                    break
+                parametros[escalado] = siguiente
+            elif algoritmo == 'pbkdf2_sha256' and parametros['iterations'] > 1000:
+                # Se pasó del objetivo: corregir hacia abajo en proporción
+                parametros['iterations'] = max(1000, int(parametros['iterations'] * objetivo / ms * 0.95))
+            elif elegido is not None:
+                break
+            elif algoritmo == 'argon2' and parametros['memory_cost'] > MEMORIA_MINIMA_ARGON2:
+                # time_cost=1 ya es muy lento: reducir memoria
+                parametros['memory_cost'] //= 2
+            else:
+                raise CommandError(f'Ni los parámetros mínimos de {algoritmo} alcanzan {objetivo:g} ms por hash.')
+
+        if elegido is None:
+            raise CommandError('No se encontraron parámetros dentro del objetivo.')
+        parametros, ms = elegido
+        self.stdout.write(self.style.SUCCESS(
+            f'Elegido: {ms:.1f} ms/hash, ~{1000 / ms:.1f} logins/s por núcleo. Configura:'
+        ))
+        self.stdout.write(f'CLAVES_ALGORITMO={algoritmo}')
+        self.stdout.write(f"CLAVES_PARAMETROS='{json.dumps(parametros, separators=(',', ':'))}'")
+
+    def escalar(self, algoritmo: str, parametros: dict, ms: float, objetivo: float):
+        """Siguiente valor del parámetro escalado, o None si el actual ya es el mejor"""
+        actual = parametros[ESCALADO[algoritmo]]
+        if algoritmo == 'pbkdf2_sha256':
+            # Lineal en iteraciones: se ajusta en un paso (con 10% de margen)
+            siguiente = int(actual * objetivo / ms * 0.9)
+            return siguiente if siguiente > actual * 1.05 else None
+        # time_cost y parallelism también escalan lineal; se suben de a uno
+        siguiente = actual + 1
+        return siguiente if ms * siguiente / actual <= objetivo else None
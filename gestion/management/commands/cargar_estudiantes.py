@@ -0,0 +1,46 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.importacion import (
+    COLUMNAS_ESTUDIANTES, OBLIGATORIAS_ESTUDIANTES, TAMANO_LOTE, inscribir_estudiantes, leer_archivo,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Da de alta estudiantes desde un archivo CSV o XLSX '
+        f'({", ".join(COLUMNAS_ESTUDIANTES)}). Las claves se hashean en paralelo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help=f'Filas por lote (por defecto {TAMANO_LOTE})')
+        parser.add_argument('--procesos', type=int, help='Procesos para hashear claves (por defecto, uno por CPU)')
+        parser.add_argument('--rechazos', help='Ruta donde escribir las filas rechazadas (CSV)')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        inicio = time.perf_counter()
+        try:
+            with open(ruta, 'rb') as archivo:
+                filas = leer_archivo(archivo, ruta, OBLIGATORIAS_ESTUDIANTES)
+                reporte = inscribir_estudiantes(filas, options['lote'], options['procesos'])
+        except (OSError, ValueError, csv.Error) as e:
+            raise CommandError(f'No se pudo cargar {ruta}: {e}')
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f'Filas procesadas: {reporte.procesadas}. Estudiantes creados: {reporte.importadas}. '
+            f'Rechazadas: {len(reporte.errores)}. Tiempo: {duracion:.2f} s '
+            f'({reporte.importadas / duracion if duracion else 0:.0f} estudiantes/s).'
+        )
+        if reporte.rechazadas:
+            if options['rechazos']:
+                with open(options['rechazos'], 'w', newline='', encoding='utf-8') as salida:
+                    reporte.escribir_rechazos(salida, COLUMNAS_ESTUDIANTES)
+                self.stdout.write(f'Filas rechazadas escritas en {options["rechazos"]}')
+            else:
+                for fila, mensaje in reporte.errores[:20]:
+                    self.stderr.write(f'Fila {fila}: {mensaje}')
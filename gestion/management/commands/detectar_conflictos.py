@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.horarios import detectar_conflictos, franjas
+from gestion.models import Horario
+
+
+class Command(BaseCommand):
+    help = 'Lista los choques de aula (mismo día y aula, horas solapadas) de todos los horarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dia', choices=[dia for dia, _ in Horario.DIAS], help='Solo los horarios de ese día')
+        parser.add_argument('--mostrar', type=int, default=50, help='Choques que se listan (por defecto 50)')
+        parser.add_argument(
+            '--estricto', action='store_true', help='Termina con error si hay choques (para usar en CI o cron)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Horario.objects.all()
+        if options['dia']:
+            queryset = queryset.filter(dia=options['dia'])
+
+        inicio = time.perf_counter()
+        leidas = list(franjas(queryset))
+        lectura = time.perf_counter() - inicio
+        conflictos = detectar_conflictos(leidas)
+        deteccion = time.perf_counter() - inicio - lectura
+
+        for conflicto in conflictos[:options['mostrar']]:
+            self.stdout.write(str(conflicto))
+        if len(conflictos) > options['mostrar']:
+            self.stdout.write(f'... y {len(conflictos) - options["mostrar"]} más')
+        resumen = (
+            f'{len(leidas)} horarios revisados, {len(conflictos)} choques '
+            f'(lectura {lectura * 1000:.0f} ms, detección {deteccion * 1000:.0f} ms).'
+        )
+        if conflictos and options['estricto']:
+            raise CommandError(resumen)
+        self.stdout.write(self.style.WARNING(resumen) if conflictos else self.style.SUCCESS(resumen))
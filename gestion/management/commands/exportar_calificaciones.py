@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from gestion.exportacion import FORMATOS, TAMANO_BLOQUE, TIPOS, calificaciones_exportables, exportar
+
+
+class Command(BaseCommand):
+    help = 'Exporta planillas por asignatura o historiales por estudiante en CSV o NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', choices=sorted(TIPOS), default='planilla')
+        parser.add_argument('--formato', choices=FORMATOS, default='csv')
+        parser.add_argument('--asignatura', default='', help='Código de asignatura')
+        parser.add_argument('--carrera', default='')
+        parser.add_argument('--matricula', default='')
+        parser.add_argument('--bloque', type=int, default=TAMANO_BLOQUE, help='Filas leídas por bloque')
+        parser.add_argument('--salida', help='Ruta del archivo (por defecto, salida estándar)')
+
+    def handle(self, *args, **options):
+        queryset = calificaciones_exportables(
+            options['tipo'], options['asignatura'], options['carrera'], options['matricula']
+        )
+        bloques = exportar(options['tipo'], options['formato'], queryset, options['bloque'])
+        if options['salida']:
+            with open(options['salida'], 'w', newline='', encoding='utf-8') as salida:
+                salida.writelines(bloques)
+        else:
+            for bloque in bloques:
+                sys.stdout.write(bloque)
@@ -0,0 +1,47 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.constancias import datos_cohorte, escribir_constancia, ruta_constancia
+from gestion.importacion import inicializar_proceso
+from gestion.models import Estudiante
+
+
+class Command(BaseCommand):
+    help = 'Genera por adelantado las constancias en PDF de una cohorte (carrera) completa'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--carrera', action='append', help='Carrera a procesar (se puede repetir)')
+        parser.add_argument('--todas', action='store_true', help='Procesar todas las carreras')
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        if options['todas']:
+            carreras = list(Estudiante.objects.order_by('carrera').values_list('carrera', flat=True).distinct())
+        elif options['carrera']:
+            carreras = options['carrera']
+        else:
+            raise CommandError('Indica --carrera o --todas.')
+
+        inicio = time.perf_counter()
+        generadas = vigentes = 0
+        with ProcessPoolExecutor(options['procesos'], initializer=inicializar_proceso) as pool:
+            for carrera in carreras:
+                # Las constancias ya vigentes (misma huella) no se vuelven a generar
+                datos, rutas = [], []
+                for datos_estudiante in datos_cohorte(carrera):
+                    ruta = ruta_constancia(datos_estudiante)
+                    if ruta.exists():
+                        vigentes += 1
+                    else:
+                        datos.append(datos_estudiante)
+                        rutas.append(ruta)
+                for _ in pool.map(escribir_constancia, datos, rutas, chunksize=32):
+                    generadas += 1
+                self.stdout.write(f'{carrera}: {len(rutas)} generadas')
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'Constancias generadas: {generadas}. Ya vigentes: {vigentes}. Tiempo: {duracion:.2f} s.'
+        ))
@@ -0,0 +1,123 @@
+import re
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+
+from gestion.hashers import hashear_clave
+from gestion.inscripciones import recontar_inscritos
+from gestion.models import Asignatura, Calificacion, Estudiante, Horario, Inscripcion
+from gestion.services import actualizar_resumenes, invalidar_por_asignaturas, invalidar_por_estudiantes
+from gestion.sinteticos import (
+    PREFIJO_MATRICULA, asignaturas_sinteticas, calificaciones_sinteticas,
+    estudiantes_sinteticos, horarios_sinteticos,
+)
+
+ESCALAS = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+
+def cantidad_estudiantes(valor: str) -> int:
+    valor = valor.lower()
+    if valor in ESCALAS:
+        return ESCALAS[valor]
+    if not valor.isdigit():
+        raise CommandError(f'Cantidad inválida: {valor} (usa un número o {", ".join(ESCALAS)})')
+    return int(valor)
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos sintéticos (estudiantes, asignaturas, horarios, inscripciones y calificaciones) por lotes con '
+        'bulk_create. Todos los estudiantes comparten una clave hasheada una sola vez.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudiantes', default='1k', help=f'Número o escala: {", ".join(ESCALAS)}')
+        parser.add_argument('--asignaturas', type=int, default=60)
+        parser.add_argument('--calificaciones', type=int, default=8, help='Calificaciones por estudiante')
+        parser.add_argument('--clave', default='clave123', help='Clave de todos los estudiantes generados')
+        parser.add_argument('--lote', type=int, default=5000, help='Estudiantes por lote')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--limpiar', action='store_true', help='Borra antes los datos sintéticos existentes')
+
+    def handle(self, *args, **options):
+        cantidad = cantidad_estudiantes(options['estudiantes'])
+        lote = options['lote']
+        semilla = options['semilla']
+        inicio_total = time.perf_counter()
+
+        if options['limpiar']:
+            self.limpiar()
+
+        asignaturas = self.asignaturas(options['asignaturas'], semilla)
+
+        # Un solo hash: hashear por estudiante tomaría horas a esta escala
+        clave = hashear_clave(options['clave'])
+        primero = self.siguiente_indice()
+        generador = estudiantes_sinteticos(cantidad, inicio=primero, clave=clave, semilla=semilla)
+        creados = calificaciones = 0
+        while True:
+            inicio_lote = time.perf_counter()
+            with transaction.atomic():
+                estudiantes = Estudiante.objects.bulk_create(list(islice(generador, lote)))
+                if not estudiantes:
+                    break
+                nuevas = Calificacion.objects.bulk_create(
+                    calificaciones_sinteticas(estudiantes, asignaturas, options['calificaciones'], semilla + creados),
+                    batch_size=5000,
+                )
+                # Cada calificación sintética viene de una inscripción
+                Inscripcion.objects.bulk_create(
+                    [Inscripcion(estudiante_id=c.estudiante_id, asignatura_id=c.asignatura_id) for c in nuevas],
+                    batch_size=5000,
+                )
+                actualizar_resumenes([e.pk for e in estudiantes])
+            creados += len(estudiantes)
+            calificaciones += len(nuevas)
+            duracion = time.perf_counter() - inicio_lote
+            self.stdout.write(f'  {creados}/{cantidad} estudiantes ({len(estudiantes) / duracion:.0f}/s)')
+
+        # bulk_create no dispara señales: contadores de cupo (ampliado si hace
+        # falta a esta escala), facetas y estadísticas
+        recontar_inscritos(Asignatura.objects.filter(pk__in=[a.pk for a in asignaturas]), ampliar_cupo=True)
+        invalidar_por_asignaturas()
+        invalidar_por_estudiantes()
+        with connection.cursor() as cursor:
+            # Estadísticas del planificador (y total aproximado de las listas)
+            cursor.execute('ANALYZE')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generados {creados} estudiantes y {calificaciones} calificaciones sobre {len(asignaturas)} '
+            f'asignaturas en {time.perf_counter() - inicio_total:.1f} s.'
+        ))
+
+    def limpiar(self):
+        # Solo las filas marcadas: un estudiante o asignatura real puede tener el mismo prefijo
+        with transaction.atomic():
+            Calificacion.objects.filter(estudiante__sintetico=True).delete()
+            borrados, _ = Estudiante.objects.filter(sintetico=True).delete()
+            Asignatura.objects.filter(sintetico=True).delete()
+        self.stdout.write(f'Datos sintéticos anteriores eliminados ({borrados} filas).')
+
+    def siguiente_indice(self) -> int:
+        ultima = Estudiante.objects.filter(
+            matricula__regex=rf'^{PREFIJO_MATRICULA}\d{{8}}$'
+        ).aggregate(m=Max('matricula'))['m']
+        return int(re.sub(r'\D', '', ultima)) + 1 if ultima else 0
+
+    def asignaturas(self, cantidad: int, semilla: int) -> list:
+        """Reutiliza las asignaturas sintéticas existentes y crea las que falten, con sus horarios"""
+        existentes = list(Asignatura.objects.filter(sintetico=True).order_by('codigo'))
+        faltantes = cantidad - len(existentes)
+        if faltantes > 0:
+            with transaction.atomic():
+                nuevas = Asignatura.objects.bulk_create(
+                    asignaturas_sinteticas(faltantes, inicio=len(existentes), semilla=semilla)
+                )
+                Horario.objects.bulk_create(horarios_sinteticos(nuevas, semilla=semilla + len(existentes)))
+            invalidar_por_asignaturas()
+            existentes += nuevas
+            self.stdout.write(f'Asignaturas creadas: {len(nuevas)} (con horarios).')
+        return existentes[:cantidad] if cantidad else existentes
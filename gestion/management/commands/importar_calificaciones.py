@@ -0,0 +1,42 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.importacion import TAMANO_LOTE, ReporteImportacion, importar_calificaciones, leer_archivo
+
+
+class Command(BaseCommand):
+    help = 'Importa calificaciones (matricula, codigo, nota) desde un archivo CSV o XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help=f'Filas por lote (por defecto {TAMANO_LOTE})')
+        parser.add_argument('--errores', help='Ruta donde escribir el reporte de errores por fila (CSV)')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        inicio = time.perf_counter()
+        parcial = ReporteImportacion()
+        try:
+            with open(ruta, 'rb') as archivo:
+                reporte = importar_calificaciones(leer_archivo(archivo, ruta), options['lote'], parcial)
+        except (OSError, ValueError, csv.Error) as e:
+            raise CommandError(
+                f'No se pudo importar {ruta}: {e} (calificaciones importadas antes del error: {parcial.importadas})'
+            )
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f'Filas procesadas: {reporte.procesadas}. Calificaciones importadas: {reporte.importadas}. '
+            f'Errores: {len(reporte.errores)}. Tiempo: {duracion:.2f} s '
+            f'({reporte.procesadas / duracion if duracion else 0:.0f} filas/s).'
+        )
+        if reporte.errores:
+            if options['errores']:
+                with open(options['errores'], 'w', newline='', encoding='utf-8') as salida:
+                    reporte.escribir_errores(salida)
+                self.stdout.write(f'Reporte de errores escrito en {options["errores"]}')
+            else:
+                for fila, mensaje in reporte.errores[:20]:
+                    self.stderr.write(f'Fila {fila}: {mensaje}')
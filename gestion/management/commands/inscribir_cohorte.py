@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.inscripciones import TAMANO_LOTE, InscripcionError, inscribir_cohorte
+from gestion.models import Asignatura, Estudiante
+
+
+class Command(BaseCommand):
+    help = (
+        'Inscribe una cohorte de estudiantes (por carrera y/o prefijo de matrícula) en una o más '
+        'asignaturas, en orden de matrícula y hasta agotar el cupo de cada una.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('codigos', nargs='+', help='Códigos de las asignaturas')
+        parser.add_argument('--carrera', help='Solo los estudiantes de esta carrera')
+        parser.add_argument('--matricula', help='Solo las matrículas que empiezan así (por ejemplo, el año de ingreso)')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help=f'Estudiantes por transacción (por defecto {TAMANO_LOTE})')
+
+    def handle(self, *args, **options):
+        if not options['carrera'] and not options['matricula']:
+            raise CommandError('Indica la cohorte con --carrera y/o --matricula')
+        asignaturas = Asignatura.objects.in_bulk(options['codigos'], field_name='codigo')
+        faltantes = [c for c in options['codigos'] if c not in asignaturas]
+        if faltantes:
+            raise CommandError(f'No existen las asignaturas: {", ".join(faltantes)}')
+
+        cohorte = Estudiante.objects.order_by('matricula')
+        if options['carrera']:
+            cohorte = cohorte.filter(carrera=options['carrera'])
+        if options['matricula']:
+            cohorte = cohorte.filter(matricula__startswith=options['matricula'])
+
+        for codigo in dict.fromkeys(options['codigos']):
+            inicio = time.perf_counter()
+            try:
+                reporte = inscribir_cohorte(cohorte, asignaturas[codigo].pk, options['lote'])
+            except InscripcionError as e:
+                raise CommandError(f'{codigo}: {e}')
+            mensaje = (
+                f'{codigo}: {reporte.inscritos} inscritos, {reporte.ya_inscritos} ya estaban, '
+                f'{reporte.sin_cupo} sin cupo ({time.perf_counter() - inicio:.2f} s).'
+            )
+            self.stdout.write(self.style.WARNING(mensaje) if reporte.sin_cupo else self.style.SUCCESS(mensaje))
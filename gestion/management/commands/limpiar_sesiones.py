@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+# Motores que guardan las sesiones en la tabla django_session
+MOTORES_CON_TABLA = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra las sesiones vencidas de la base de datos por lotes, cada uno en su propia transacción, '
+        'para no bloquear la tabla de sesiones durante mucho tiempo (a diferencia de clearsessions). '
+        'Pensado para ejecutarse periódicamente (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help='Sesiones por lote (por defecto 5000)')
+        parser.add_argument('--pausa', type=float, default=0.0, help='Segundos de espera entre lotes')
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        if lote < 1:
+            raise CommandError('El tamaño de lote debe ser mayor que cero.')
+        if settings.SESSION_ENGINE not in MOTORES_CON_TABLA:
+            self.stdout.write(f'{settings.SESSION_ENGINE} no usa la tabla de sesiones: las vencidas expiran solas.')
+            return
+
+        # Las sesiones que venzan mientras corre el comando quedan para la próxima ejecución
+        ahora = timezone.now()
+        borradas = 0
+        inicio = time.perf_counter()
+        while True:
+            with transaction.atomic():
+                claves = list(
+                    Session.objects.filter(expire_date__lt=ahora).values_list('session_key', flat=True)[:lote]
+                )
+                if not claves:
+                    break
+                Session.objects.filter(session_key__in=claves).delete()
+            borradas += len(claves)
+            self.stdout.write(f'  {borradas} sesiones borradas')
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Sesiones vencidas borradas: {borradas} en {time.perf_counter() - inicio:.1f} s.'
+        ))
@@ -0,0 +1,343 @@
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urljoin
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.metricas import CUANTILES, percentil
+from gestion.models import Estudiante
+
+PASOS = ('inicio', 'login', 'notas', 'logout')
+RE_CSRF = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class _SinRedirecciones(HTTPRedirectHandler):
+    # Cada paso del flujo se mide por separado, así que las redirecciones se siguen a mano
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _pedir(cliente, url, datos=None, timeout=30):
+    """Devuelve (estado, Location, cuerpo) sin seguir redirecciones"""
+    cuerpo = urlencode(datos).encode() if datos is not None else None
+    try:
+        with cliente.open(Request(url, data=cuerpo), timeout=timeout) as respuesta:
+            return respuesta.status, respuesta.headers.get('Location'), respuesta.read()
+    except HTTPError as e:
+        return e.code, e.headers.get('Location'), e.read()
+
+
+def _cpu_sistema():
+    """(ticks ocupados, ticks totales) de todas las CPU según /proc/stat"""
+    with open('/proc/stat') as stat:
+        valores = [int(v) for v in stat.readline().split()[1:]]
+    inactivo = valores[3] + (valores[4] if len(valores) > 4 else 0)
+    return sum(valores) - inactivo, sum(valores)
+
+
+def _procesos(pid: int) -> list:
+    """El proceso y todos sus descendientes (p. ej. los workers de gunicorn)"""
+    pids, pendientes = [], [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        pids.append(actual)
+        try:
+            with open(f'/proc/{actual}/task/{actual}/children') as hijos:
+                pendientes.extend(int(h) for h in hijos.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def _cpu_procesos(pids) -> int:
+    """Ticks de CPU (usuario + sistema) consumidos por los procesos"""
+    total = 0
+    for pid in pids:
+        for actual in _procesos(pid):
+            try:
+                with open(f'/proc/{actual}/stat') as stat:
+                    campos = stat.read().rsplit(')', 1)[1].split()
+                total += int(campos[11]) + int(campos[12])
+            except OSError:
+                pass
+    return total
+
+
+class MuestreadorCPU(threading.Thread):
+    """Mide cada segundo el uso de CPU del sistema y de los procesos del servidor (Linux)"""
+
+    def __init__(self, pids):
+        super().__init__(daemon=True)
+        self.pids = pids
+        self.detener = threading.Event()
+        self.sistema = []  # % ocupado de toda la máquina
+        self.servidor = []  # núcleos usados por el servidor
+        self.disponible = os.path.exists('/proc/stat')
+
+    def run(self):
+        if not self.disponible:
+            return
+        ticks = os.sysconf('SC_CLK_TCK')
+        ocupado, total = _cpu_sistema()
+        servidor = _cpu_procesos(self.pids)
+        anterior = time.monotonic()
+        while not self.detener.wait(1):
+            ahora = time.monotonic()
+            nuevo_ocupado, nuevo_total = _cpu_sistema()
+            nuevo_servidor = _cpu_procesos(self.pids)
+            if nuevo_total > total:
+                self.sistema.append(100 * (nuevo_ocupado - ocupado) / (nuevo_total - total))
+            if self.pids:
+                self.servidor.append((nuevo_servidor - servidor) / ticks / (ahora - anterior))
+            ocupado, total, servidor, anterior = nuevo_ocupado, nuevo_total, nuevo_servidor, ahora
+
+    def resumen(self) -> dict:
+        if not self.sistema:
+            return {}
+        resumen = {
+            'nucleos': os.cpu_count(),
+            'sistema_pct_medio': round(sum(self.sistema) / len(self.sistema), 1),
+            'sistema_pct_max': round(max(self.sistema), 1),
+        }
+        if self.servidor:
+            resumen['servidor_nucleos_medio'] = round(sum(self.servidor) / len(self.servidor), 2)
+            resumen['servidor_nucleos_max'] = round(max(self.servidor), 2)
+        return resumen
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga del flujo de estudiantes (inicio -> login -> notas -> logout) con hilos '
+        'concurrentes contra un servidor en marcha (runserver o gunicorn WSGI/ASGI, SQLite o PostgreSQL). '
+        'Con --lectores se agrega carga mixta: usuarios con sesión abierta que solo consultan sus notas. '
+        'Reporta peticiones por segundo, percentiles de latencia por paso y saturación de CPU.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='URL base del servidor')
+        parser.add_argument(
+            '--servidor', choices=['runserver', 'gunicorn', 'uvicorn'],
+            help=(
+                'Levanta el servidor indicado en --url antes de la prueba y lo detiene al final '
+                '(uvicorn: gunicorn con workers ASGI, ver gunicorn.conf.py)'
+            ),
+        )
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Workers de gunicorn')
+        parser.add_argument('--usuarios', type=int, default=10, help='Usuarios virtuales concurrentes')
+        parser.add_argument(
+            '--lectores', type=int, default=0,
+            help='Usuarios adicionales que inician sesión una vez y solo recargan sus notas (paso "lectura")',
+        )
+        parser.add_argument('--duracion', type=float, default=30, help='Segundos de prueba')
+        parser.add_argument('--rampa', type=float, default=0, help='Segundos para arrancar a todos los usuarios')
+        parser.add_argument('--estudiantes', type=int, default=1000, help='Estudiantes distintos a usar')
+        parser.add_argument('--clave', default='clave123', help='Clave de los estudiantes (ver generar_datos)')
+        parser.add_argument('--matriculas', help='Archivo con "matricula[,clave]" por línea en lugar de la base')
+        parser.add_argument('--pid', type=int, action='append', default=[], help='PID del servidor para medir su CPU')
+        parser.add_argument('--json', help='Ruta donde guardar el resultado en JSON')
+
+    def handle(self, *args, **options):
+        credenciales = self.credenciales(options)
+        if not credenciales:
+            raise CommandError('No hay estudiantes con clave. Ejecuta antes: manage.py generar_datos')
+
+        servidor = self.iniciar_servidor(options) if options['servidor'] else None
+        pids = options['pid'] + ([servidor.pid] if servidor else [])
+        try:
+            resultado = self.ejecutar(credenciales, pids, options)
+        finally:
+            if servidor:
+                servidor.terminate()
+                servidor.wait(10)
+
+        self.mostrar(resultado)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+
+    def credenciales(self, options) -> list:
+        if options['matriculas']:
+            with open(options['matriculas'], encoding='utf-8') as archivo:
+                filas = [linea.strip().split(',', 1) for linea in archivo if linea.strip()]
+            return [(f[0], f[1] if len(f) > 1 else options['clave']) for f in filas]
+        matriculas = Estudiante.objects.exclude(clave='').order_by('pk').values_list('matricula', flat=True)
+        return [(m, options['clave']) for m in matriculas[:options['estudiantes']]]
+
+    def iniciar_servidor(self, options):
+        host, _, puerto = options['url'].split('://', 1)[-1].rstrip('/').partition(':')
+        puerto = puerto or '80'
+        # Toda la carga sale de una IP y repite matrículas: sin límites de intentos
+        entorno = {
+            **os.environ, 'ALLOWED_HOSTS_EXTRA': host, 'METRICAS_LOG_NIVEL': 'WARNING', 'LIMITES_ACTIVOS': 'False',
+        }
+        if options['servidor'] in ('gunicorn', 'uvicorn'):
+            entorno['SERVIDOR_MODO'] = 'asgi' if options['servidor'] == 'uvicorn' else 'wsgi'
+            comando = [
+                sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--workers', str(options['workers']),
+                '--bind', f'{host}:{puerto}', '--log-level', 'warning',
+            ]
+        else:
+            comando = [sys.executable, 'manage.py', 'runserver', '--noreload', f'{host}:{puerto}']
+        proceso = subprocess.Popen(
+            comando, cwd=settings.BASE_DIR, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            try:
+                socket.create_connection((host, int(puerto)), timeout=1).close()
+                return proceso
+            except OSError:
+                if proceso.poll() is not None:
+                    raise CommandError(f'El servidor terminó al iniciar (código {proceso.returncode}).')
+                time.sleep(0.2)
+        proceso.terminate()
+        raise CommandError(f'El servidor no respondió en {host}:{puerto}.')
+
+    def ejecutar(self, credenciales, pids, options) -> dict:
+        base = options['url'].rstrip('/') + '/'
+        usuarios = options['usuarios']
+        latencias = defaultdict(list)
+        errores = defaultdict(int)
+        candado = threading.Lock()
+        siguiente = iter(range(sys.maxsize))
+
+        def registrar(paso, inicio, error=None):
+            duracion = (time.perf_counter() - inicio) * 1000
+            with candado:
+                latencias[paso].append(duracion)
+                if error:
+                    errores[f'{paso}: {error}'] += 1
+            return error is None
+
+        def flujo():
+            with candado:
+                matricula, clave = credenciales[next(siguiente) % len(credenciales)]
+            cliente = build_opener(HTTPCookieProcessor(CookieJar()), _SinRedirecciones)
+            inicio_flujo = t = time.perf_counter()
+            estado, _, cuerpo = _pedir(cliente, base)
+            token = RE_CSRF.search(cuerpo.decode('utf-8', 'replace'))
+            if not registrar('inicio', t, None if estado == 200 and token else f'HTTP {estado}'):
+                return
+            t = time.perf_counter()
+            estado, destino, _ = _pedir(cliente, urljoin(base, 'notas/login/'), {
+                'csrfmiddlewaretoken': token.group(1), 'matricula': matricula, 'clave': clave,
+            })
+            # Un login correcto redirige a /notas/<pk>/; uno fallido, al inicio
+            ok = estado == 302 and destino and '/notas/' in destino
+            if not registrar('login', t, None if ok else f'HTTP {estado} -> {destino or "-"}'):
+                return
+            t = time.perf_counter()
+            estado, _, _ = _pedir(cliente, urljoin(base, destino))
+            if not registrar('notas', t, None if estado == 200 else f'HTTP {estado}'):
+                return
+            t = time.perf_counter()
+            estado, _, _ = _pedir(cliente, urljoin(base, 'notas/logout/'))
+            if registrar('logout', t, None if estado == 302 else f'HTTP {estado}'):
+                registrar('flujo', inicio_flujo)
+
+        def leer(fin):
+            with candado:
+                matricula, clave = credenciales[next(siguiente) % len(credenciales)]
+            cliente = build_opener(HTTPCookieProcessor(CookieJar()), _SinRedirecciones)
+            _, _, cuerpo = _pedir(cliente, base)
+            token = RE_CSRF.search(cuerpo.decode('utf-8', 'replace'))
+            destino = token and _pedir(cliente, urljoin(base, 'notas/login/'), {
+                'csrfmiddlewaretoken': token.group(1), 'matricula': matricula, 'clave': clave,
+            })[1]
+            if not destino or '/notas/' not in destino:
+                with candado:
+                    errores['lectura: no pudo iniciar sesión'] += 1
+                return
+            while time.monotonic() < fin:
+                t = time.perf_counter()
+                estado, _, _ = _pedir(cliente, urljoin(base, destino))
+                registrar('lectura', t, None if estado == 200 else f'HTTP {estado}')
+
+        def lector(fin):
+            # Carga mixta: mide cuánto retrasan los logins concurrentes a una lectura barata
+            try:
+                leer(fin)
+            except Exception as e:
+                with candado:
+                    errores[f'conexión: {e.__class__.__name__}'] += 1
+
+        def usuario_virtual(indice, fin):
+            if options['rampa']:
+                time.sleep(options['rampa'] * indice / usuarios)
+            while time.monotonic() < fin:
+                try:
+                    flujo()
+                except Exception as e:  # un error de red no debe detener al usuario virtual
+                    with candado:
+                        errores[f'conexión: {e.__class__.__name__}'] += 1
+
+        muestreador = MuestreadorCPU(pids)
+        muestreador.start()
+        inicio = time.monotonic()
+        fin = inicio + options['duracion'] + options['rampa']
+        with ThreadPoolExecutor(usuarios + options['lectores']) as pool:
+            for indice in range(usuarios):
+                pool.submit(usuario_virtual, indice, fin)
+            for _ in range(options['lectores']):
+                pool.submit(lector, fin)
+        duracion = time.monotonic() - inicio
+        muestreador.detener.set()
+        muestreador.join()
+
+        peticiones = sum(len(latencias[p]) for p in (*PASOS, 'lectura'))
+        pasos = {}
+        for paso in (*PASOS, 'lectura', 'flujo') if options['lectores'] else (*PASOS, 'flujo'):
+            valores = sorted(latencias[paso])
+            pasos[paso] = {
+                'cantidad': len(valores),
+                **{f'p{int(q * 100)}_ms': round(percentil(valores, q), 2) if valores else None for q in CUANTILES},
+                'max_ms': round(valores[-1], 2) if valores else None,
+            }
+        return {
+            'url': options['url'],
+            'servidor': options['servidor'] or 'externo',
+            'usuarios': usuarios,
+            'lectores': options['lectores'],
+            'duracion_s': round(duracion, 2),
+            'peticiones': peticiones,
+            'peticiones_por_segundo': round(peticiones / duracion, 1),
+            'logins_por_segundo': round(len(latencias['login']) / duracion, 1),
+            'flujos_completos': len(latencias['flujo']),
+            'errores': dict(errores),
+            'pasos': pasos,
+            'cpu': muestreador.resumen(),
+            # El generador de carga compite por la CPU si corre en la misma máquina
+            'cpu_generador_s': round(sum(os.times()[:2]), 2),
+        }
+
+    def mostrar(self, resultado):
+        self.stdout.write(
+            f'{resultado["usuarios"]} usuarios, {resultado["duracion_s"]} s: '
+            f'{resultado["peticiones_por_segundo"]} peticiones/s, {resultado["logins_por_segundo"]} logins/s, '
+            f'{resultado["flujos_completos"]} flujos completos'
+        )
+        self.stdout.write(f'{"paso":<8} {"cantidad":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"max ms":>9}')
+        for paso, datos in resultado['pasos'].items():
+            valores = [datos[k] for k in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')]
+            columnas = ' '.join(f'{v:>9.1f}' if v is not None else f'{"-":>9}' for v in valores)
+            self.stdout.write(f'{paso:<8} {datos["cantidad"]:>9} {columnas}')
+        cpu = resultado['cpu']
+        if cpu:
+            linea = f'CPU del sistema: media {cpu["sistema_pct_medio"]}%, máx {cpu["sistema_pct_max"]}% ({cpu["nucleos"]} núcleos)'
+            if 'servidor_nucleos_medio' in cpu:
+                linea += f'; servidor: {cpu["servidor_nucleos_medio"]} núcleos en promedio (máx {cpu["servidor_nucleos_max"]})'
+            self.stdout.write(linea)
+        for error, cantidad in sorted(resultado['errores'].items(), key=lambda e: -e[1]):
+            self.stderr.write(f'{cantidad:>6}  {error}')
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.models import Estudiante
+from gestion.services import actualizar_resumenes, diferencias_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye en lote la tabla ResumenEstudiante y la verifica contra los agregados en vivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Estudiantes por lote (por defecto 1000)')
+        parser.add_argument(
+            '--solo-verificar', action='store_true',
+            help='No reconstruye; solo compara los resúmenes guardados con los agregados en vivo',
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        if lote < 1:
+            raise CommandError('El tamaño de lote debe ser mayor que cero.')
+
+        ids = list(Estudiante.objects.order_by('pk').values_list('pk', flat=True))
+        actualizados = 0
+        diferencias = []
+        for inicio in range(0, len(ids), lote):
+            bloque = ids[inicio:inicio + lote]
+            if not options['solo_verificar']:
+                actualizados += actualizar_resumenes(bloque)
+            diferencias.extend(diferencias_resumenes(bloque))
+
+        if not options['solo_verificar']:
+            self.stdout.write(f'Resúmenes reconstruidos: {actualizados}')
+
+        for pk, campo, guardado, en_vivo in diferencias[:50]:
+            self.stderr.write(f'Estudiante {pk}: {campo} guardado={guardado} en_vivo={en_vivo}')
+        if diferencias:
+            raise CommandError(f'Se encontraron {len(diferencias)} diferencias entre resúmenes y agregados.')
+        self.stdout.write(self.style.SUCCESS(f'Verificados {len(ids)} estudiantes sin diferencias.'))
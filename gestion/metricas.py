@@ -0,0 +1,226 @@
+"""Métricas por vista: consultas SQL, tiempo de SQL, aciertos de cache y latencia.
+
+``MetricasMiddleware`` mide cada petición y acumula los resultados por nombre
+de ruta. Las latencias recientes se guardan en memoria (ventana deslizante
+por proceso) para calcular p50/p95/p99; ``/metrics`` las expone en formato
+de texto de Prometheus.
+
+Las consultas se cuentan con un envoltorio que se instala en cada conexión al
+crearse y que lee la medición de la petición desde una ``ContextVar``: así se
+miden también las vistas async, cuyas consultas corren en otros hilos.
+"""
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Latencias recientes que se conservan por vista
+VENTANA = 1000
+CUANTILES = (0.5, 0.95, 0.99)
+
+_medicion_actual = ContextVar('medicion_actual', default=None)
+
+
+class Medicion:
+    __slots__ = ('consultas', 'tiempo_sql', 'aciertos_cache', 'fallos_cache')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.aciertos_cache = 0
+        self.fallos_cache = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Envoltorio de connection.execute_wrapper
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.tiempo_sql += time.perf_counter() - inicio
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    return medicion(execute, sql, params, many, context)
+
+
+def _instalar_medidor(sender=None, connection=None, **kwargs):
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+connection_created.connect(_instalar_medidor)
+for _conexion in connections.all(initialized_only=True):
+    _instalar_medidor(connection=_conexion)
+
+
+def registrar_cache(acierto: bool) -> None:
+    """Cuenta un acierto o fallo de cache en la petición en curso (si se está midiendo)"""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return
+    if acierto:
+        medicion.aciertos_cache += 1
+    else:
+        medicion.fallos_cache += 1
+
+
+class _Acumulado:
+    def __init__(self):
+        self.peticiones = 0
+        self.errores = 0
+        self.segundos = 0.0
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.aciertos_cache = 0
+        self.fallos_cache = 0
+        self.latencias = deque(maxlen=VENTANA)
+
+
+class Registro:
+    """Acumuladores por vista, seguros entre hilos"""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._vistas = defaultdict(_Acumulado)
+
+    def registrar(self, vista: str, duracion: float, medicion: Medicion, estado: int) -> None:
+        with self._candado:
+            acumulado = self._vistas[vista]
+            acumulado.peticiones += 1
+            acumulado.errores += estado >= 500
+            acumulado.segundos += duracion
+            acumulado.consultas += medicion.consultas
+            acumulado.tiempo_sql += medicion.tiempo_sql
+            acumulado.aciertos_cache += medicion.aciertos_cache
+            acumulado.fallos_cache += medicion.fallos_cache
+            acumulado.latencias.append(duracion)
+
+    def reiniciar(self) -> None:
+        with self._candado:
+            self._vistas.clear()
+
+    def resumen(self) -> dict:
+        """Copia de los acumulados con percentiles de latencia, por vista"""
+        with self._candado:
+            copia = {vista: (vars(a).copy(), sorted(a.latencias)) for vista, a in self._vistas.items()}
+        resultado = {}
+        for vista, (datos, latencias) in sorted(copia.items()):
+            datos.pop('latencias')
+            datos['percentiles'] = {q: percentil(latencias, q) for q in CUANTILES}
+            resultado[vista] = datos
+        return resultado
+
+    def prometheus(self) -> str:
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda, valores):
+            lineas.append(f'# HELP {nombre} {ayuda}')
+            lineas.append(f'# TYPE {nombre} {tipo}')
+            lineas.extend(valores)
+
+        resumen = self.resumen()
+        etiqueta = {vista: f'vista="{_escapar_etiqueta(vista)}"' for vista in resumen}
+        contadores = (
+            ('gestion_peticiones_total', 'peticiones', 'Peticiones atendidas'),
+            ('gestion_peticiones_error_total', 'errores', 'Peticiones con respuesta 5xx'),
+            ('gestion_consultas_sql_total', 'consultas', 'Consultas SQL ejecutadas'),
+            ('gestion_sql_segundos_total', 'tiempo_sql', 'Tiempo acumulado en SQL'),
+            ('gestion_cache_aciertos_total', 'aciertos_cache', 'Aciertos de cache'),
+            ('gestion_cache_fallos_total', 'fallos_cache', 'Fallos de cache (valor recalculado)'),
+        )
+        for nombre, campo, ayuda in contadores:
+            metrica(nombre, 'counter', ayuda, [f'{nombre}{{{etiqueta[v]}}} {d[campo]:g}' for v, d in resumen.items()])
+
+        valores = []
+        for vista, datos in resumen.items():
+            for q, valor in datos['percentiles'].items():
+                if valor is not None:
+                    valores.append(f'gestion_latencia_segundos{{{etiqueta[vista]},quantile="{q}"}} {valor:.6f}')
+            valores.append(f'gestion_latencia_segundos_sum{{{etiqueta[vista]}}} {datos["segundos"]:.6f}')
+            valores.append(f'gestion_latencia_segundos_count{{{etiqueta[vista]}}} {datos["peticiones"]}')
+        metrica(
+            'gestion_latencia_segundos', 'summary',
+            f'Latencia por vista (cuantiles sobre las últimas {VENTANA} peticiones del proceso)', valores,
+        )
+        return '\n'.join(lineas) + '\n'
+
+
+def _escapar_etiqueta(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def percentil(ordenados: list, q: float):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not ordenados:
+        return None
+    return ordenados[max(0, math.ceil(q * len(ordenados)) - 1)]
+
+
+registro = Registro()
+
+
+class MetricasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        return self.registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        return self.registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    def registrar(self, request, response, medicion: Medicion, duracion: float):
+        coincidencia = request.resolver_match
+        vista = coincidencia.view_name if coincidencia else 'sin_ruta'
+        registro.registrar(vista, duracion, medicion, response.status_code)
+
+        response['Server-Timing'] = (
+            f'db;dur={medicion.tiempo_sql * 1000:.1f};desc="{medicion.consultas} consultas", '
+            f'cache;desc="aciertos={medicion.aciertos_cache} fallos={medicion.fallos_cache}", '
+            f'total;dur={duracion * 1000:.1f}'
+        )
+        logger.info(json.dumps({
+            'vista': vista,
+            'metodo': request.method,
+            'estado': response.status_code,
+            'ms': round(duracion * 1000, 2),
+            'consultas': medicion.consultas,
+            'sql_ms': round(medicion.tiempo_sql * 1000, 2),
+            'cache_aciertos': medicion.aciertos_cache,
+            'cache_fallos': medicion.fallos_cache,
+        }))
+        return response
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('gestion', '0003_add_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenEstudiante',
+            fields=[
+                ('estudiante', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen', serialize=False, to='gestion.estudiante')),
+                ('promedio', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('promedio_ponderado', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('total_asignaturas', models.PositiveIntegerField(default=0)),
+                ('aprobadas', models.PositiveIntegerField(default=0)),
+                ('reprobadas', models.PositiveIntegerField(default=0)),
+                ('creditos_totales', models.PositiveIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumen de estudiante',
+                'verbose_name_plural': 'Resúmenes de estudiantes',
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def crear_indices(apps, schema_editor):
+    from gestion.busqueda import instalar_indices
+    instalar_indices(schema_editor.connection)
+
+
+def eliminar_indices(apps, schema_editor):
+    from gestion.busqueda import eliminar_indices
+    eliminar_indices(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('gestion', '0004_resumenestudiante'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
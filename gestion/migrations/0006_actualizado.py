@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0005_indices_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calificacion',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='estudiante',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
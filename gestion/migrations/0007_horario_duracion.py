@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:19
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0006_actualizado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='horario',
+            name='duracion',
+            field=models.PositiveSmallIntegerField(default=90, validators=[django.core.validators.MinValueValidator(15), django.core.validators.MaxValueValidator(600)]),
+        ),
+        migrations.AddIndex(
+            model_name='horario',
+            index=models.Index(fields=['dia', 'aula'], name='horario_dia_aula_idx'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:24
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def inscribir_calificados(apps, schema_editor):
+    """Hasta ahora la calificación era la inscripción: cada una pasa a ser una inscripción.
+
+    El cupo se amplía donde ya había más calificados que el cupo por defecto.
+    """
+    Asignatura = apps.get_model('gestion', 'Asignatura')
+    Calificacion = apps.get_model('gestion', 'Calificacion')
+    Inscripcion = apps.get_model('gestion', 'Inscripcion')
+
+    pares = Calificacion.objects.order_by().values_list('estudiante_id', 'asignatura_id').iterator(chunk_size=5000)
+    lote = []
+    for estudiante_id, asignatura_id in pares:
+        lote.append(Inscripcion(estudiante_id=estudiante_id, asignatura_id=asignatura_id))
+        if len(lote) == 5000:
+            Inscripcion.objects.bulk_create(lote)
+            lote = []
+    Inscripcion.objects.bulk_create(lote)
+
+    conteo = Coalesce(Subquery(
+        Inscripcion.objects.filter(asignatura=OuterRef('pk')).order_by()
+        .values('asignatura').annotate(n=Count('*')).values('n')
+    ), 0)
+    Asignatura.objects.update(inscritos=conteo, cupo=Greatest(F('cupo'), conteo))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0007_horario_duracion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Inscripcion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Inscripciones',
+            },
+        ),
+        migrations.AddField(
+            model_name='asignatura',
+            name='cupo',
+            field=models.PositiveIntegerField(default=40, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='asignatura',
+            name='inscritos',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name='asignatura',
+            constraint=models.CheckConstraint(condition=models.Q(('inscritos__lte', models.F('cupo'))), name='asignatura_inscritos_dentro_del_cupo', violation_error_message='El cupo no puede ser menor que los estudiantes ya inscritos.'),
+        ),
+        migrations.AddField(
+            model_name='inscripcion',
+            name='asignatura',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inscripciones', to='gestion.asignatura'),
+        ),
+        migrations.AddField(
+            model_name='inscripcion',
+            name='estudiante',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inscripciones', to='gestion.estudiante'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='inscripcion',
+            unique_together={('estudiante', 'asignatura')},
+        ),
+        migrations.RunPython(inscribir_calificados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0008_inscripcion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorIntentos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100, unique=True)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('expira', models.FloatField(db_index=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Contadores de intentos',
+            },
+        ),
+    ]
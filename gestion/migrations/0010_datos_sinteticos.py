@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0009_contador_intentos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asignatura',
+            name='sintetico',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='estudiante',
+            name='sintetico',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
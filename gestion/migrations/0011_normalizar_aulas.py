@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def normalizar_aulas(apps, schema_editor):
+    """Deja ``aula`` en la forma canónica que ahora guarda Horario.save (sin espacios sobrantes, en mayúsculas)"""
+    Horario = apps.get_model('gestion', 'Horario')
+    # Pocas aulas distintas: un UPDATE por valor
+    for aula in Horario.objects.order_by().values_list('aula', flat=True).distinct():
+        canonica = ' '.join(aula.split()).upper()
+        if canonica != aula:
+            Horario.objects.filter(aula=aula).update(aula=canonica)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0010_datos_sinteticos'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalizar_aulas, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
-from django.contrib.auth.hashers import make_password, check_password
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .hashers import averificar_clave, hashear_clave, verificar_clave
+
 
 class Estudiante(models.Model):
     nombre = models.CharField(max_length=100, db_index=True)
@@ -11,6 +13,10 @@ class Estudiante(models.Model):
     correo = models.EmailField(unique=True, db_index=True)
     # Almacena la contraseña hasheada
     clave = models.CharField(max_length=128, blank=True, default="")
+    # Fecha de la última edición (no cambia con el cambio de contraseña)
+    actualizado = models.DateTimeField(auto_now=True)
+    # Creado por generar_datos; solo estas filas borra ``generar_datos --limpiar``
+    sintetico = models.BooleanField(default=False, editable=False)
 
     class Meta:
         ordering = ['apellido', 'nombre']
@@ -20,12 +26,68 @@ class Estudiante(models.Model):
 
     # Helpers de contraseña
     def set_clave(self, raw_password: str) -> None:
-        self.clave = make_password(raw_password)
+        self.clave = hashear_clave(raw_password)
 
     def check_clave(self, raw_password: str) -> bool:
         if not self.clave:
             return False
-        return check_password(raw_password, self.clave)
+
+        # Re-hash transparente si la clave se guardó con otra política
+        def actualizar(raw_password):
+            self.set_clave(raw_password)
+            if self.pk:
+                self.save(update_fields=['clave'])
+
+        return verificar_clave(raw_password, self.clave, actualizar)
+
+    async def acheck_clave(self, raw_password: str) -> bool:
+        """check_clave para vistas async: el hash no bloquea el event loop"""
+        if not self.clave:
+            return False
+        correcta, nuevo_hash = await averificar_clave(raw_password, self.clave)
+        if nuevo_hash:
+            self.clave = nuevo_hash
+            if self.pk:
+                await self.asave(update_fields=['clave'])
+        return correcta
+
+
+class ResumenEstudiante(models.Model):
+    """Resumen académico desnormalizado, mantenido por señales de Calificacion"""
+    estudiante = models.OneToOneField(Estudiante, on_delete=models.CASCADE, primary_key=True, related_name='resumen')
+    promedio = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    promedio_ponderado = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    total_asignaturas = models.PositiveIntegerField(default=0)
+    aprobadas = models.PositiveIntegerField(default=0)
+    reprobadas = models.PositiveIntegerField(default=0)
+    creditos_totales = models.PositiveIntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Resumen de estudiante'
+        verbose_name_plural = 'Resúmenes de estudiantes'
+
+    def __str__(self) -> str:
+        return f"Resumen de {self.estudiante_id}: {self.promedio}"
+
+    def como_dict(self) -> dict:
+        return {
+            'promedio': self.promedio,
+            'promedio_ponderado': self.promedio_ponderado,
+            'total_asignaturas': self.total_asignaturas,
+            'aprobadas': self.aprobadas,
+            'reprobadas': self.reprobadas,
+            'creditos_totales': self.creditos_totales,
+        }
+
+
+RESTRICCION_CUPO = 'asignatura_inscritos_dentro_del_cupo'
+MENSAJE_CUPO = 'El cupo no puede ser menor que los estudiantes ya inscritos.'
+
+
+def viola_cupo(error) -> bool:
+    """Si el IntegrityError viene de la restricción ``inscritos <= cupo``"""
+    return RESTRICCION_CUPO in str(error)
 
 
 class Asignatura(models.Model):
@@ -33,18 +95,48 @@ class Asignatura(models.Model):
     nombre = models.CharField(max_length=100, db_index=True)
     creditos = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(30)])
     profesor = models.CharField(max_length=100, db_index=True)
+    cupo = models.PositiveIntegerField(default=40, validators=[MinValueValidator(1)])
+    # Contador desnormalizado de inscripciones; solo lo mueven gestion.inscripciones y la señal de bajas
+    inscritos = models.PositiveIntegerField(default=0, editable=False)
+    # Creada por generar_datos; solo estas filas borra ``generar_datos --limpiar``
+    sintetico = models.BooleanField(default=False, editable=False)
 
     class Meta:
         ordering = ['codigo']
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(inscritos__lte=models.F('cupo')),
+                name=RESTRICCION_CUPO,
+                violation_error_message=MENSAJE_CUPO,
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.codigo} - {self.nombre}"
 
+    def clean(self):
+        super().clean()
+        # ``inscritos`` no está en los formularios y validate_constraints omite la
+        # restricción: se compara con el contador vigente, no con el de la instancia
+        if self.pk and self.cupo is not None:
+            inscritos = Asignatura.objects.filter(pk=self.pk).values_list('inscritos', flat=True).first() or 0
+            if self.cupo < inscritos:
+                raise ValidationError({'cupo': f'{MENSAJE_CUPO} Inscritos: {inscritos}.'})
+
+    def save(self, *args, **kwargs):
+        # El contador lo mueven UPDATE atómicos: guardar una copia leída antes no debe pisarlo
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != 'inscritos'
+            ]
+        super().save(*args, **kwargs)
+
 
 class Calificacion(models.Model):
     estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name='calificaciones', db_index=True)
     asignatura = models.ForeignKey(Asignatura, on_delete=models.CASCADE, related_name='calificaciones', db_index=True)
     nota = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0), MaxValueValidator(100)], db_index=True)
+    actualizado = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('estudiante', 'asignatura')
@@ -54,6 +146,24 @@ class Calificacion(models.Model):
         return f"{self.estudiante} - {self.asignatura}: {self.nota}"
 
 
+class Inscripcion(models.Model):
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name='inscripciones')
+    asignatura = models.ForeignKey(Asignatura, on_delete=models.CASCADE, related_name='inscripciones')
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('estudiante', 'asignatura')
+        verbose_name_plural = 'Inscripciones'
+
+    def __str__(self) -> str:
+        return f"{self.estudiante} - {self.asignatura}"
+
+
+def normalizar_aula(aula: str) -> str:
+    """Forma canónica del aula: sin espacios sobrantes y en mayúsculas"""
+    return ' '.join(aula.split()).upper()
+
+
 class Horario(models.Model):
     DIAS = [
         ('LUN', 'Lunes'),
@@ -67,13 +177,56 @@ class Horario(models.Model):
     asignatura = models.ForeignKey(Asignatura, on_delete=models.CASCADE, related_name='horarios')
     dia = models.CharField(max_length=3, choices=DIAS)
     hora = models.TimeField()
+    # Minutos que la clase ocupa el aula a partir de ``hora``
+    duracion = models.PositiveSmallIntegerField(default=90, validators=[MinValueValidator(15), MaxValueValidator(600)])
+    # Siempre en forma canónica (``normalizar_aula``): los choques se buscan por igualdad
     aula = models.CharField(max_length=50)
 
     class Meta:
         verbose_name_plural = 'Horarios'
         ordering = ['dia', 'hora']
+        indexes = [models.Index(fields=['dia', 'aula'], name='horario_dia_aula_idx')]
 
     def __str__(self) -> str:
         return f"{self.get_dia_display()} {self.hora} - {self.asignatura} ({self.aula})"
 
+    @property
+    def fin(self):
+        minutos = self.hora.hour * 60 + self.hora.minute + self.duracion
+        return self.hora.replace(hour=minutos // 60 % 24, minute=minutos % 60)
+
+    def clean(self):
+        # Choques de aula con los horarios guardados (ver gestion/horarios.py)
+        from .horarios import conflictos_de
+
+        if self.aula:
+            self.aula = normalizar_aula(self.aula)
+        if self.hora is None or self.duracion is None or not self.aula or not self.dia:
+            return
+        if self.hora.hour * 60 + self.hora.minute + self.duracion > 24 * 60:
+            raise ValidationError({'duracion': 'La clase debe terminar el mismo día.'})
+        conflictos = conflictos_de(self)
+        if conflictos:
+            raise ValidationError({'hora': [f'El aula ya está ocupada: {c.primero}' for c in conflictos]})
+
+    def save(self, *args, **kwargs):
+        self.aula = normalizar_aula(self.aula)
+        super().save(*args, **kwargs)
+
+
+class ContadorIntentos(models.Model):
+    """Contador de intentos fallidos por ventana (ver gestion/limites.py).
+
+    Solo se usa cuando la cache ``ratelimit`` no incrementa de forma atómica
+    (cache de archivos o de base de datos).
+    """
+    clave = models.CharField(max_length=100, unique=True)
+    intentos = models.PositiveIntegerField(default=0)
+    # Marca de tiempo Unix a partir de la cual el contador ya no cuenta
+    expira = models.FloatField(db_index=True)
 
+    class Meta:
+        verbose_name_plural = 'Contadores de intentos'
+
+    def __str__(self) -> str:
+        return f"{self.clave}: {self.intentos}"
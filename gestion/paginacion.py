@@ -0,0 +1,148 @@
+"""Paginación por cursor (keyset) para listas grandes.
+
+A diferencia de ``Paginator`` no ejecuta ``COUNT(*)`` ni usa ``OFFSET``: cada
+página se obtiene filtrando a partir de los valores de orden de la última fila
+vista, así que el costo no crece con la profundidad de la página.
+"""
+import base64
+import binascii
+import json
+from decimal import Decimal
+from functools import reduce
+import operator
+
+from django.db import connections
+from django.db.models import Q
+
+
+def _codificar(valores, direccion: str) -> str:
+    datos = json.dumps({'v': valores, 'd': direccion}, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def _decodificar(cursor: str):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return datos['v'], datos['d']
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        return None, None
+
+
+def total_aproximado(queryset):
+    """Total estimado por el planificador, sin ejecutar COUNT(*).
+
+    PostgreSQL: estimación de filas de EXPLAIN (sirve también con filtros).
+    SQLite: estadísticas de ANALYZE (sqlite_stat1), solo sin filtros.
+    Devuelve None cuando no hay estimación disponible.
+    """
+    conexion = connections[queryset.db]
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'postgresql':
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        if conexion.vendor == 'sqlite' and not queryset.query.where and not queryset.query.extra_tables:
+            # sqlite_stat1 solo existe después de ejecutar ANALYZE
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [queryset.model._meta.db_table])
+            fila = cursor.fetchone()
+            return int(fila[0].split()[0]) if fila else None
+    return None
+
+
+class PaginaKeyset:
+    def __init__(self, object_list, next_cursor, previous_cursor, total_aproximado=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total_aproximado = total_aproximado
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Pagina un queryset por cursor.
+
+    ``ordering`` debe identificar cada fila de forma única (agregar ``pk``
+    como desempate) y sus campos no pueden ser nulos. Admite prefijo ``-``
+    para orden descendente y anotaciones del queryset. Con ``values()`` las
+    filas son diccionarios y deben incluir los campos de ``ordering``.
+    """
+
+    def __init__(self, queryset, ordering, per_page: int = 15, con_total: bool = False):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+        self.con_total = con_total
+
+    def _campos(self):
+        return [(campo.lstrip('-'), campo.startswith('-')) for campo in self.ordering]
+
+    def _valores(self, obj):
+        valores = []
+        for campo, _ in self._campos():
+            valor = obj[campo] if isinstance(obj, dict) else getattr(obj, campo)
+            if isinstance(valor, Decimal):
+                valor = str(valor)
+            valores.append(valor)
+        return valores
+
+    def _condicion(self, valores, hacia_adelante: bool) -> Q:
+        # (a, b, c) > (x, y, z)  ->  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        campos = self._campos()
+        alternativas = []
+        for i, (campo, descendente) in enumerate(campos):
+            menor = descendente == hacia_adelante
+            condicion = {f'{campo}__{"lt" if menor else "gt"}': valores[i]}
+            iguales = {f'{c}': valores[j] for j, (c, _) in enumerate(campos[:i])}
+            alternativas.append(Q(**iguales, **condicion))
+        return reduce(operator.or_, alternativas)
+
+    def _orden(self, hacia_adelante: bool):
+        if hacia_adelante:
+            return self.ordering
+        return [c[1:] if c.startswith('-') else f'-{c}' for c in self.ordering]
+
+    def get_page(self, cursor=None) -> PaginaKeyset:
+        valores, direccion = _decodificar(cursor) if cursor else (None, None)
+        if valores is not None and len(valores) != len(self.ordering):
+            valores = None
+        hacia_adelante = valores is None or direccion != 'p'
+
+        queryset = self.queryset
+        if valores is not None:
+            queryset = queryset.filter(self._condicion(valores, hacia_adelante))
+        filas = list(queryset.order_by(*self._orden(hacia_adelante))[:self.per_page + 1])
+        hay_mas = len(filas) > self.per_page
+        filas = filas[:self.per_page]
+        if not hacia_adelante:
+            filas.reverse()
+
+        siguiente = anterior = None
+        if filas:
+            if (hay_mas if hacia_adelante else valores is not None):
+                siguiente = _codificar(self._valores(filas[-1]), 'n')
+            if (valores is not None if hacia_adelante else hay_mas):
+                anterior = _codificar(self._valores(filas[0]), 'p')
+
+        total = total_aproximado(self.queryset) if self.con_total else None
+        return PaginaKeyset(filas, siguiente, anterior, total)
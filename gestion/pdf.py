@@ -0,0 +1,68 @@
+"""Escritor PDF mínimo (texto y líneas) sin dependencias externas.
+
+Usa las fuentes estándar Helvetica con WinAnsiEncoding, suficiente para
+texto en español. No incluye fechas de creación, así que el mismo contenido
+produce siempre los mismos bytes.
+"""
+
+ANCHO_CARTA = 612
+ALTO_CARTA = 792
+
+
+def _escapar(texto: str) -> bytes:
+    datos = str(texto).encode('cp1252', errors='replace')
+    return datos.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+class DocumentoPDF:
+    def __init__(self, titulo: str = ''):
+        self.titulo = titulo
+        self.paginas = []
+
+    def nueva_pagina(self) -> None:
+        self.paginas.append([])
+
+    def texto(self, x: float, y: float, texto: str, tamano: int = 10, negrita: bool = False) -> None:
+        fuente = b'F2' if negrita else b'F1'
+        self.paginas[-1].append(
+            b'BT /%s %d Tf %.2f %.2f Td (%s) Tj ET' % (fuente, tamano, x, y, _escapar(texto))
+        )
+
+    def linea(self, x1: float, y1: float, x2: float, y2: float, grosor: float = 0.5) -> None:
+        self.paginas[-1].append(b'%.2f w %.2f %.2f m %.2f %.2f l S' % (grosor, x1, y1, x2, y2))
+
+    def como_bytes(self) -> bytes:
+        objetos = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            None,  # Pages, se completa cuando se conocen los hijos
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+            b'<< /Title (%s) /Producer (sistema_academico) >>' % _escapar(self.titulo),
+        ]
+        hijos = []
+        for operaciones in self.paginas or [[]]:
+            contenido = b'\n'.join(operaciones)
+            objetos.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(contenido), contenido))
+            objetos.append(
+                b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+                b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>'
+                % (ANCHO_CARTA, ALTO_CARTA, len(objetos))
+            )
+            hijos.append(len(objetos))
+        objetos[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            b' '.join(b'%d 0 R' % n for n in hijos), len(hijos)
+        )
+
+        salida = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        posiciones = []
+        for numero, objeto in enumerate(objetos, start=1):
+            posiciones.append(len(salida))
+            salida += b'%d 0 obj\n%s\nendobj\n' % (numero, objeto)
+        inicio_xref = len(salida)
+        salida += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1)
+        for posicion in posiciones:
+            salida += b'%010d 00000 n \n' % posicion
+        salida += b'trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            len(objetos) + 1, inicio_xref
+        )
+        return bytes(salida)
@@ -0,0 +1,38 @@
+"""Utilidades para pruebas: presupuestos de consultas SQL por vista.
+
+Un presupuesto es el máximo de consultas que una vista puede ejecutar sin
+importar cuántas filas muestre; si una vista pasa a consultar por fila
+(N+1) la prueba falla y lista el SQL ejecutado.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Nombre de ruta -> consultas máximas. Incluye sesión y usuario; con sesiones
+# cached_db (por defecto) leer la sesión no consulta la base de datos.
+PRESUPUESTOS_CONSULTAS = {
+    'dashboard': 2,
+    'estudiantes_list': 4,
+    'asignaturas_list': 4,
+    'notas_estudiante': 2,
+    'exportar_calificaciones': 3,
+    'metricas': 2,
+}
+
+
+class PresupuestoConsultasMixin:
+    """Mixin para ``TestCase`` que verifica el presupuesto de consultas de una vista"""
+
+    def assertPresupuestoConsultas(self, url, maximo: int = None, metodo: str = 'get', **kwargs):
+        with CaptureQueriesContext(connection) as contexto:
+            response = getattr(self.client, metodo)(url, **kwargs)
+            if getattr(response, 'streaming', False):
+                # Las respuestas en streaming consultan mientras se consumen
+                b''.join(response.streaming_content)
+        vista = response.resolver_match.view_name
+        if maximo is None:
+            maximo = PRESUPUESTOS_CONSULTAS[vista]
+        ejecutadas = len(contexto.captured_queries)
+        if ejecutadas > maximo:
+            consultas = '\n'.join(f'  {i}. {q["sql"]}' for i, q in enumerate(contexto.captured_queries, start=1))
+            self.fail(f'{vista} ejecutó {ejecutadas} consultas (presupuesto: {maximo}):\n{consultas}')
+        return response
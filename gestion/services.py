@@ -0,0 +1,312 @@
+from decimal import Decimal
+import hashlib
+
+from django.db.models import Avg, Count, DecimalField, ExpressionWrapper, F, Q, Sum
+
+from .busqueda import buscar
+from .cache_utils import incrementar_version, obtener_o_calcular, obtener_version
+from .models import Estudiante, Asignatura, Calificacion, ResumenEstudiante
+
+# Nota mínima para considerar una asignatura aprobada
+NOTA_APROBATORIA = 60
+
+# Espacio y alias de cache de las estadísticas del panel de administración
+ESPACIO_ESTADISTICAS = 'estadisticas'
+CACHE_ESTADISTICAS = 'stats'
+
+# Espacio de cache de datos derivados de la tabla de estudiantes (facetas)
+ESPACIO_ESTUDIANTES = 'estudiantes'
+
+# Espacio cuya versión cambia con cualquier edición de asignaturas (nombre,
+# código o créditos que muestran las tablas de notas cacheadas)
+ESPACIO_ASIGNATURAS = 'asignaturas'
+
+# Horarios semanales por estudiante: la versión cambia con cualquier edición de
+# horarios o asignaturas. Además cada estudiante tiene su propia versión, que
+# va en la clave y cambia con sus inscripciones.
+ESPACIO_HORARIOS = 'horarios'
+
+# Rangos (inclusive, exclusivo) para la distribución de notas
+RANGOS_NOTAS = [
+    ('0-59', 0, 60),
+    ('60-69', 60, 70),
+    ('70-79', 70, 80),
+    ('80-89', 80, 90),
+    ('90-100', 90, 101),
+]
+
+DOS_DECIMALES = Decimal('0.01')
+
+
+def _agregados() -> dict:
+    """Expresiones de agregación que componen el resumen académico"""
+    return {
+        'total': Count('id'),
+        'promedio': Avg('nota'),
+        'suma_ponderada': Sum(
+            ExpressionWrapper(
+                F('nota') * F('asignatura__creditos'),
+                output_field=DecimalField(max_digits=9, decimal_places=2),
+            )
+        ),
+        'creditos': Sum('asignatura__creditos'),
+        'aprobadas': Count('id', filter=Q(nota__gte=NOTA_APROBATORIA)),
+    }
+
+
+def _resumen_desde_agregados(datos: dict) -> dict:
+    total = datos['total']
+    creditos = datos['creditos'] or 0
+    suma_ponderada = datos['suma_ponderada'] or Decimal(0)
+    return {
+        'promedio': datos['promedio'],
+        'promedio_ponderado': suma_ponderada / creditos if creditos else None,
+        'total_asignaturas': total,
+        'aprobadas': datos['aprobadas'],
+        'reprobadas': total - datos['aprobadas'],
+        'creditos_totales': creditos,
+    }
+
+
+def resumen_academico(estudiante) -> dict:
+    """Resumen académico del estudiante calculado en una sola consulta agregada"""
+    datos = Calificacion.objects.filter(estudiante=estudiante).aggregate(**_agregados())
+    return _resumen_desde_agregados(datos)
+
+
+def resumen_desde_calificaciones(calificaciones) -> dict:
+    """Resumen académico en una sola pasada sobre calificaciones ya cargadas.
+
+    Las calificaciones deben traer la asignatura con select_related para no
+    generar consultas adicionales.
+    """
+    total = aprobadas = creditos = 0
+    suma_notas = suma_ponderada = Decimal(0)
+    for cal in calificaciones:
+        creditos_asignatura = cal.asignatura.creditos
+        total += 1
+        suma_notas += cal.nota
+        suma_ponderada += cal.nota * creditos_asignatura
+        creditos += creditos_asignatura
+        if cal.nota >= NOTA_APROBATORIA:
+            aprobadas += 1
+    return {
+        'promedio': suma_notas / total if total else None,
+        'promedio_ponderado': suma_ponderada / creditos if creditos else None,
+        'total_asignaturas': total,
+        'aprobadas': aprobadas,
+        'reprobadas': total - aprobadas,
+        'creditos_totales': creditos,
+    }
+
+
+def _redondear(valor):
+    if valor is None:
+        return None
+    return Decimal(valor).quantize(DOS_DECIMALES)
+
+
+def resumenes_en_vivo(estudiante_ids) -> dict:
+    """Resúmenes calculados en vivo para varios estudiantes con una consulta agrupada"""
+    vacio = {'total': 0, 'promedio': None, 'suma_ponderada': None, 'creditos': None, 'aprobadas': 0}
+    resumenes = {pk: _resumen_desde_agregados(vacio) for pk in estudiante_ids}
+    filas = (
+        Calificacion.objects.filter(estudiante_id__in=estudiante_ids)
+        .values('estudiante_id')
+        .annotate(**_agregados())
+        .order_by()
+    )
+    for fila in filas:
+        resumenes[fila['estudiante_id']] = _resumen_desde_agregados(fila)
+    return resumenes
+
+
+def actualizar_resumenes(estudiante_ids) -> int:
+    """Recalcula y guarda los resúmenes de los estudiantes indicados.
+
+    Los estudiantes que ya no existen se ignoran, así que es seguro llamarla
+    después de un borrado en cascada.
+    """
+    existentes = list(Estudiante.objects.filter(pk__in=set(estudiante_ids)).values_list('pk', flat=True))
+    if not existentes:
+        return 0
+    filas = [
+        ResumenEstudiante(
+            estudiante_id=pk,
+            promedio=_redondear(resumen['promedio']),
+            promedio_ponderado=_redondear(resumen['promedio_ponderado']),
+            total_asignaturas=resumen['total_asignaturas'],
+            aprobadas=resumen['aprobadas'],
+            reprobadas=resumen['reprobadas'],
+            creditos_totales=resumen['creditos_totales'],
+        )
+        for pk, resumen in resumenes_en_vivo(existentes).items()
+    ]
+    ResumenEstudiante.objects.bulk_create(
+        filas,
+        update_conflicts=True,
+        unique_fields=['estudiante'],
+        update_fields=[
+            'promedio', 'promedio_ponderado', 'total_asignaturas',
+            'aprobadas', 'reprobadas', 'creditos_totales', 'actualizado',
+        ],
+    )
+    return len(filas)
+
+
+def invalidar_por_calificaciones(estudiante_ids, tamano_lote: int = 1000) -> None:
+    """Mantiene los datos derivados tras escrituras masivas que no disparan señales"""
+    ids = list(estudiante_ids)
+    for inicio in range(0, len(ids), tamano_lote):
+        actualizar_resumenes(ids[inicio:inicio + tamano_lote])
+    incrementar_version(ESPACIO_ESTADISTICAS, CACHE_ESTADISTICAS)
+
+
+def invalidar_por_estudiantes() -> None:
+    """Equivalente a las señales de Estudiante para altas masivas con ``bulk_create``"""
+    incrementar_version(ESPACIO_ESTUDIANTES, CACHE_ESTADISTICAS)
+    incrementar_version(ESPACIO_ESTADISTICAS, CACHE_ESTADISTICAS)
+
+
+def invalidar_por_asignaturas() -> None:
+    """Equivalente a las señales de Asignatura y Horario para altas masivas con ``bulk_create``"""
+    incrementar_version(ESPACIO_ASIGNATURAS, CACHE_ESTADISTICAS)
+    incrementar_version(ESPACIO_HORARIOS, CACHE_ESTADISTICAS)
+    incrementar_version(ESPACIO_ESTADISTICAS, CACHE_ESTADISTICAS)
+
+
+def _espacio_horario(estudiante_id) -> str:
+    return f'{ESPACIO_HORARIOS}:{estudiante_id}'
+
+
+def clave_horario(estudiante_id) -> str:
+    """Clave del horario semanal con la versión propia del estudiante (una lectura de cache)"""
+    version = obtener_version(_espacio_horario(estudiante_id), CACHE_ESTADISTICAS)
+    return f'estudiante:{estudiante_id}:{version}'
+
+
+def invalidar_horarios(estudiante_ids) -> None:
+    """Invalida el horario semanal cacheado de esos estudiantes.
+
+    Incrementa su versión en lugar de borrar la entrada: un cálculo que empezó
+    antes de la invalidación guarda el horario viejo bajo la clave anterior,
+    que ya nadie lee.
+    """
+    for estudiante_id in estudiante_ids:
+        incrementar_version(_espacio_horario(estudiante_id), CACHE_ESTADISTICAS)
+
+
+def ultima_modificacion_notas(estudiante):
+    """Fecha del último cambio visible en las notas del estudiante, o None si aún no tiene resumen.
+
+    Es la más reciente entre el estudiante, su última calificación (anotación
+    ``ultima_calificacion`` de la consulta de identidad) y su resumen, que se
+    recalcula con cada cambio de sus calificaciones, borrados incluidos
+    (señales o ``invalidar_por_calificaciones``).
+    """
+    try:
+        resumen = estudiante.resumen.actualizado
+    except ResumenEstudiante.DoesNotExist:
+        return None
+    return max(filter(None, (estudiante.actualizado, resumen, getattr(estudiante, 'ultima_calificacion', None))))
+
+
+def version_notas(estudiante):
+    """Sello de versión de las notas del estudiante (fecha de su último cambio y versión de las asignaturas)"""
+    fecha = ultima_modificacion_notas(estudiante)
+    if fecha is None:
+        return None
+    return f'{fecha.timestamp():.6f}-{obtener_version(ESPACIO_ASIGNATURAS, CACHE_ESTADISTICAS)}'
+
+
+def diferencias_resumenes(estudiante_ids) -> list:
+    """Compara los resúmenes guardados con los agregados en vivo.
+
+    Devuelve una lista de tuplas (estudiante_id, campo, guardado, en_vivo).
+    """
+    guardados = {r.estudiante_id: r for r in ResumenEstudiante.objects.filter(estudiante_id__in=estudiante_ids)}
+    diferencias = []
+    for pk, vivo in resumenes_en_vivo(estudiante_ids).items():
+        resumen = guardados.get(pk)
+        if resumen is None:
+            diferencias.append((pk, 'resumen', None, 'faltante'))
+            continue
+        guardado = resumen.como_dict()
+        for campo, valor in vivo.items():
+            if campo in ('promedio', 'promedio_ponderado'):
+                valor = _redondear(valor)
+            if guardado[campo] != valor:
+                diferencias.append((pk, campo, guardado[campo], valor))
+    return diferencias
+
+
+def calcular_estadisticas() -> dict:
+    """Estadísticas globales del sistema (sin cache)"""
+    por_carrera = list(
+        Estudiante.objects.values('carrera').annotate(total=Count('id')).order_by('-total', 'carrera')
+    )
+    globales = Calificacion.objects.aggregate(
+        total=Count('id'),
+        promedio=Avg('nota'),
+        aprobadas=Count('id', filter=Q(nota__gte=NOTA_APROBATORIA)),
+        **{
+            f'rango_{i}': Count('id', filter=Q(nota__gte=desde, nota__lt=hasta))
+            for i, (_, desde, hasta) in enumerate(RANGOS_NOTAS)
+        },
+    )
+    por_asignatura = []
+    filas = Asignatura.objects.annotate(
+        promedio=Avg('calificaciones__nota'),
+        total=Count('calificaciones'),
+        aprobadas=Count('calificaciones', filter=Q(calificaciones__nota__gte=NOTA_APROBATORIA)),
+    ).values('codigo', 'nombre', 'promedio', 'total', 'aprobadas')
+    for fila in filas:
+        fila['tasa_aprobacion'] = fila['aprobadas'] * 100 / fila['total'] if fila['total'] else None
+        por_asignatura.append(fila)
+
+    total = globales['total']
+    return {
+        'total_estudiantes': sum(c['total'] for c in por_carrera),
+        'total_asignaturas': len(por_asignatura),
+        'total_calificaciones': total,
+        'promedio_general': globales['promedio'],
+        'tasa_aprobacion': globales['aprobadas'] * 100 / total if total else None,
+        'por_carrera': por_carrera,
+        'distribucion_notas': [
+            {'rango': etiqueta, 'total': globales[f'rango_{i}']}
+            for i, (etiqueta, _, _) in enumerate(RANGOS_NOTAS)
+        ],
+        'por_asignatura': por_asignatura,
+    }
+
+
+def estadisticas_dashboard() -> dict:
+    """Estadísticas del panel de administración, cacheadas con versión"""
+    return obtener_o_calcular(
+        ESPACIO_ESTADISTICAS, 'dashboard', calcular_estadisticas, timeout=300, alias=CACHE_ESTADISTICAS
+    )
+
+
+def _contar_por_carrera(queryset) -> dict:
+    filas = queryset.order_by().values('carrera').annotate(total=Count('id'))
+    return {fila['carrera']: fila['total'] for fila in filas}
+
+
+def calcular_facetas_carrera(query: str = '') -> list:
+    totales = _contar_por_carrera(Estudiante.objects.all())
+    coincidencias = _contar_por_carrera(buscar(Estudiante.objects.all(), query)) if query else totales
+    return [
+        {'carrera': carrera, 'total': total, 'coincidencias': coincidencias.get(carrera, 0)}
+        for carrera, total in sorted(totales.items())
+    ]
+
+
+def facetas_carrera(query: str = '') -> list:
+    """Carreras con su número de estudiantes y de coincidencias con la búsqueda.
+
+    Se cachea por búsqueda y se invalida al crear, editar o eliminar estudiantes.
+    """
+    clave = 'facetas:' + hashlib.md5(query.encode()).hexdigest()
+    return obtener_o_calcular(
+        ESPACIO_ESTUDIANTES, clave, lambda: calcular_facetas_carrera(query), timeout=600, alias=CACHE_ESTADISTICAS
+    )
@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache_utils import incrementar_version
+from .models import Estudiante, Asignatura, Calificacion, Horario, Inscripcion
+from .services import (
+    CACHE_ESTADISTICAS, ESPACIO_ASIGNATURAS, ESPACIO_ESTADISTICAS, ESPACIO_ESTUDIANTES, ESPACIO_HORARIOS,
+    actualizar_resumenes, invalidar_horarios,
+)
+
+
+def programar_resumen(estudiante_ids) -> None:
+    """Actualiza los resúmenes al confirmar la transacción en curso"""
+    ids = list(estudiante_ids)
+    if ids:
+        transaction.on_commit(lambda: actualizar_resumenes(ids))
+
+
+@receiver(post_save, sender=Calificacion)
+@receiver(post_delete, sender=Calificacion)
+def calificacion_modificada(sender, instance, **kwargs):
+    programar_resumen([instance.estudiante_id])
+
+
+@receiver(pre_save, sender=Asignatura)
+def recordar_creditos(sender, instance, **kwargs):
+    # Guardamos los créditos previos para detectar cambios en post_save
+    if instance.pk:
+        instance._creditos_previos = (
+            Asignatura.objects.filter(pk=instance.pk).values_list('creditos', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Asignatura)
+def asignatura_guardada(sender, instance, created, **kwargs):
+    previos = getattr(instance, '_creditos_previos', None)
+    if created or previos is None or previos == instance.creditos:
+        return
+    programar_resumen(
+        Calificacion.objects.filter(asignatura=instance).values_list('estudiante_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Estudiante)
+@receiver(post_delete, sender=Estudiante)
+@receiver(post_save, sender=Asignatura)
+@receiver(post_delete, sender=Asignatura)
+@receiver(post_save, sender=Calificacion)
+@receiver(post_delete, sender=Calificacion)
+def invalidar_estadisticas(sender, update_fields=None, **kwargs):
+    # Cualquier escritura (vistas, admin o scripts) invalida las estadísticas,
+    # salvo el cambio de contraseña, que no las afecta.
+    if update_fields is not None and set(update_fields) == {'clave'}:
+        return
+    transaction.on_commit(lambda: incrementar_version(ESPACIO_ESTADISTICAS, CACHE_ESTADISTICAS))
+
+
+@receiver(post_save, sender=Estudiante)
+@receiver(post_delete, sender=Estudiante)
+def invalidar_facetas(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'clave'}:
+        return
+    transaction.on_commit(lambda: incrementar_version(ESPACIO_ESTUDIANTES, CACHE_ESTADISTICAS))
+
+
+@receiver(post_save, sender=Asignatura)
+@receiver(post_delete, sender=Asignatura)
+def invalidar_asignaturas(sender, **kwargs):
+    # Las tablas de notas cacheadas muestran nombre, código y créditos
+    transaction.on_commit(lambda: incrementar_version(ESPACIO_ASIGNATURAS, CACHE_ESTADISTICAS))
+
+
+@receiver(post_save, sender=Asignatura)
+@receiver(post_delete, sender=Asignatura)
+@receiver(post_save, sender=Horario)
+@receiver(post_delete, sender=Horario)
+def invalidar_horarios_semanales(sender, **kwargs):
+    # Afecta a todos los inscritos en la asignatura: se invalida el espacio completo
+    transaction.on_commit(lambda: incrementar_version(ESPACIO_HORARIOS, CACHE_ESTADISTICAS))
+
+
+@receiver(post_delete, sender=Inscripcion)
+def liberar_cupo(sender, instance, **kwargs):
+    # Las altas ocupan el lugar en gestion.inscripciones; las bajas lo liberan aquí
+    Asignatura.objects.filter(pk=instance.asignatura_id, inscritos__gt=0).update(inscritos=F('inscritos') - 1)
+
+
+@receiver(post_save, sender=Inscripcion)
+@receiver(post_delete, sender=Inscripcion)
+def invalidar_horario_estudiante(sender, instance, **kwargs):
+    # Cambió una asignatura inscrita del estudiante: solo se invalida su horario
+    estudiante_id = instance.estudiante_id
+    transaction.on_commit(lambda: invalidar_horarios([estudiante_id]))
@@ -0,0 +1,91 @@
+"""Generación de datos sintéticos para benchmarks y pruebas de carga"""
+import random
+from datetime import time
+from decimal import Decimal
+
+from .models import Estudiante, Asignatura, Calificacion, Horario, normalizar_aula
+
+NOMBRES = [
+    'Ana', 'Luis', 'María', 'José', 'Carmen', 'Juan', 'Rosa', 'Pedro', 'Laura', 'Carlos',
+    'Elena', 'Miguel', 'Sofía', 'Andrés', 'Lucía', 'Diego', 'Paula', 'Javier', 'Isabel', 'Rafael',
+]
+APELLIDOS = [
+    'Pérez', 'Gómez', 'Rodríguez', 'Fernández', 'López', 'Martínez', 'Sánchez', 'Díaz', 'Ramírez', 'Torres',
+    'Flores', 'Rivera', 'Castillo', 'Herrera', 'Medina', 'Reyes', 'Morales', 'Ortiz', 'Vargas', 'Santos',
+]
+CARRERAS = [
+    'Ingeniería de Software', 'Medicina', 'Derecho', 'Arquitectura', 'Administración',
+    'Contabilidad', 'Psicología', 'Ingeniería Civil', 'Economía', 'Educación',
+]
+
+TEMAS = [
+    'Cálculo', 'Álgebra Lineal', 'Física', 'Química', 'Programación', 'Estadística', 'Anatomía',
+    'Derecho Civil', 'Microeconomía', 'Contabilidad Financiera', 'Psicología General', 'Dibujo Técnico',
+    'Bases de Datos', 'Redes', 'Ética', 'Metodología de la Investigación', 'Didáctica', 'Marketing',
+]
+NIVELES = ['I', 'II', 'III', 'IV']
+DIAS = [dia for dia, _ in Horario.DIAS]
+# Prefijos de la numeración sintética; las filas se reconocen (y limpian) por
+# el campo ``sintetico``, porque un dato real puede compartir el prefijo
+PREFIJO_MATRICULA = 'S'
+PREFIJO_ASIGNATURA = 'SIN'
+
+
+def estudiantes_sinteticos(cantidad: int, inicio: int = 0, clave: str = '', semilla: int = 42):
+    """Genera instancias de Estudiante (sin guardar) con matrícula y correo únicos"""
+    aleatorio = random.Random(semilla + inicio)
+    for i in range(inicio, inicio + cantidad):
+        yield Estudiante(
+            nombre=aleatorio.choice(NOMBRES),
+            apellido=aleatorio.choice(APELLIDOS),
+            matricula=f'{PREFIJO_MATRICULA}{i:08d}',
+            carrera=aleatorio.choice(CARRERAS),
+            correo=f'estudiante{i}@universidad.test',
+            clave=clave,
+            sintetico=True,
+        )
+
+
+def asignaturas_sinteticas(cantidad: int, inicio: int = 0, semilla: int = 42):
+    """Genera instancias de Asignatura (sin guardar) con código ``SIN###`` único"""
+    aleatorio = random.Random(semilla + inicio)
+    for i in range(inicio, inicio + cantidad):
+        tema = TEMAS[i % len(TEMAS)]
+        nivel = NIVELES[(i // len(TEMAS)) % len(NIVELES)]
+        yield Asignatura(
+            codigo=f'{PREFIJO_ASIGNATURA}{i:04d}',
+            nombre=f'{tema} {nivel}',
+            creditos=aleatorio.randint(2, 6),
+            profesor=f'{aleatorio.choice(NOMBRES)} {aleatorio.choice(APELLIDOS)}',
+            sintetico=True,
+        )
+
+
+def horarios_sinteticos(asignaturas, sesiones: int = 2, aulas: int = 40, semilla: int = 42):
+    """Genera Horario (sin guardar) para asignaturas ya guardadas; puede producir choques de aula"""
+    aleatorio = random.Random(semilla)
+    for asignatura in asignaturas:
+        for dia in aleatorio.sample(DIAS, sesiones):
+            yield Horario(
+                asignatura=asignatura,
+                dia=dia,
+                hora=time(aleatorio.randint(7, 19)),
+                duracion=aleatorio.choice((60, 90, 120)),
+                # bulk_create no pasa por save(): se normaliza aquí
+                aula=normalizar_aula(f'Aula {aleatorio.randint(1, aulas)}'),
+            )
+
+
+def calificaciones_sinteticas(estudiantes, asignaturas, por_estudiante: int, semilla: int = 42):
+    """Genera Calificacion (sin guardar) para estudiantes y asignaturas ya guardados.
+
+    Las notas siguen una normal (media 72, desviación 15) acotada a 0-100.
+    """
+    aleatorio = random.Random(semilla)
+    por_estudiante = min(por_estudiante, len(asignaturas))
+    for estudiante in estudiantes:
+        for asignatura in aleatorio.sample(asignaturas, por_estudiante):
+            nota = min(100.0, max(0.0, aleatorio.gauss(72, 15)))
+            yield Calificacion(
+                estudiante=estudiante, asignatura=asignatura, nota=Decimal(f'{nota:.2f}'),
+            )
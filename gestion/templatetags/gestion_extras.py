@@ -0,0 +1,11 @@
+from django import template
+
+from gestion.services import estadisticas_dashboard
+
+register = template.Library()
+
+
+@register.simple_tag
+def estadisticas():
+    """Estadísticas cacheadas para el panel de administración"""
+    return estadisticas_dashboard()
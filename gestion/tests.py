@@ -1,5 +1,57 @@
-from django.test import TestCase
-from .models import Estudiante
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from itertools import combinations
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.contrib.sessions.models import Session
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management.base import CommandError
+from django.db import connection
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.http import HttpResponse
+from django.test import Client, LiveServerTestCase, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .admin import EstudianteAdmin
+from .busqueda import buscar
+from .hashers import crear_hasher
+from . import horarios
+from .horarios import Franja, clave_aula, detectar_conflictos
+from .decorators import limitar
+from .limites import identificador, liberar, reservar
+from .metricas import percentil, registro
+from .pruebas import PresupuestoConsultasMixin
+from .constancias import datos_constancia, ruta_constancia, solicitar_constancia
+from .exportacion import exportar
+from .inscripciones import CupoAgotado, YaInscrito, inscribir, inscribir_lote
+from .importacion import OBLIGATORIAS_ESTUDIANTES, ReporteImportacion, importar_calificaciones, inscribir_estudiantes, leer_csv
+from .paginacion import KeysetPaginator
+from .cache_utils import obtener_o_calcular, obtener_version, incrementar_version
+from .models import Estudiante, Asignatura, Calificacion, ContadorIntentos, Horario, Inscripcion, ResumenEstudiante
+from .services import resumen_academico, resumen_desde_calificaciones, estadisticas_dashboard, facetas_carrera
+
+# Política de claves barata para no pagar el costo de producción en cada test
+CLAVES_RAPIDAS = {'CLAVES_ALGORITMO': 'pbkdf2_sha256', 'CLAVES_PARAMETROS': {'iterations': 1000}}
 
 
 class EstudianteModelTest(TestCase):
@@ -15,3 +67,1453 @@ class EstudianteModelTest(TestCase):
         self.assertEqual(Estudiante.objects.count(), 1)
 
 
+class ResumenAcademicoTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.estudiante = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001',
+            carrera='Ingeniería', correo='ana.perez@example.com',
+        )
+        mat = Asignatura.objects.create(codigo='MAT101', nombre='Cálculo', creditos=4, profesor='Gómez')
+        fis = Asignatura.objects.create(codigo='FIS101', nombre='Física', creditos=2, profesor='Ruiz')
+        Calificacion.objects.create(estudiante=cls.estudiante, asignatura=mat, nota=Decimal('90'))
+        Calificacion.objects.create(estudiante=cls.estudiante, asignatura=fis, nota=Decimal('45'))
+
+    def test_resumen_agregado(self):
+        with self.assertNumQueries(1):
+            resumen = resumen_academico(self.estudiante)
+        self.assertEqual(resumen['total_asignaturas'], 2)
+        self.assertEqual(resumen['aprobadas'], 1)
+        self.assertEqual(resumen['reprobadas'], 1)
+        self.assertEqual(resumen['creditos_totales'], 6)
+        self.assertEqual(Decimal(resumen['promedio']).quantize(Decimal('0.01')), Decimal('67.50'))
+        self.assertEqual(resumen['promedio_ponderado'], Decimal('75'))
+
+    def test_resumen_en_una_pasada_coincide(self):
+        calificaciones = list(self.estudiante.calificaciones.select_related('asignatura'))
+        with self.assertNumQueries(0):
+            resumen = resumen_desde_calificaciones(calificaciones)
+        esperado = resumen_academico(self.estudiante)
+        self.assertEqual(resumen['promedio'], Decimal(esperado['promedio']))
+        for campo in ('promedio_ponderado', 'total_asignaturas', 'aprobadas', 'reprobadas', 'creditos_totales'):
+            self.assertEqual(resumen[campo], esperado[campo])
+
+    def test_resumen_sin_calificaciones(self):
+        otro = Estudiante.objects.create(
+            nombre='Luis', apellido='Díaz', matricula='A002',
+            carrera='Derecho', correo='luis.diaz@example.com',
+        )
+        resumen = resumen_academico(otro)
+        self.assertIsNone(resumen['promedio'])
+        self.assertIsNone(resumen['promedio_ponderado'])
+        self.assertEqual(resumen['creditos_totales'], 0)
+        self.assertEqual(resumen_desde_calificaciones([]), resumen)
+
+    def test_vista_notas_numero_de_consultas(self):
+        session = self.client.session
+        session['estudiante_id'] = self.estudiante.pk
+        session.save()
+        url = reverse('notas_estudiante', args=[self.estudiante.pk])
+        # Estudiante + calificaciones (la sesión se lee de la cache)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['aprobadas'], 1)
+        self.assertEqual(response.context['creditos_totales'], 6)
+
+
+class ResumenEstudianteTest(TestCase):
+    def setUp(self):
+        self.estudiante = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001',
+            carrera='Ingeniería', correo='ana.perez@example.com',
+        )
+        self.mat = Asignatura.objects.create(codigo='MAT101', nombre='Cálculo', creditos=4, profesor='Gómez')
+
+    def test_senales_mantienen_resumen(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cal = Calificacion.objects.create(estudiante=self.estudiante, asignatura=self.mat, nota=Decimal('80'))
+        resumen = ResumenEstudiante.objects.get(estudiante=self.estudiante)
+        self.assertEqual(resumen.promedio, Decimal('80.00'))
+        self.assertEqual(resumen.creditos_totales, 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mat.creditos = 6
+            self.mat.save()
+        resumen.refresh_from_db()
+        self.assertEqual(resumen.creditos_totales, 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cal.delete()
+        resumen.refresh_from_db()
+        self.assertEqual(resumen.total_asignaturas, 0)
+        self.assertIsNone(resumen.promedio)
+
+    def test_borrar_estudiante_con_calificaciones(self):
+        Calificacion.objects.create(estudiante=self.estudiante, asignatura=self.mat, nota=Decimal('80'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.estudiante.delete()
+        self.assertFalse(ResumenEstudiante.objects.exists())
+
+    def test_comando_reconstruye_y_verifica(self):
+        # bulk_create no dispara señales: el resumen queda desactualizado
+        Calificacion.objects.bulk_create([
+            Calificacion(estudiante=self.estudiante, asignatura=self.mat, nota=Decimal('50')),
+        ])
+        with self.assertRaises(CommandError):
+            call_command('reconstruir_resumenes', '--solo-verificar', stdout=StringIO(), stderr=StringIO())
+        salida = StringIO()
+        call_command('reconstruir_resumenes', stdout=salida)
+        self.assertIn('sin diferencias', salida.getvalue())
+        self.assertEqual(ResumenEstudiante.objects.get(estudiante=self.estudiante).reprobadas, 1)
+
+    def test_vista_lee_resumen_guardado(self):
+        ResumenEstudiante.objects.create(estudiante=self.estudiante, promedio=Decimal('91.50'), aprobadas=3, total_asignaturas=3)
+        session = self.client.session
+        session['estudiante_id'] = self.estudiante.pk
+        session.save()
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('notas_estudiante', args=[self.estudiante.pk]))
+        self.assertEqual(response.context['promedio'], Decimal('91.50'))
+        self.assertEqual(response.context['aprobadas'], 3)
+
+
+class FragmentoNotasTest(TestCase):
+    def setUp(self):
+        limpiar_caches()
+        self.estudiante = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001',
+            carrera='Ingeniería', correo='ana.perez@example.com',
+        )
+        self.mat = Asignatura.objects.create(codigo='MAT101', nombre='Cálculo', creditos=4, profesor='Gómez')
+        with self.captureOnCommitCallbacks(execute=True):
+            Calificacion.objects.create(estudiante=self.estudiante, asignatura=self.mat, nota=Decimal('80'))
+        session = self.client.session
+        session['estudiante_id'] = self.estudiante.pk
+        session.save()
+        self.url = reverse('notas_estudiante', args=[self.estudiante.pk])
+
+    def test_fragmento_evita_la_consulta_de_calificaciones(self):
+        self.client.get(self.url)
+        # Solo el estudiante con su resumen: la tabla sale del fragmento
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Cálculo')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_senales_invalidan_el_fragmento(self):
+        self.client.get(self.url)
+        fis = Asignatura.objects.create(codigo='FIS101', nombre='Física', creditos=3, profesor='Ruiz')
+        with self.captureOnCommitCallbacks(execute=True):
+            Calificacion.objects.create(estudiante=self.estudiante, asignatura=fis, nota=Decimal('50'))
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Física')
+        self.assertEqual(response.context['reprobadas'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mat.nombre = 'Cálculo I'
+            self.mat.save()
+        self.assertContains(self.client.get(self.url), 'Cálculo I')
+
+    def test_sin_resumen_no_se_cachea(self):
+        ResumenEstudiante.objects.filter(estudiante=self.estudiante).delete()
+        self.client.get(self.url)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_plantillas_compiladas_en_cache(self):
+        cargadores = engines['django'].engine.template_loaders
+        self.assertEqual([type(c) for c in cargadores], [CachedLoader])
+
+
+class RespuestasCondicionalesTest(TestCase):
+    def setUp(self):
+        limpiar_caches()
+        self.estudiante = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001',
+            carrera='Ingeniería', correo='ana.perez@example.com',
+        )
+        self.mat = Asignatura.objects.create(codigo='MAT101', nombre='Cálculo', creditos=4, profesor='Gómez')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.calificacion = Calificacion.objects.create(
+                estudiante=self.estudiante, asignatura=self.mat, nota=Decimal('80'),
+            )
+        session = self.client.session
+        session['estudiante_id'] = self.estudiante.pk
+        session.save()
+        self.url = reverse('notas_estudiante', args=[self.estudiante.pk])
+
+    def test_notas_responde_304_sin_consultar_calificaciones(self):
+        self.client.get(self.url)  # el primer render fija la cookie CSRF, que forma parte de la etiqueta
+        response = self.client.get(self.url)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertTrue(response.has_header('Last-Modified'))
+        # Solo la identidad del estudiante, que trae su sello de versión
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_mensajes_pendientes_desactivan_el_304(self):
+        self.client.get(self.url)
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(reverse('cambiar_clave', args=[self.estudiante.pk]), {})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Corrige los errores del formulario.')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(self.client.get(self.url)['ETag'], etag)
+
+    def test_cambios_invalidan_la_etiqueta(self):
+        self.client.get(self.url)
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.calificacion.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mat.nombre = 'Cálculo I'
+            self.mat.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_listas_y_exportacion(self):
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+        for ruta, parametros in (
+            ('estudiantes_list', {}), ('asignaturas_list', {}), ('exportar_calificaciones', {'tipo': 'historial'}),
+        ):
+            url = reverse(ruta)
+            etag = self.client.get(url, parametros)['ETag']
+            self.assertEqual(self.client.get(url, parametros, HTTP_IF_NONE_MATCH=etag).status_code, 304, ruta)
+            with self.captureOnCommitCallbacks(execute=True):
+                Estudiante.objects.filter(pk=self.estudiante.pk).first().save()
+                self.mat.save()
+            self.assertEqual(self.client.get(url, parametros, HTTP_IF_NONE_MATCH=etag).status_code, 200, ruta)
+
+
+def limpiar_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+class EstadisticasCacheTest(TestCase):
+    def setUp(self):
+        limpiar_caches()
+        self.estudiante = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001',
+            carrera='Ingeniería', correo='ana.perez@example.com',
+        )
+        self.mat = Asignatura.objects.create(codigo='MAT101', nombre='Cálculo', creditos=4, profesor='Gómez')
+
+    def test_escrituras_incrementan_version(self):
+        stats = estadisticas_dashboard()
+        self.assertEqual(stats['total_calificaciones'], 0)
+        with self.assertNumQueries(0):
+            estadisticas_dashboard()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Calificacion.objects.create(estudiante=self.estudiante, asignatura=self.mat, nota=Decimal('75'))
+        stats = estadisticas_dashboard()
+        self.assertEqual(stats['total_calificaciones'], 1)
+        self.assertEqual(stats['tasa_aprobacion'], 100)
+        self.assertEqual(stats['por_carrera'], [{'carrera': 'Ingeniería', 'total': 1}])
+        self.assertEqual(stats['distribucion_notas'][2], {'rango': '70-79', 'total': 1})
+
+    def test_valor_obsoleto_mientras_otro_recalcula(self):
+        obtener_o_calcular('prueba', 'valor', lambda: 'viejo')
+        incrementar_version('prueba')
+        # Simula otro proceso con el candado de recálculo tomado
+        cache.add('prueba:valor:candado', 1)
+        self.assertEqual(obtener_o_calcular('prueba', 'valor', lambda: 'nuevo'), 'viejo')
+        cache.delete('prueba:valor:candado')
+        self.assertEqual(obtener_o_calcular('prueba', 'valor', lambda: 'nuevo'), 'nuevo')
+
+    def test_version_perdida_no_repite_valores(self):
+        incrementar_version('prueba')
+        anterior = incrementar_version('prueba')
+        cache.clear()
+        self.assertGreater(obtener_version('prueba'), anterior)
+        self.assertGreater(incrementar_version('otro'), anterior)
+
+    def test_indice_admin_muestra_estadisticas(self):
+        admin = User.objects.create_user('admin', password='x', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        response = self.client.get('/admin/')
+        self.assertContains(response, 'Estudiantes por carrera')
+        self.assertContains(response, 'Ingeniería')
+
+
+class CacheCompartidaTest(TestCase):
+    """Dos procesos simultáneos deben ver el mismo estado de cache y no perder incrementos"""
+    INTENTOS = 150
+
+    def comando(self, codigo):
+        script = (
+            'import os, sys, time\n'
+            'import django; django.setup()\n'
+            'from django.core.cache import caches\n'
+            'from gestion.cache_utils import incrementar_version, obtener_version\n'
+            'from gestion.limites import reservar\n'
+            'from gestion.models import ContadorIntentos\n'
+            + codigo
+        )
+        return [sys.executable, '-c', script]
+
+    def ejecutar_worker(self, codigo, entorno):
+        resultado = subprocess.run(
+            self.comando(codigo), cwd=settings.BASE_DIR, env=entorno, capture_output=True, text=True, timeout=60,
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        return resultado.stdout.strip()
+
+    def test_dos_workers_simultaneos_comparten_estado(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            entorno = dict(
+                os.environ,
+                DJANGO_SETTINGS_MODULE='universidad.settings',
+                CACHE_BACKEND='file',
+                CACHE_DIR=directorio,
+                REDIS_URL='',
+                DATABASE_URL=f'sqlite:///{directorio}/db.sqlite3',
+                DATABASE_SSL='False',
+                LIMITES_PETICIONES='{"prueba": [1000, 3600]}',
+            )
+            # La cache de archivos no incrementa de forma atómica: el límite usa ContadorIntentos
+            version_inicial = self.ejecutar_worker(
+                'from django.db import connection\n'
+                'with connection.schema_editor() as editor:\n'
+                '    editor.create_model(ContadorIntentos)\n'
+                "print(obtener_version('estadisticas', 'stats'))\n",
+                entorno,
+            )
+            worker = (
+                'yo, otro = sys.argv[1:]\n'
+                "caches['default'].set(f'worker:{yo}', yo)\n"
+                # Barrera entre procesos: cada uno avisa que está listo y espera al otro
+                f"open(os.path.join({directorio!r}, 'listo-' + yo), 'w').close()\n"
+                f"while not os.path.exists(os.path.join({directorio!r}, 'listo-' + otro)):\n"
+                '    time.sleep(0.005)\n'
+                f'for _ in range({self.INTENTOS}):\n'
+                "    assert reservar('prueba', 'ip=10.0.0.1', 36010.0)[0] is not None\n"
+                "    incrementar_version('estadisticas', 'stats')\n"
+                "print(caches['default'].get(f'worker:{otro}'))\n"
+            )
+            procesos = [
+                subprocess.Popen(
+                    self.comando(worker) + list(par), cwd=settings.BASE_DIR, env=entorno,
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                )
+                for par in (('a', 'b'), ('b', 'a'))
+            ]
+            salidas = []
+            for proceso in procesos:
+                salida, errores = proceso.communicate(timeout=120)
+                self.assertEqual(proceso.returncode, 0, errores)
+                salidas.append(salida.strip())
+            intentos, version_final = self.ejecutar_worker(
+                "print(ContadorIntentos.objects.get().intentos, obtener_version('estadisticas', 'stats'))\n",
+                entorno,
+            ).split()
+        # Cada proceso vio lo que escribió el otro
+        self.assertEqual(salidas, ['b', 'a'])
+        # Ningún intento se perdió aunque los dos incrementaron a la vez
+        self.assertEqual(int(intentos), 2 * self.INTENTOS)
+        self.assertGreater(int(version_final), int(version_inicial))
+
+
+class BusquedaTest(TestCase):
+    def setUp(self):
+        self.ana = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001',
+            carrera='Medicina', correo='ana.perez@example.com',
+        )
+        self.luis = Estudiante.objects.create(
+            nombre='Luis', apellido='Gómez', matricula='A002',
+            carrera='Derecho', correo='luis.gomez@example.com',
+        )
+
+    def test_busca_por_subcadena_en_cualquier_campo(self):
+        self.assertEqual(list(buscar(Estudiante.objects.all(), 'medic')), [self.ana])
+        self.assertEqual(list(buscar(Estudiante.objects.all(), 'GÓMEZ')), [self.luis])
+        self.assertEqual(list(buscar(Estudiante.objects.all(), 'ana pérez')), [self.ana])
+        self.assertEqual(buscar(Estudiante.objects.all(), 'example.com').count(), 2)
+
+    def test_indice_sigue_cambios(self):
+        self.luis.apellido = 'Ramírez'
+        self.luis.save()
+        self.assertEqual(list(buscar(Estudiante.objects.all(), 'ramírez')), [self.luis])
+        self.assertFalse(buscar(Estudiante.objects.all(), 'gómez').exists())
+        self.ana.delete()
+        self.assertFalse(buscar(Estudiante.objects.all(), 'medicina').exists())
+
+    def test_terminos_cortos_usan_icontains(self):
+        self.assertEqual(list(buscar(Estudiante.objects.all(), 'lu')), [self.luis])
+
+    def test_asignaturas(self):
+        Asignatura.objects.create(codigo='MAT101', nombre='Cálculo', creditos=4, profesor='Gómez')
+        Asignatura.objects.create(codigo='FIS101', nombre='Física', creditos=4, profesor='Ruiz')
+        self.assertEqual([a.codigo for a in buscar(Asignatura.objects.all(), 'ruiz')], ['FIS101'])
+        self.assertEqual(buscar(Asignatura.objects.all(), '101').count(), 2)
+
+    def test_vista_lista_usa_busqueda(self):
+        admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get(reverse('estudiantes_list'), {'q': 'medic'})
+        self.assertEqual(list(response.context['estudiantes']), [self.ana])
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Apellidos y nombres repetidos para forzar el desempate por pk
+        Estudiante.objects.bulk_create([
+            Estudiante(
+                nombre=['Ana', 'Luis'][i % 2], apellido=['Pérez', 'Gómez', 'Díaz'][i % 3],
+                matricula=f'K{i:03d}', carrera='Medicina', correo=f'k{i}@example.com',
+            )
+            for i in range(37)
+        ])
+
+    def recorrer(self, queryset, orden):
+        paginator = KeysetPaginator(queryset, orden, per_page=10)
+        paginas = [paginator.get_page()]
+        while paginas[-1].has_next():
+            paginas.append(paginator.get_page(paginas[-1].next_cursor))
+        return paginator, paginas
+
+    def test_recorre_todas_las_filas_en_orden(self):
+        orden = ['apellido', 'nombre', 'pk']
+        paginator, paginas = self.recorrer(Estudiante.objects.all(), orden)
+        vistos = [e.pk for pagina in paginas for e in pagina]
+        self.assertEqual(vistos, list(Estudiante.objects.order_by(*orden).values_list('pk', flat=True)))
+        self.assertEqual([len(p) for p in paginas], [10, 10, 10, 7])
+        self.assertFalse(paginas[0].has_previous())
+
+        # Volver hacia atrás reproduce las páginas anteriores
+        anterior = paginator.get_page(paginas[2].previous_cursor)
+        self.assertEqual([e.pk for e in anterior], [e.pk for e in paginas[1]])
+        self.assertTrue(anterior.has_next())
+        primera = paginator.get_page(paginas[1].previous_cursor)
+        self.assertEqual([e.pk for e in primera], [e.pk for e in paginas[0]])
+        self.assertFalse(primera.has_previous())
+
+    def test_sin_count_ni_offset(self):
+        paginator = KeysetPaginator(Estudiante.objects.all(), ['apellido', 'nombre', 'pk'], per_page=10)
+        cursor = paginator.get_page().next_cursor
+        with self.assertNumQueries(1) as contexto:
+            paginator.get_page(cursor)
+        sql = contexto.captured_queries[0]['sql'].upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_pagina_resultados_de_busqueda_por_relevancia(self):
+        _, paginas = self.recorrer(buscar(Estudiante.objects.all(), 'pérez'), ['-relevancia', 'apellido', 'nombre', 'pk'])
+        vistos = [e.pk for pagina in paginas for e in pagina]
+        self.assertEqual(len(vistos), 13)
+        self.assertEqual(len(set(vistos)), 13)
+
+    def test_cursor_invalido_devuelve_primera_pagina(self):
+        paginator = KeysetPaginator(Estudiante.objects.all(), ['apellido', 'nombre', 'pk'], per_page=10)
+        self.assertEqual(len(paginator.get_page('no-es-un-cursor')), 10)
+
+    def test_vista_conserva_filtros(self):
+        admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get(reverse('estudiantes_list'), {'carrera': 'Medicina'})
+        pagina = response.context['estudiantes']
+        self.assertEqual(len(pagina), 15)
+        self.assertContains(response, f'?cursor={pagina.next_cursor}&carrera=Medicina')
+        response = self.client.get(reverse('estudiantes_list'), {'carrera': 'Medicina', 'cursor': pagina.next_cursor})
+        self.assertEqual(len(response.context['estudiantes']), 15)
+
+
+class FacetasCarreraTest(TestCase):
+    def setUp(self):
+        limpiar_caches()
+        for i, (nombre, carrera) in enumerate([('Ana', 'Medicina'), ('Luis', 'Medicina'), ('Rosa', 'Derecho')]):
+            Estudiante.objects.create(
+                nombre=nombre, apellido='Pérez', matricula=f'F{i}', carrera=carrera, correo=f'f{i}@example.com',
+            )
+
+    def test_conteos_totales_y_de_busqueda(self):
+        self.assertEqual(facetas_carrera(), [
+            {'carrera': 'Derecho', 'total': 1, 'coincidencias': 1},
+            {'carrera': 'Medicina', 'total': 2, 'coincidencias': 2},
+        ])
+        self.assertEqual(facetas_carrera('rosa'), [
+            {'carrera': 'Derecho', 'total': 1, 'coincidencias': 1},
+            {'carrera': 'Medicina', 'total': 2, 'coincidencias': 0},
+        ])
+
+    def test_cache_se_invalida_con_escrituras(self):
+        facetas_carrera()
+        with self.assertNumQueries(0):
+            facetas_carrera()
+        with self.captureOnCommitCallbacks(execute=True):
+            Estudiante.objects.create(
+                nombre='Juan', apellido='Díaz', matricula='F9', carrera='Derecho', correo='f9@example.com',
+            )
+        self.assertEqual(facetas_carrera()[0]['total'], 2)
+
+    def test_vista_no_consulta_carreras_en_cada_pagina(self):
+        admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.client.force_login(admin)
+        self.client.get(reverse('estudiantes_list'))
+        # Usuario + página de estudiantes + estadística del planificador (la sesión se lee de la cache)
+        with self.assertNumQueries(3) as contexto:
+            response = self.client.get(reverse('estudiantes_list'))
+        self.assertFalse(any('DISTINCT' in q['sql'] or 'GROUP BY' in q['sql'] for q in contexto.captured_queries))
+        self.assertContains(response, 'Medicina (2)')
+
+
+class ImportacionCalificacionesTest(TestCase):
+    def setUp(self):
+        limpiar_caches()
+        self.ana = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001', carrera='Medicina', correo='ana@example.com',
+        )
+        self.luis = Estudiante.objects.create(
+            nombre='Luis', apellido='Gómez', matricula='A002', carrera='Medicina', correo='luis@example.com',
+        )
+        self.mat = Asignatura.objects.create(codigo='MAT101', nombre='Matemática', creditos=4, profesor='X')
+        self.bio = Asignatura.objects.create(codigo='BIO101', nombre='Biología', creditos=3, profesor='Y')
+
+    def importar(self, contenido, **kwargs):
+        return importar_calificaciones(leer_csv(StringIO(contenido)), **kwargs)
+
+    def test_importa_actualiza_y_reporta_errores(self):
+        Calificacion.objects.create(estudiante=self.ana, asignatura=self.mat, nota=Decimal('40'))
+        reporte = self.importar(
+            'matricula,codigo,nota\n'
+            'A001,MAT101,85\n'
+            'A001,BIO101,"55,5"\n'
+            'A002,MAT101,120\n'
+            'A003,MAT101,70\n'
+            'A002,QUI101,70\n'
+            'A002,BIO101,abc\n',
+            tamano_lote=2,
+        )
+        self.assertEqual(reporte.procesadas, 6)
+        self.assertEqual(reporte.importadas, 2)
+        self.assertEqual(sorted(fila for fila, _ in reporte.errores), [4, 5, 6, 7])
+        self.assertEqual(Calificacion.objects.get(estudiante=self.ana, asignatura=self.mat).nota, Decimal('85.00'))
+        self.assertEqual(Calificacion.objects.get(estudiante=self.ana, asignatura=self.bio).nota, Decimal('55.50'))
+        self.assertEqual(Calificacion.objects.count(), 2)
+
+    def test_actualiza_resumenes_y_estadisticas(self):
+        self.assertEqual(estadisticas_dashboard()['total_calificaciones'], 0)
+        self.importar('matricula,codigo,nota\nA001,MAT101,90\nA001,BIO101,50\n')
+        resumen = ResumenEstudiante.objects.get(estudiante=self.ana)
+        self.assertEqual(resumen.aprobadas, 1)
+        self.assertEqual(resumen.reprobadas, 1)
+        self.assertEqual(estadisticas_dashboard()['total_calificaciones'], 2)
+
+    def test_encabezado_incompleto(self):
+        with self.assertRaises(ValueError):
+            self.importar('matricula,nota\nA001,90\n')
+
+    def test_comando_escribe_reporte_de_errores(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            entrada = os.path.join(directorio, 'notas.csv')
+            errores = os.path.join(directorio, 'errores.csv')
+            with open(entrada, 'w', encoding='utf-8') as archivo:
+                archivo.write('matricula,codigo,nota\nA002,MAT101,75\nA009,MAT101,75\n')
+            salida = StringIO()
+            call_command('importar_calificaciones', entrada, errores=errores, stdout=salida)
+            self.assertIn('Calificaciones importadas: 1', salida.getvalue())
+            with open(errores, encoding='utf-8') as archivo:
+                self.assertIn('A009', archivo.read())
+
+    def test_carga_desde_el_admin(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        url = reverse('admin:gestion_calificacion_importar')
+        archivo = SimpleUploadedFile('notas.csv', 'matricula,codigo,nota\nA001,MAT101,88\nA001,XXX,1\n'.encode())
+        response = self.client.post(url, {'archivo': archivo})
+        self.assertContains(response, '1 calificaciones importadas de 2 filas')
+        self.assertContains(response, 'No existe una asignatura con código XXX')
+        self.assertTrue(Calificacion.objects.filter(estudiante=self.ana, nota=88).exists())
+
+        # csv.Error (no es ValueError): mensaje en lugar de un 500
+        archivo = SimpleUploadedFile('notas.csv', ('matricula,codigo,nota\nA001,MAT101,"' + 'x' * 200_000 + '"\n').encode())
+        response = self.client.post(url, {'archivo': archivo})
+        self.assertContains(response, 'No se pudo leer el archivo')
+
+    def test_lote_fallido_no_deja_resumenes_obsoletos(self):
+        # El primer bloque decodificado es UTF-8 válido; más adelante hay un byte Latin-1
+        contenido = b'matricula,codigo,nota\n' + b'A001,MAT101,85\n' * 600 + b'A002,MAT101,70\nA\xe9,MAT101,1\n'
+        parcial = ReporteImportacion()
+        with self.assertRaises(UnicodeDecodeError):
+            importar_calificaciones(leer_csv(BytesIO(contenido)), tamano_lote=100, reporte=parcial)
+        self.assertGreater(parcial.importadas, 0)
+        self.assertEqual(ResumenEstudiante.objects.get(estudiante=self.ana).promedio, Decimal('85.00'))
+
+
+# Política de claves barata para que las pruebas no paguen el costo del hash real
+@override_settings(**CLAVES_RAPIDAS)
+class InscripcionMasivaTest(TestCase):
+    def setUp(self):
+        limpiar_caches()
+        Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001', carrera='Medicina', correo='ana@example.com',
+        )
+
+    def inscribir(self, contenido, **kwargs):
+        return inscribir_estudiantes(leer_csv(StringIO(contenido), OBLIGATORIAS_ESTUDIANTES), procesos=1, **kwargs)
+
+    def test_crea_estudiantes_y_rechaza_duplicados(self):
+        reporte = self.inscribir(
+            'nombre,apellido,matricula,carrera,correo,clave\n'
+            'Luis,Gómez,A002,Derecho,luis@example.com,secreta1\n'
+            'Rosa,Díaz,A001,Derecho,rosa@example.com,x\n'
+            'Juan,Ruiz,A003,Derecho,ana@example.com,x\n'
+            'Pedro,Sosa,A002,Derecho,pedro@example.com,x\n'
+            'Laura,Vega,A004,Derecho,no-es-correo,x\n'
+            'Elena,Mora,A005,Derecho,elena@example.com,\n',
+            tamano_lote=2,
+        )
+        self.assertEqual(reporte.importadas, 2)
+        self.assertEqual(sorted(fila for fila, _ in reporte.errores), [3, 4, 5, 6])
+        luis = Estudiante.objects.get(matricula='A002')
+        self.assertTrue(luis.check_clave('secreta1'))
+        self.assertEqual(Estudiante.objects.get(matricula='A005').clave, '')
+
+        salida = StringIO()
+        reporte.escribir_rechazos(salida, ['matricula', 'correo'])
+        lineas = salida.getvalue().splitlines()
+        self.assertEqual(lineas[0], 'fila,matricula,correo,error')
+        self.assertTrue(lineas[1].startswith('3,A001,rosa@example.com,'))
+
+    def test_invalida_facetas(self):
+        self.assertEqual(len(facetas_carrera()), 1)
+        self.inscribir('nombre,apellido,matricula,carrera,correo\nLuis,Gómez,A002,Derecho,luis@example.com\n')
+        self.assertEqual(len(facetas_carrera()), 2)
+
+    def test_hashea_en_pool_de_procesos(self):
+        filas = ''.join(f'E{i},Apellido,M{i:03d},Derecho,e{i}@example.com,clave{i}\n' for i in range(70))
+        reporte = inscribir_estudiantes(
+            leer_csv(StringIO('nombre,apellido,matricula,carrera,correo,clave\n' + filas), OBLIGATORIAS_ESTUDIANTES),
+            procesos=2,
+        )
+        self.assertEqual(reporte.importadas, 70)
+        self.assertTrue(Estudiante.objects.get(matricula='M069').check_clave('clave69'))
+
+
+class ExportacionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001', carrera='Medicina', correo='ana@example.com',
+        )
+        cls.luis = Estudiante.objects.create(
+            nombre='Luis', apellido='Gómez', matricula='A002', carrera='Derecho', correo='luis@example.com',
+        )
+        mat = Asignatura.objects.create(codigo='MAT101', nombre='Matemática', creditos=4, profesor='X')
+        bio = Asignatura.objects.create(codigo='BIO101', nombre='Biología', creditos=3, profesor='Y')
+        Calificacion.objects.create(estudiante=cls.ana, asignatura=mat, nota=Decimal('85'))
+        Calificacion.objects.create(estudiante=cls.ana, asignatura=bio, nota=Decimal('40'))
+        Calificacion.objects.create(estudiante=cls.luis, asignatura=mat, nota=Decimal('70.5'))
+
+    def test_planilla_csv_por_asignatura(self):
+        contenido = ''.join(exportar('planilla', 'csv', tamano_bloque=2))
+        lineas = contenido.lstrip('\ufeff').splitlines()
+        self.assertEqual(lineas[0], 'codigo,asignatura,matricula,apellido,nombre,carrera,nota')
+        self.assertEqual([l.split(',')[0] + l.split(',')[2] for l in lineas[1:]], ['BIO101A001', 'MAT101A002', 'MAT101A001'])
+
+    def test_historial_ndjson(self):
+        filas = [json.loads(l) for l in ''.join(exportar('historial', 'ndjson')).splitlines()]
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[1]['matricula'], 'A001')
+        self.assertEqual(filas[1]['estado'], 'Reprobada')
+        self.assertEqual(filas[0]['nota'], 70.5)
+
+    def test_vista_transmite_y_filtra(self):
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+        response = self.client.get(reverse('exportar_calificaciones'), {'tipo': 'historial', 'matricula': 'A001'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="historial_a001.csv"')
+        contenido = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertEqual(len(contenido.splitlines()), 3)
+
+    def test_vista_requiere_admin(self):
+        response = self.client.get(reverse('exportar_calificaciones'))
+        self.assertEqual(response.status_code, 302)
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001', carrera='Medicina', correo='ana@example.com',
+        )
+        cls.asignaturas = [
+            Asignatura.objects.create(codigo=codigo, nombre=nombre, creditos=4, profesor='X')
+            for codigo, nombre in (('BIO101', 'Biología'), ('FIS101', 'Física'), ('MAT101', 'Matemática'))
+        ]
+        Calificacion.objects.create(estudiante=cls.ana, asignatura=cls.asignaturas[2], nota=Decimal('85.50'))
+        Horario.objects.create(asignatura=cls.asignaturas[0], dia='LUN', hora='08:00', aula='A1')
+        Horario.objects.create(asignatura=cls.asignaturas[1], dia='MAR', hora='10:00', aula='B2')
+
+    def setUp(self):
+        session = self.client.session
+        session['estudiante_id'] = self.ana.pk
+        session.save()
+
+    def test_requiere_sesion(self):
+        response = Client().get(reverse('api_asignaturas'))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('error', response.json())
+
+    def test_notas_con_campos_parciales(self):
+        url = reverse('api_notas', args=[self.ana.pk])
+        datos = self.client.get(url, {'campos': 'codigo,nota'}).json()
+        self.assertEqual(datos['estudiante']['matricula'], 'A001')
+        self.assertEqual(datos['calificaciones'], [{'codigo': 'MAT101', 'nota': 85.5}])
+        otro = Estudiante.objects.create(
+            nombre='Luis', apellido='Gómez', matricula='A002', carrera='Derecho', correo='luis@example.com',
+        )
+        self.assertEqual(self.client.get(reverse('api_notas', args=[otro.pk])).status_code, 403)
+        self.assertEqual(self.client.get(url, {'campos': 'clave'}).status_code, 400)
+
+    def test_asignaturas_por_cursor(self):
+        url = reverse('api_asignaturas')
+        with self.assertNumQueries(1):
+            datos = self.client.get(url, {'limite': 2, 'campos': 'codigo'}).json()
+        self.assertEqual(datos['resultados'], [{'codigo': 'BIO101'}, {'codigo': 'FIS101'}])
+        self.assertIsNone(datos['anterior'])
+        datos = self.client.get(url, {'limite': 2, 'campos': 'codigo', 'cursor': datos['siguiente']}).json()
+        self.assertEqual(datos['resultados'], [{'codigo': 'MAT101'}])
+        self.assertIsNone(datos['siguiente'])
+        self.assertEqual(self.client.get(url, {'limite': 0}).status_code, 400)
+
+    def test_lote_por_ids(self):
+        bio, _, mat = self.asignaturas
+        datos = self.client.get(reverse('api_asignaturas'), {'ids': f'{mat.pk},999,{bio.pk}'}).json()
+        self.assertEqual([a['codigo'] for a in datos['resultados']], ['MAT101', 'BIO101'])
+        self.assertEqual(datos['faltantes'], [999])
+        self.assertEqual(self.client.get(reverse('api_asignaturas'), {'ids': 'a,b'}).status_code, 400)
+
+    def test_horarios_por_asignatura(self):
+        datos = self.client.get(reverse('api_horarios'), {'asignatura': self.asignaturas[1].pk}).json()
+        self.assertEqual(datos['resultados'], [{
+            'id': Horario.objects.get(aula='B2').pk, 'asignatura_id': self.asignaturas[1].pk,
+            'codigo': 'FIS101', 'dia': 'MAR', 'hora': '10:00:00', 'duracion': 90, 'aula': 'B2',
+        }])
+
+
+class ConstanciaPDFTest(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        ajustes = override_settings(CONSTANCIAS_DIR=self.directorio.name, CONSTANCIAS_ESPERA=5)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.estudiante = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001', carrera='Medicina', correo='ana@example.com',
+        )
+        self.asignatura = Asignatura.objects.create(codigo='MAT101', nombre='Matemática', creditos=4, profesor='X')
+        self.calificacion = Calificacion.objects.create(estudiante=self.estudiante, asignatura=self.asignatura, nota=80)
+
+    def test_pdf_se_reutiliza_hasta_que_cambia_una_nota(self):
+        ruta = solicitar_constancia(self.estudiante, espera=5)
+        contenido = ruta.read_bytes()
+        self.assertTrue(contenido.startswith(b'%PDF-1.4'))
+        self.assertIn('Pérez'.encode('cp1252'), contenido)
+        self.assertEqual(solicitar_constancia(self.estudiante), ruta)
+
+        self.calificacion.nota = 95
+        self.calificacion.save()
+        nueva = solicitar_constancia(self.estudiante, espera=5)
+        self.assertNotEqual(nueva, ruta)
+        self.assertFalse(ruta.exists())
+
+    def test_huella_estable(self):
+        self.assertEqual(ruta_constancia(datos_constancia(self.estudiante)), ruta_constancia(datos_constancia(self.estudiante)))
+
+    def test_vista_descarga_solo_el_dueno(self):
+        url = reverse('constancia_pdf', args=[self.estudiante.pk])
+        self.assertEqual(self.client.get(url).status_code, 302)
+        sesion = self.client.session
+        sesion['estudiante_id'] = self.estudiante.pk
+        sesion.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_vista_responde_202_mientras_genera(self):
+        sesion = self.client.session
+        sesion['estudiante_id'] = self.estudiante.pk
+        sesion.save()
+        with override_settings(CONSTANCIAS_ESPERA=0), mock.patch('gestion.constancias.escribir_constancia', lambda *a: time.sleep(0.2)):
+            response = self.client.get(reverse('constancia_pdf', args=[self.estudiante.pk]))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Retry-After'], '2')
+
+    def test_comando_genera_cohorte(self):
+        salida = StringIO()
+        call_command('generar_constancias', carrera=['Medicina'], procesos=1, stdout=salida)
+        self.assertIn('Constancias generadas: 1', salida.getvalue())
+        self.assertTrue(ruta_constancia(datos_constancia(self.estudiante)).exists())
+        call_command('generar_constancias', carrera=['Medicina'], procesos=1, stdout=salida)
+        self.assertIn('Ya vigentes: 1', salida.getvalue())
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class MetricasTest(PresupuestoConsultasMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        asignaturas = [
+            Asignatura.objects.create(codigo=f'M{i}', nombre=f'Materia {i}', creditos=3, profesor='X') for i in range(5)
+        ]
+        for i in range(20):
+            estudiante = Estudiante.objects.create(
+                nombre='Ana', apellido=f'Pérez {i}', matricula=f'M{i:03d}', carrera='Medicina', correo=f'm{i}@example.com',
+            )
+            for asignatura in asignaturas:
+                Calificacion.objects.create(estudiante=estudiante, asignatura=asignatura, nota=50 + i)
+        cls.estudiante = estudiante
+        cls.admin = User.objects.create_user('admin', password='x', is_staff=True)
+
+    def setUp(self):
+        limpiar_caches()
+        registro.reiniciar()
+
+    def test_vistas_dentro_del_presupuesto(self):
+        self.assertPresupuestoConsultas(reverse('dashboard'))
+        sesion = self.client.session
+        sesion['estudiante_id'] = self.estudiante.pk
+        sesion.save()
+        self.assertPresupuestoConsultas(reverse('notas_estudiante', args=[self.estudiante.pk]))
+
+        self.client.force_login(self.admin)
+        self.client.get(reverse('estudiantes_list'))  # calienta la cache de facetas
+        self.assertPresupuestoConsultas(reverse('estudiantes_list'))
+        self.assertPresupuestoConsultas(reverse('asignaturas_list'))
+        self.assertPresupuestoConsultas(reverse('exportar_calificaciones'), data={'tipo': 'historial'})
+
+    def test_presupuesto_excedido_falla(self):
+        self.client.force_login(self.admin)
+        with self.assertRaises(AssertionError):
+            self.assertPresupuestoConsultas(reverse('asignaturas_list'), maximo=1)
+
+    def test_server_timing_y_prometheus(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('asignaturas_list'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ consultas", cache;.*total;dur=')
+        self.client.get(reverse('estudiantes_list'))
+        self.client.get(reverse('estudiantes_list'))
+
+        texto = self.client.get(reverse('metricas')).content.decode()
+        self.assertIn('# TYPE gestion_latencia_segundos summary', texto)
+        self.assertIn('gestion_peticiones_total{vista="estudiantes_list"} 2', texto)
+        self.assertIn('gestion_cache_aciertos_total{vista="estudiantes_list"} 1', texto)
+        self.assertIn('gestion_cache_fallos_total{vista="estudiantes_list"} 1', texto)
+        self.assertRegex(texto, r'gestion_latencia_segundos\{vista="asignaturas_list",quantile="0.99"\} [\d.]+')
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_metricas_requiere_admin_o_token(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+        response = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+
+    def test_percentil_rango_mas_cercano(self):
+        valores = list(range(1, 101))
+        self.assertEqual([percentil(valores, q) for q in (0.5, 0.95, 0.99)], [50, 95, 99])
+        self.assertIsNone(percentil([], 0.5))
+
+
+class ConflictosHorarioTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mat = Asignatura.objects.create(codigo='MAT101', nombre='Cálculo', creditos=4, profesor='X')
+        cls.fis = Asignatura.objects.create(codigo='FIS101', nombre='Física', creditos=4, profesor='Y')
+        cls.lunes = Horario.objects.create(asignatura=cls.mat, dia='LUN', hora='08:00', duracion=90, aula='A1')
+
+    def test_barrido_coincide_con_comparar_pares(self):
+        aleatorio = random.Random(7)
+        lista = [
+            Franja(i, f'S{i}', aleatorio.choice('AB'), inicio, inicio + aleatorio.choice((30, 60, 90)),
+                   aleatorio.choice(('Aula 1', 'aula 1 ', 'Aula 2')))
+            for i, inicio in enumerate(aleatorio.randrange(420, 1200, 15) for _ in range(300))
+        ]
+        esperados = {
+            frozenset((a.id, b.id)) for a, b in combinations(lista, 2)
+            if a.dia == b.dia and clave_aula(a.aula) == clave_aula(b.aula) and a.inicio < b.fin and b.inicio < a.fin
+        }
+        encontrados = [frozenset((c.primero.id, c.segundo.id)) for c in detectar_conflictos(lista)]
+        self.assertEqual(len(encontrados), len(esperados))
+        self.assertEqual(set(encontrados), esperados)
+
+    def test_validacion_al_guardar(self):
+        # Empieza justo cuando termina la otra: no choca
+        Horario(asignatura=self.fis, dia='LUN', hora='09:30', duracion=60, aula='A1').full_clean()
+        Horario(asignatura=self.fis, dia='LUN', hora='08:00', duracion=60, aula='B1').full_clean()
+        self.lunes.full_clean()
+        with self.assertRaisesMessage(ValidationError, 'El aula ya está ocupada: MAT101 LUN 08:00-09:30 (A1)'):
+            Horario(asignatura=self.fis, dia='LUN', hora='09:00', duracion=60, aula='a1').full_clean()
+        with self.assertRaises(ValidationError):
+            Horario(asignatura=self.fis, dia='LUN', hora='23:00', duracion=90, aula='C1').full_clean()
+
+    def test_aula_se_guarda_normalizada(self):
+        horario = Horario.objects.create(asignatura=self.fis, dia='MAR', hora='08:00', duracion=60, aula='  aula  1 ')
+        self.assertEqual(Horario.objects.get(pk=horario.pk).aula, 'AULA 1')
+        # La validación busca por igualdad, que usa el índice (dia, aula)
+        with CaptureQueriesContext(connection) as contexto:
+            with self.assertRaises(ValidationError):
+                Horario(asignatura=self.mat, dia='MAR', hora='08:30', duracion=60, aula='Aula 1').full_clean()
+        self.assertFalse([q for q in contexto.captured_queries if 'UPPER' in q['sql']])
+
+    def test_accion_admin_y_comando(self):
+        choque = Horario.objects.create(asignatura=self.fis, dia='LUN', hora='09:00', duracion=60, aula='A1')
+        Horario.objects.create(asignatura=self.fis, dia='MAR', hora='09:00', duracion=60, aula='A1')
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        response = self.client.post(
+            reverse('admin:gestion_horario_changelist'),
+            {'action': 'detectar_choques', '_selected_action': [choque.pk]},
+            follow=True,
+        )
+        self.assertEqual(
+            [str(m) for m in response.context['messages']],
+            ['MAT101 LUN 08:00-09:30 (A1) choca con FIS101 LUN 09:00-10:00 (A1) (30 min)'],
+        )
+
+        salida = StringIO()
+        call_command('detectar_conflictos', stdout=salida)
+        self.assertIn('3 horarios revisados, 1 choques', salida.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('detectar_conflictos', '--estricto', stdout=StringIO())
+        call_command('detectar_conflictos', '--dia', 'MAR', '--estricto', stdout=StringIO())
+
+
+class HorarioSemanalTest(TestCase):
+    def setUp(self):
+        limpiar_caches()
+        self.estudiante = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001',
+            carrera='Ingeniería', correo='ana.perez@example.com',
+        )
+        self.mat = Asignatura.objects.create(codigo='MAT101', nombre='Cálculo', creditos=4, profesor='Gómez')
+        self.fis = Asignatura.objects.create(codigo='FIS101', nombre='Física', creditos=3, profesor='Ruiz')
+        otra = Asignatura.objects.create(codigo='QUI101', nombre='Química', creditos=3, profesor='Sosa')
+        Horario.objects.create(asignatura=self.mat, dia='LUN', hora='08:00', duracion=90, aula='A1')
+        Horario.objects.create(asignatura=self.mat, dia='MIE', hora='08:00', duracion=90, aula='A1')
+        # Otra aula, pero el estudiante no puede estar en las dos
+        Horario.objects.create(asignatura=self.fis, dia='LUN', hora='09:00', duracion=60, aula='B2')
+        # A la misma hora, pero no está inscrito
+        Horario.objects.create(asignatura=otra, dia='LUN', hora='08:00', duracion=60, aula='C3')
+        for asignatura in (self.mat, self.fis):
+            inscribir(self.estudiante.pk, asignatura.pk)
+        session = self.client.session
+        session['estudiante_id'] = self.estudiante.pk
+        session.save()
+        self.url = reverse('horario_estudiante', args=[self.estudiante.pk])
+
+    def test_horario_y_choques_personales(self):
+        response = self.client.get(self.url)
+        lunes = response.context['dias'][0]
+        self.assertEqual([(c['codigo'], c['inicio'], c['fin']) for c in lunes['clases']],
+                         [('MAT101', '08:00', '09:30'), ('FIS101', '09:00', '10:00')])
+        self.assertEqual([c['codigo'] for c in response.context['dias'][2]['clases']], ['MAT101'])
+        self.assertEqual(response.context['total_clases'], 3)
+        self.assertContains(response, 'Mi Horario')
+        self.assertContains(response, 'Tienes 1 choque de horario')
+
+        datos = self.client.get(reverse('api_horario', args=[self.estudiante.pk])).json()
+        [choque] = datos['choques']
+        self.assertEqual((choque['dia'], choque['minutos']), ('LUN', 30))
+        self.assertEqual((choque['primera']['codigo'], choque['segunda']['codigo']), ('MAT101', 'FIS101'))
+        otro = reverse('api_horario', args=[self.estudiante.pk + 1])
+        self.assertEqual(self.client.get(otro).status_code, 403)
+
+    def test_cache_por_estudiante_e_invalidacion(self):
+        self.client.get(self.url)
+        # Solo la identidad del estudiante: el horario sale de la cache
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Horario.objects.create(asignatura=self.fis, dia='VIE', hora='10:00', duracion=60, aula='B2')
+        self.assertEqual(self.client.get(self.url).context['total_clases'], 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Inscripcion.objects.filter(asignatura=self.fis).delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['total_clases'], 2)
+        self.assertEqual(response.context['choques'], [])
+
+    def test_calculo_en_curso_no_pisa_la_invalidacion(self):
+        calcular = horarios.calcular_horario_semanal
+
+        def calcular_y_confirmar_en_medio(estudiante_id):
+            viejo = calcular(estudiante_id)
+            # Otra petición confirma una baja mientras este cálculo termina
+            with self.captureOnCommitCallbacks(execute=True):
+                Inscripcion.objects.filter(asignatura=self.fis).delete()
+            return viejo
+
+        with mock.patch('gestion.horarios.calcular_horario_semanal', calcular_y_confirmar_en_medio):
+            self.assertEqual(horarios.horario_semanal(self.estudiante.pk)['total_clases'], 3)
+        self.assertEqual(horarios.horario_semanal(self.estudiante.pk)['total_clases'], 2)
+
+
+class InscripcionTest(TestCase):
+    def setUp(self):
+        limpiar_caches()
+        self.mat = Asignatura.objects.create(codigo='MAT101', nombre='Cálculo', creditos=4, profesor='X', cupo=2)
+        self.estudiantes = Estudiante.objects.bulk_create([
+            Estudiante(nombre=f'E{i}', apellido='P', matricula=f'2024{i:03d}', carrera='Ingeniería',
+                       correo=f'e{i}@example.com')
+            for i in range(4)
+        ])
+
+    def test_cupo_duplicados_y_bajas(self):
+        primero, segundo, tercero, _ = self.estudiantes
+        inscribir(primero.pk, self.mat.pk)
+        with self.assertRaises(YaInscrito):
+            inscribir(primero.pk, self.mat.pk)
+        inscribir(segundo.pk, self.mat.pk)
+        with self.assertRaises(CupoAgotado):
+            inscribir(tercero.pk, self.mat.pk)
+        # Con la asignatura llena, el ya inscrito sigue recibiendo YaInscrito
+        with self.assertRaises(YaInscrito):
+            inscribir(primero.pk, self.mat.pk)
+        self.mat.refresh_from_db()
+        self.assertEqual((self.mat.inscritos, self.mat.inscripciones.count()), (2, 2))
+
+        # Guardar una copia desactualizada no pisa el contador
+        copia = Asignatura.objects.get(pk=self.mat.pk)
+        Inscripcion.objects.get(estudiante=segundo).delete()
+        copia.save()
+        inscribir(tercero.pk, self.mat.pk)
+        self.mat.refresh_from_db()
+        self.assertEqual(self.mat.inscritos, 2)
+        with self.assertRaises(ValidationError):
+            Asignatura(pk=self.mat.pk, codigo='MAT101', nombre='Cálculo', creditos=4, profesor='X',
+                       cupo=1, inscritos=2).full_clean()
+
+    def test_vista_de_inscripcion(self):
+        estudiante = self.estudiantes[0]
+        session = self.client.session
+        session['estudiante_id'] = estudiante.pk
+        session.save()
+        url = reverse('inscribir_asignatura', args=[estudiante.pk])
+        response = self.client.post(url, {'codigo': 'mat101'}, follow=True)
+        self.assertContains(response, 'Te inscribiste en MAT101.')
+        self.assertEqual(response.context['total_clases'], 0)
+        response = self.client.post(url, {'codigo': 'MAT101'}, follow=True)
+        self.assertContains(response, 'El estudiante ya está inscrito en esta asignatura.')
+        response = self.client.post(url, {'codigo': 'XYZ'}, follow=True)
+        self.assertContains(response, 'No existe la asignatura XYZ.')
+
+    def test_comando_de_cohorte(self):
+        inscribir(self.estudiantes[1].pk, self.mat.pk)
+        salida = StringIO()
+        call_command('inscribir_cohorte', 'MAT101', '--matricula', '2024', '--lote', '2', stdout=salida)
+        self.assertIn('MAT101: 1 inscritos, 1 ya estaban, 2 sin cupo', salida.getvalue())
+        self.assertEqual(
+            list(Inscripcion.objects.order_by('estudiante__matricula').values_list('estudiante__matricula', flat=True)),
+            ['2024000', '2024001'],
+        )
+        with self.assertRaises(CommandError):
+            call_command('inscribir_cohorte', 'MAT101', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('inscribir_cohorte', 'NOEXISTE', '--carrera', 'Ingeniería', stdout=StringIO())
+
+
+    def test_cupo_menor_que_los_inscritos_es_error_de_formulario(self):
+        for estudiante in self.estudiantes[:2]:
+            inscribir(estudiante.pk, self.mat.pk)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+        datos = {'codigo': 'MAT101', 'nombre': 'Cálculo', 'creditos': 4, 'profesor': 'X', 'cupo': 1}
+        url_vista = reverse('asignaturas_update', args=[self.mat.pk])
+        url_admin = reverse('admin:gestion_asignatura_change', args=[self.mat.pk])
+        for url in (url_vista, url_admin):
+            self.assertContains(self.client.post(url, datos), 'El cupo no puede ser menor')
+
+        # Si se inscriben entre la validación y el guardado, decide la restricción de la tabla
+        with mock.patch.object(Asignatura, 'clean'):
+            self.assertContains(self.client.post(url_vista, datos), 'El cupo no puede ser menor')
+            response = self.client.post(url_admin, datos)
+        self.assertRedirects(response, url_admin, fetch_redirect_response=False)
+        self.mat.refresh_from_db()
+        self.assertEqual(self.mat.cupo, 2)
+
+class InscripcionConcurrenteTest(TransactionTestCase):
+    HILOS = 24
+    CUPO = 5
+
+    def test_el_cupo_nunca_se_excede(self):
+        asignatura = Asignatura.objects.create(
+            codigo='MAT101', nombre='Cálculo', creditos=4, profesor='X', cupo=self.CUPO,
+        )
+        estudiantes = Estudiante.objects.bulk_create([
+            Estudiante(nombre=f'E{i}', apellido='P', matricula=f'C{i:03d}', carrera='Ingeniería',
+                       correo=f'c{i}@example.com')
+            for i in range(self.HILOS * 2)
+        ])
+        barrera = threading.Barrier(self.HILOS)
+        resultados = []
+
+        def trabajar(indice):
+            barrera.wait()
+            try:
+                if indice % 3:
+                    inscribir(estudiantes[indice].pk, asignatura.pk)
+                    resultados.append(1)
+                else:
+                    # Algunos hilos inscriben un lote de dos, compitiendo con los individuales
+                    lote = [estudiantes[indice].pk, estudiantes[self.HILOS + indice].pk]
+                    resultados.append(inscribir_lote(lote, asignatura.pk).inscritos)
+            except CupoAgotado:
+                resultados.append(0)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=trabajar, args=(i,)) for i in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        asignatura.refresh_from_db()
+        self.assertEqual(len(resultados), self.HILOS)
+        self.assertEqual(sum(resultados), self.CUPO)
+        self.assertEqual(asignatura.inscritos, self.CUPO)
+        self.assertEqual(asignatura.inscripciones.count(), self.CUPO)
+
+
+@override_settings(**CLAVES_RAPIDAS)
+class DatosSinteticosTest(TestCase):
+    def test_generar_datos_y_benchmark_de_vistas(self):
+        call_command('generar_datos', estudiantes='20', asignaturas=5, calificaciones=3, lote=8, stdout=StringIO())
+        self.assertEqual(Estudiante.objects.count(), 20)
+        self.assertEqual(Calificacion.objects.count(), 60)
+        self.assertEqual(Horario.objects.count(), 10)
+        self.assertEqual(ResumenEstudiante.objects.filter(total_asignaturas=3).count(), 20)
+        self.assertTrue(Estudiante.objects.first().check_clave('clave123'))
+
+        # Una segunda corrida continúa la numeración y reutiliza las asignaturas
+        call_command('generar_datos', estudiantes='5', asignaturas=5, calificaciones=3, stdout=StringIO())
+        self.assertEqual(Estudiante.objects.count(), 25)
+        self.assertEqual(Asignatura.objects.count(), 5)
+
+        salida = StringIO()
+        call_command('benchmark_vistas', repeticiones=1, calentamiento=0, stdout=salida, stderr=StringIO())
+        vistas = json.loads(salida.getvalue())['vistas']
+        sin_escenario = [n for n, d in vistas.items() if d.get('omitida') == 'sin escenario definido']
+        self.assertEqual(sin_escenario, [], 'Agregar las rutas nuevas a ESCENARIOS de benchmark_vistas')
+        self.assertEqual(vistas['notas_estudiante']['estados'], [200])
+        self.assertEqual(vistas['estudiantes_list']['estados'], [200])
+
+    def test_limpiar_respeta_datos_reales_con_el_prefijo(self):
+        real = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='S20240001', carrera='Medicina', correo='ana@example.com',
+        )
+        materia = Asignatura.objects.create(codigo='SIN101', nombre='Sintaxis', creditos=3, profesor='Ruiz')
+        Calificacion.objects.create(estudiante=real, asignatura=materia, nota=Decimal('90.00'))
+        call_command('generar_datos', estudiantes='4', asignaturas=2, calificaciones=1, stdout=StringIO())
+
+        call_command('generar_datos', estudiantes='0', asignaturas=0, limpiar=True, stdout=StringIO())
+        self.assertEqual(list(Estudiante.objects.values_list('matricula', flat=True)), ['S20240001'])
+        self.assertEqual(list(Asignatura.objects.values_list('codigo', flat=True)), ['SIN101'])
+        self.assertTrue(Calificacion.objects.filter(estudiante=real, asignatura=materia).exists())
+
+
+@override_settings(LIMITES_ACTIVOS=False, **CLAVES_RAPIDAS)
+class PruebaCargaTest(LiveServerTestCase):
+    def test_flujo_completo_contra_servidor(self):
+        for i in range(3):
+            estudiante = Estudiante(
+                nombre='Ana', apellido='Pérez', matricula=f'C{i}', carrera='Medicina', correo=f'c{i}@example.com',
+            )
+            estudiante.set_clave('clave123')
+            estudiante.save()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        resultado = os.path.join(directorio.name, 'carga.json')
+        call_command(
+            'prueba_carga', url=self.live_server_url, usuarios=2, duracion=0.5, json=resultado,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+        with open(resultado, encoding='utf-8') as archivo:
+            datos = json.load(archivo)
+        self.assertEqual(datos['errores'], {})
+        self.assertGreater(datos['flujos_completos'], 0)
+        self.assertEqual(datos['pasos']['login']['cantidad'], datos['pasos']['logout']['cantidad'])
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher'],
+    **CLAVES_RAPIDAS,
+)
+class PoliticaClavesTest(TestCase):
+    def setUp(self):
+        self.estudiante = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001', carrera='Medicina', correo='ana@example.com',
+            clave=make_password('secreta1', hasher='md5'),
+        )
+
+    def test_rehashea_clave_heredada_en_login_correcto(self):
+        self.assertFalse(self.estudiante.check_clave('otra'))
+        self.estudiante.refresh_from_db()
+        self.assertTrue(self.estudiante.clave.startswith('md5$'))
+
+        self.assertTrue(self.estudiante.check_clave('secreta1'))
+        self.estudiante.refresh_from_db()
+        self.assertTrue(self.estudiante.clave.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(self.estudiante.check_clave('secreta1'))
+
+    def test_rehashea_si_cambian_los_parametros(self):
+        self.estudiante.set_clave('secreta1')
+        self.estudiante.save()
+        with self.settings(CLAVES_PARAMETROS={'iterations': 1200}):
+            self.assertTrue(self.estudiante.check_clave('secreta1'))
+        self.estudiante.refresh_from_db()
+        self.assertTrue(self.estudiante.clave.startswith('pbkdf2_sha256$1200$'))
+
+    def test_parametros_invalidos(self):
+        with self.assertRaises(ImproperlyConfigured):
+            crear_hasher('pbkdf2_sha256', {'iteraciones': 10})
+        with self.assertRaises(ImproperlyConfigured):
+            crear_hasher('bcrypt')
+
+    def test_admin_hashea_solo_texto_plano(self):
+        modelo_admin = EstudianteAdmin(Estudiante, site)
+        hash_previo = self.estudiante.clave
+        modelo_admin.save_model(None, self.estudiante, None, True)
+        self.assertEqual(self.estudiante.clave, hash_previo)
+
+        self.estudiante.clave = 'nueva-clave'
+        modelo_admin.save_model(None, self.estudiante, None, True)
+        self.assertTrue(self.estudiante.clave.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(self.estudiante.check_clave('nueva-clave'))
+
+    def test_calibrar_hash(self):
+        salida = StringIO()
+        call_command('calibrar_hash', algoritmo='pbkdf2_sha256', objetivo_ms=20, muestras=1, stdout=salida)
+        linea = [l for l in salida.getvalue().splitlines() if l.startswith('CLAVES_PARAMETROS=')][0]
+        parametros = json.loads(linea.split('=', 1)[1].strip("'"))
+        self.assertGreaterEqual(parametros['iterations'], 1000)
+
+    async def test_acheck_clave_rehashea_fuera_del_event_loop(self):
+        self.assertFalse(await self.estudiante.acheck_clave('otra'))
+        self.assertTrue(await self.estudiante.acheck_clave('secreta1'))
+        estudiante = await Estudiante.objects.aget(pk=self.estudiante.pk)
+        self.assertTrue(estudiante.clave.startswith('pbkdf2_sha256$1000$'))
+
+
+@override_settings(**CLAVES_RAPIDAS)
+class LoginAsyncTest(TestCase):
+    def setUp(self):
+        limpiar_caches()
+        self.estudiante = Estudiante(
+            nombre='Ana', apellido='Pérez', matricula='A001', carrera='Medicina', correo='ana@example.com',
+        )
+        self.estudiante.set_clave('secreta1')
+        self.estudiante.save()
+        asignatura = Asignatura.objects.create(codigo='MAT101', nombre='Cálculo', creditos=4, profesor='Ruiz')
+        Calificacion.objects.create(estudiante=self.estudiante, asignatura=asignatura, nota=Decimal('85.00'))
+
+    async def test_login_y_notas(self):
+        url_notas = reverse('notas_estudiante', args=[self.estudiante.pk])
+        response = await self.async_client.post(reverse('notas_login'), {'matricula': 'A001', 'clave': 'secreta1'})
+        self.assertRedirects(response, url_notas, fetch_redirect_response=False)
+
+        response = await self.async_client.get(url_notas)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'MAT101')
+        self.assertContains(response, 'Bienvenido, Ana!')
+
+    async def test_limite_rechaza_antes_de_hashear(self):
+        for _ in range(5):
+            response = await self.async_client.post(reverse('notas_login'), {'matricula': 'A001', 'clave': 'mala'})
+            self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        with mock.patch.object(Estudiante, 'acheck_clave') as verificar:
+            response = await self.async_client.post(reverse('notas_login'), {'matricula': 'a001', 'clave': 'secreta1'})
+        verificar.assert_not_called()
+        self.assertIn('Retry-After', response)
+        self.assertIsNone(await (await self.async_client.asession()).aget('estudiante_id'))
+
+        # Otra matrícula desde la misma IP sigue pudiendo intentar
+        response = await self.async_client.post(reverse('notas_login'), {'matricula': 'B002', 'clave': 'x'})
+        self.assertNotIn('Retry-After', response)
+
+    async def test_logins_correctos_no_consumen_el_limite(self):
+        for _ in range(8):
+            response = await self.async_client.post(reverse('notas_login'), {'matricula': 'A001', 'clave': 'secreta1'})
+            self.assertNotIn('Retry-After', response)
+            self.assertEqual(await (await self.async_client.asession()).aget('estudiante_id'), self.estudiante.pk)
+
+    def test_limite_de_cambiar_clave(self):
+        sesion = self.client.session
+        sesion['estudiante_id'] = self.estudiante.pk
+        sesion.save()
+        url = reverse('cambiar_clave', args=[self.estudiante.pk])
+        datos = {'actual': 'mala', 'nueva1': 'nueva-clave', 'nueva2': 'nueva-clave'}
+        with self.settings(LIMITES_PETICIONES={'cambiar_clave': [2, 300]}):
+            for _ in range(2):
+                self.assertNotIn('Retry-After', self.client.post(url, datos))
+            response = self.client.post(url, datos)
+        self.assertRedirects(response, reverse('notas_estudiante', args=[self.estudiante.pk]), fetch_redirect_response=False)
+        self.assertIn('Retry-After', response)
+
+    def iniciar_sesion(self):
+        sesion = self.client.session
+        sesion['estudiante_id'] = self.estudiante.pk
+        sesion.save()
+
+    def test_identidad_se_consulta_una_vez(self):
+        self.iniciar_sesion()
+        # Estudiante con resumen (vista, decorador y plantilla base comparten request.estudiante) + calificaciones
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('notas_estudiante', args=[self.estudiante.pk]))
+        self.assertContains(response, 'Hola, Ana Pérez')
+
+        response = self.client.get(reverse('notas_logout'))
+        self.assertIn('Sesión cerrada. Hasta luego, Ana Pérez!', [str(m) for m in get_messages(response.wsgi_request)])
+
+    def test_estudiante_borrado_da_404(self):
+        self.iniciar_sesion()
+        pk = self.estudiante.pk
+        self.estudiante.delete()
+        self.assertEqual(self.client.get(reverse('notas_estudiante', args=[pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('constancia_pdf', args=[pk])).status_code, 404)
+
+    def test_notas_de_otro_estudiante_redirige(self):
+        sesion = self.client.session
+        sesion['estudiante_id'] = self.estudiante.pk
+        sesion.save()
+        response = self.client.get(reverse('notas_estudiante', args=[self.estudiante.pk + 1]))
+        self.assertRedirects(response, reverse('notas_estudiante', args=[self.estudiante.pk]), fetch_redirect_response=False)
+
+
+@override_settings(LIMITES_PETICIONES={'prueba': [3, 60]})
+class LimitesTest(TestCase):
+    def setUp(self):
+        limpiar_caches()
+
+    def test_ventana_deslizante(self):
+        inicio = 6000.0  # comienzo de una ventana de 60 s
+        resultados = [reservar('prueba', 'ip=1', inicio + i)[0] is not None for i in range(4)]
+        # El intento rechazado no queda contado
+        self.assertEqual(resultados, [True, True, True, False])
+        # Otra identidad no comparte el contador
+        self.assertIsNotNone(reservar('prueba', 'ip=2', inicio + 5)[0])
+        # A mitad de la ventana siguiente los 3 fallos anteriores pesan 1.5
+        self.assertIsNotNone(reservar('prueba', 'ip=1', inicio + 90)[0])
+        self.assertIsNotNone(reservar('prueba', 'ip=1', inicio + 90)[0])
+        reserva, espera = reservar('prueba', 'ip=1', inicio + 90)
+        self.assertIsNone(reserva)
+        self.assertEqual(espera, 31)
+
+    def test_liberar_devuelve_el_intento(self):
+        for _ in range(5):
+            reserva, _ = reservar('prueba', 'ip=1', 6000.0)
+            liberar(reserva)
+        self.assertIsNotNone(reservar('prueba', 'ip=1', 6000.0)[0])
+
+    def test_contadores_en_base_de_datos_sin_cache_atomica(self):
+        # La cache de archivos no incrementa de forma atómica: los fallos van a ContadorIntentos
+        inicio = 6000.0
+        with mock.patch('gestion.limites._atomica', return_value=False):
+            for i in range(3):
+                self.assertIsNotNone(reservar('prueba', 'ip=1', inicio + i)[0])
+            self.assertIsNone(reservar('prueba', 'ip=1', inicio + 3)[0])
+            self.assertEqual(ContadorIntentos.objects.get().intentos, 3)
+            # Dos ventanas después el contador venció y se barre al crear otro
+            reserva, _ = reservar('prueba', 'ip=1', inicio + 130)
+            self.assertIsNotNone(reserva)
+            self.assertEqual(ContadorIntentos.objects.get().intentos, 1)
+            liberar(reserva)
+        self.assertEqual(ContadorIntentos.objects.get().intentos, 0)
+
+    def test_identificador(self):
+        request = mock.Mock(META={'REMOTE_ADDR': '10.0.0.1'}, POST={'matricula': ' a001 '}, session={})
+        self.assertEqual(identificador(request, ('ip', 'matricula')), 'ip=10.0.0.1|matricula=A001')
+        self.assertIsNone(identificador(request, ('estudiante',)))
+
+        request.META['HTTP_X_FORWARDED_FOR'] = '1.2.3.4, 203.0.113.7'
+        with self.settings(LIMITES_PROXIES=1):
+            self.assertEqual(identificador(request, ('ip',)), 'ip=203.0.113.7')
+        self.assertEqual(identificador(request, ('ip',)), 'ip=10.0.0.1')
+
+
+
+@override_settings(LIMITES_ACTIVOS=True, LIMITES_PETICIONES={'prueba': [3, 300]})
+class LimitesConcurrentesTest(TransactionTestCase):
+    HILOS = 12
+
+    def hashes_con_ataque_simultaneo(self) -> int:
+        """Hashes calculados cuando ``HILOS`` logins fallidos de la misma IP llegan a la vez"""
+        hashes = []
+        barrera = threading.Barrier(self.HILOS)
+
+        @limitar('prueba', por=('ip',))
+        def login(request):
+            hashes.append(1)
+            # Los demás hilos llegan mientras este "calcula el hash"
+            time.sleep(0.05)
+            request.intento_fallido = True
+            return HttpResponse()
+
+        def atacar():
+            request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+            barrera.wait()
+            try:
+                login(request)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=atacar) for _ in range(self.HILOS)]
+        with mock.patch('gestion.decorators.messages'):
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        return len(hashes)
+
+    def test_a_lo_sumo_el_limite_llega_al_hash(self):
+        limpiar_caches()
+        self.assertEqual(self.hashes_con_ataque_simultaneo(), 3)
+
+    def test_a_lo_sumo_el_limite_llega_al_hash_en_base_de_datos(self):
+        with mock.patch('gestion.limites._atomica', return_value=False):
+            self.assertEqual(self.hashes_con_ataque_simultaneo(), 3)
+        self.assertEqual(ContadorIntentos.objects.get().intentos, 3)
+
+
+class SesionesTest(TestCase):
+    def setUp(self):
+        limpiar_caches()
+        self.estudiante = Estudiante.objects.create(
+            nombre='Ana', apellido='Pérez', matricula='A001', carrera='Medicina', correo='ana@example.com',
+        )
+
+    def consultas_notas(self, motor: str) -> int:
+        with self.settings(SESSION_ENGINE=f'django.contrib.sessions.backends.{motor}'):
+            # Cliente nuevo: SessionMiddleware fija el motor al crearse
+            cliente = Client()
+            sesion = cliente.session
+            sesion['estudiante_id'] = self.estudiante.pk
+            sesion.save()
+            with CaptureQueriesContext(connection) as contexto:
+                self.assertEqual(cliente.get(reverse('notas_estudiante', args=[self.estudiante.pk])).status_code, 200)
+        return len(contexto.captured_queries)
+
+    def test_sesion_en_cache_evita_la_consulta(self):
+        self.assertEqual(self.consultas_notas('db') - 1, self.consultas_notas('cached_db'))
+
+    def test_limpiar_sesiones_por_lotes(self):
+        ahora = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'vencida{i}', session_data='', expire_date=ahora - timedelta(hours=1)) for i in range(5)]
+            + [Session(session_key=f'vigente{i}', session_data='', expire_date=ahora + timedelta(hours=1)) for i in range(2)]
+        )
+        salida = StringIO()
+        with self.settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db'):
+            call_command('limpiar_sesiones', lote=2, stdout=salida)
+        self.assertIn('Sesiones vencidas borradas: 5', salida.getvalue())
+        self.assertEqual(sorted(Session.objects.values_list('session_key', flat=True)), ['vigente0', 'vigente1'])
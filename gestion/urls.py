@@ -1,11 +1,14 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('notas/login/', views.notas_login, name='notas_login'),
     path('notas/logout/', views.notas_logout, name='notas_logout'),
     path('notas/<int:pk>/', views.notas_estudiante, name='notas_estudiante'),
+    path('notas/<int:pk>/horario/', views.horario_estudiante, name='horario_estudiante'),
+    path('notas/<int:pk>/inscribir/', views.inscribir_asignatura, name='inscribir_asignatura'),
+    path('notas/<int:pk>/constancia.pdf', views.constancia_pdf, name='constancia_pdf'),
     path('notas/<int:pk>/cambiar-clave/', views.cambiar_clave, name='cambiar_clave'),
     # Estudiantes
     path('estudiantes/', views.estudiantes_list, name='estudiantes_list'),
@@ -17,6 +20,15 @@ urlpatterns = [
     path('asignaturas/nuevo/', views.asignaturas_create, name='asignaturas_create'),
     path('asignaturas/<int:pk>/editar/', views.asignaturas_update, name='asignaturas_update'),
     path('asignaturas/<int:pk>/eliminar/', views.asignaturas_delete, name='asignaturas_delete'),
+    # Exportación
+    path('exportar/', views.exportar_calificaciones, name='exportar_calificaciones'),
+    # API JSON de solo lectura
+    path('api/notas/<int:pk>/', api.notas, name='api_notas'),
+    path('api/horario/<int:pk>/', api.horario, name='api_horario'),
+    path('api/asignaturas/', api.asignaturas, name='api_asignaturas'),
+    path('api/horarios/', api.horarios, name='api_horarios'),
+    # Métricas (Prometheus)
+    path('metrics', views.metricas, name='metricas'),
 ]
 
 
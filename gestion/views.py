@@ -1,14 +1,31 @@
+from asgiref.sync import sync_to_async
 from django.contrib import messages
-from django.db.models import Avg, Count, Q
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
-from django.core.cache import cache
-from django.core.paginator import Paginator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from urllib.parse import urlencode
 import logging
 
-from .models import Estudiante, Asignatura, Calificacion
+from .models import MENSAJE_CUPO, Estudiante, Asignatura, Calificacion, ResumenEstudiante, viola_cupo
+from .busqueda import buscar
+from .condicional import (
+    etag_asignaturas, etag_estudiantes, etag_exportacion, etag_notas, modificacion_notas, precargar_version_notas,
+    version_de_notas,
+)
+from .constancias import solicitar_constancia
+from .metricas import registro
+from .horarios import horario_semanal
+from .inscripciones import InscripcionError, inscribir
+from .exportacion import FORMATOS, TIPOS, TIPOS_CONTENIDO, calificaciones_exportables, exportar, nombre_archivo
+from .paginacion import KeysetPaginator
+from .services import facetas_carrera, resumen_desde_calificaciones
 from .forms import EstudianteForm, AsignaturaForm, ConsultaNotasForm, CambiarClaveForm
-from .decorators import admin_required, estudiante_required, estudiante_owner_required
+from .decorators import admin_required, estudiante_required, estudiante_owner_required, limitar
 
 logger = logging.getLogger(__name__)
 
@@ -42,38 +59,38 @@ def dashboard(request):
 
 # Estudiantes CRUD
 @admin_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etag_estudiantes)
 def estudiantes_list(request):
     estudiantes = Estudiante.objects.all()
     
     # Búsqueda
     query = request.GET.get('q', '').strip()
     if query:
-        estudiantes = estudiantes.filter(
-            Q(nombre__icontains=query) |
-            Q(apellido__icontains=query) |
-            Q(matricula__icontains=query) |
-            Q(correo__icontains=query) |
-            Q(carrera__icontains=query)
-        )
+        # Índice de texto (FTS5 / pg_trgm), ordenado por relevancia
+        estudiantes = buscar(estudiantes, query)
     
     # Filtro por carrera
     carrera_filter = request.GET.get('carrera', '').strip()
     if carrera_filter:
         estudiantes = estudiantes.filter(carrera=carrera_filter)
     
-    # Obtener lista de carreras únicas para el filtro
-    carreras = Estudiante.objects.values_list('carrera', flat=True).distinct().order_by('carrera')
+    # Carreras con conteos para el filtro (cacheadas)
+    carreras = facetas_carrera(query)
     
-    # Paginación
-    paginator = Paginator(estudiantes, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginación por cursor (orden natural, o relevancia si hay búsqueda)
+    orden = ['apellido', 'nombre', 'pk']
+    if query:
+        orden.insert(0, '-relevancia')
+    paginator = KeysetPaginator(estudiantes, orden, 15, con_total=True)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     return render(request, 'estudiantes_list.html', {
         'estudiantes': page_obj,
         'query': query,
         'carrera_filter': carrera_filter,
         'carreras': carreras,
+        'filtros': urlencode({k: v for k, v in (('q', query), ('carrera', carrera_filter)) if v}),
     })
 
 
@@ -84,7 +101,6 @@ def estudiantes_create(request):
         if form.is_valid():
             try:
                 form.save()
-                cache.delete('dashboard_stats')
                 messages.success(request, 'Estudiante creado correctamente.')
                 logger.info(f'Estudiante creado por {request.user.username}')
                 return redirect('estudiantes_list')
@@ -106,7 +122,6 @@ def estudiantes_update(request, pk):
         if form.is_valid():
             try:
                 form.save()
-                cache.delete('dashboard_stats')
                 messages.success(request, 'Estudiante actualizado correctamente.')
                 logger.info(f'Estudiante {pk} actualizado por {request.user.username}')
                 return redirect('estudiantes_list')
@@ -135,8 +150,6 @@ def estudiantes_delete(request, pk):
                 return redirect('estudiantes_list')
             
             estudiante.delete()
-            # Invalidar cache del dashboard
-            cache.delete('dashboard_stats')
             messages.success(request, 'Estudiante eliminado correctamente.')
             logger.info(f'Estudiante {pk} eliminado por {request.user.username}')
         except Exception as e:
@@ -148,26 +161,25 @@ def estudiantes_delete(request, pk):
 
 # Asignaturas CRUD
 @admin_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etag_asignaturas)
 def asignaturas_list(request):
     asignaturas = Asignatura.objects.all()
     
     # Búsqueda
     query = request.GET.get('q', '').strip()
     if query:
-        asignaturas = asignaturas.filter(
-            Q(codigo__icontains=query) |
-            Q(nombre__icontains=query) |
-            Q(profesor__icontains=query)
-        )
+        asignaturas = buscar(asignaturas, query)
     
-    # Paginación
-    paginator = Paginator(asignaturas, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginación por cursor
+    orden = ['-relevancia', 'codigo'] if query else ['codigo']
+    paginator = KeysetPaginator(asignaturas, orden, 15, con_total=True)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     return render(request, 'asignaturas_list.html', {
         'asignaturas': page_obj,
         'query': query,
+        'filtros': urlencode({'q': query}) if query else '',
     })
 
 
@@ -178,7 +190,6 @@ def asignaturas_create(request):
         if form.is_valid():
             try:
                 form.save()
-                cache.delete('dashboard_stats')
                 messages.success(request, 'Asignatura creada correctamente.')
                 return redirect('asignaturas_list')
             except Exception as e:
@@ -198,10 +209,18 @@ def asignaturas_update(request, pk):
         form = AsignaturaForm(request.POST, instance=asignatura)
         if form.is_valid():
             try:
-                form.save()
-                cache.delete('dashboard_stats')
+                with transaction.atomic():
+                    form.save()
                 messages.success(request, 'Asignatura actualizada correctamente.')
                 return redirect('asignaturas_list')
+            except IntegrityError as e:
+                if not viola_cupo(e):
+                    logger.error(f'Error actualizando asignatura {pk}: {str(e)}', exc_info=True)
+                    messages.error(request, f'Error al actualizar la asignatura: {str(e)}')
+                else:
+                    # Se inscribieron estudiantes entre la validación y el guardado
+                    form.add_error('cupo', MENSAJE_CUPO)
+                    messages.error(request, 'Corrige los errores del formulario.')
             except Exception as e:
                 logger.error(f'Error actualizando asignatura {pk}: {str(e)}', exc_info=True)
                 messages.error(request, f'Error al actualizar la asignatura: {str(e)}')
@@ -227,7 +246,6 @@ def asignaturas_delete(request, pk):
                 return redirect('asignaturas_list')
             
             asignatura.delete()
-            cache.delete('dashboard_stats')
             messages.success(request, 'Asignatura eliminada correctamente.')
             logger.info(f'Asignatura {pk} eliminada por {request.user.username}')
         except Exception as e:
@@ -237,90 +255,152 @@ def asignaturas_delete(request, pk):
     return render(request, 'confirm_delete.html', {'obj': asignatura, 'back_url': reverse('asignaturas_list')})
 
 
-# Consulta de notas de estudiante (login simple)
-def notas_login(request):
+@admin_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etag_exportacion)
+def exportar_calificaciones(request):
+    """Descarga en streaming de planillas por asignatura o historiales por estudiante"""
+    tipo = request.GET.get('tipo', 'planilla')
+    formato = request.GET.get('formato', 'csv')
+    if tipo not in TIPOS or formato not in FORMATOS:
+        messages.error(request, 'Tipo o formato de exportación no válido.')
+        return redirect('asignaturas_list')
+
+    asignatura = request.GET.get('asignatura', '').strip()
+    carrera = request.GET.get('carrera', '').strip()
+    matricula = request.GET.get('matricula', '').strip()
+    queryset = calificaciones_exportables(tipo, asignatura, carrera, matricula)
+
+    response = StreamingHttpResponse(exportar(tipo, formato, queryset), content_type=TIPOS_CONTENIDO[formato])
+    archivo = nombre_archivo(tipo, formato, asignatura or matricula or carrera)
+    response['Content-Disposition'] = f'attachment; filename="{archivo}"'
+    return response
+
+
+# Consulta de notas de estudiante (login simple).
+# Login y notas son async: bajo ASGI el worker sigue atendiendo otras
+# peticiones mientras se calcula el hash de la clave en el pool de claves.
+@limitar('login_ip', por=('ip',))
+@limitar('login_matricula', por=('matricula',))
+async def notas_login(request):
     if request.method != 'POST':
         return redirect('dashboard')
     
-    # Rate limiting: máximo 5 intentos por IP cada 5 minutos
+    # Los límites de intentos (por IP y por matrícula) reservan un intento antes
+    # de llegar aquí, sin calcular el hash de la clave; solo los fallos lo conservan
     ip = request.META.get('REMOTE_ADDR', 'unknown')
-    cache_key = f'login_attempts_{ip}'
-    attempts = cache.get(cache_key, 0)
-    
-    if attempts >= 5:
-        messages.error(
-            request,
-            'Demasiados intentos fallidos. Por favor, intenta nuevamente en 5 minutos.'
-        )
-        logger.warning(f'Rate limit excedido para IP: {ip}')
-        return redirect('dashboard')
     
     form = ConsultaNotasForm(request.POST)
-    if form.is_valid():
-        estudiante = form.cleaned_data['estudiante']
-        # Limpiar intentos fallidos al éxito
-        cache.delete(cache_key)
-        # Crear sesión para el estudiante
-        request.session['estudiante_id'] = estudiante.pk
-        request.session['estudiante_nombre'] = f"{estudiante.nombre} {estudiante.apellido}"
-        # Configurar timeout de sesión (1 hora)
-        request.session.set_expiry(3600)
+    estudiante = await form.autenticar()
+    if estudiante is not None:
+        # Crear sesión para el estudiante (el nombre se lee de request.estudiante)
+        await request.session.aset('estudiante_id', estudiante.pk)
+        # La sesión vence a la hora por SESSION_COOKIE_AGE: sin guardar la expiración en cada sesión
         messages.success(request, f'Bienvenido, {estudiante.nombre}!')
         logger.info(f'Estudiante {estudiante.pk} ({estudiante.matricula}) inició sesión desde IP: {ip}')
         return redirect('notas_estudiante', pk=estudiante.pk)
     
-    # Incrementar intentos fallidos
-    cache.set(cache_key, attempts + 1, 300)  # 5 minutos
+    request.intento_fallido = True
     messages.error(request, 'Matrícula o contraseña inválidas.')
-    logger.warning(f'Intento de login fallido desde IP: {ip}, intento: {attempts + 1}')
+    logger.warning(f'Intento de login fallido desde IP: {ip}')
     return redirect('dashboard')
 
 
 @estudiante_owner_required
-def notas_estudiante(request, pk):
-    estudiante = get_object_or_404(Estudiante, pk=pk)
-    # Validación adicional: asegurar que el estudiante de la sesión coincide
-    if request.session.get('estudiante_id') != pk:
-        messages.error(request, 'No tienes permiso para acceder a esta información.')
-        estudiante_id = request.session.get('estudiante_id')
-        if estudiante_id:
-            return redirect('notas_estudiante', pk=estudiante_id)
-        return redirect('dashboard')
+@cache_control(private=True, no_cache=True)
+@precargar_version_notas
+@condition(etag_func=etag_notas, last_modified_func=modificacion_notas)
+async def notas_estudiante(request, pk):
+    # Cargado por el decorador junto con su resumen (una sola consulta)
+    estudiante = await request.aestudiante()
     
-    # Solo mostrar las calificaciones del estudiante autenticado
-    calificaciones = Calificacion.objects.filter(estudiante=estudiante).select_related('asignatura').order_by('asignatura__codigo')
-    promedio = calificaciones.aggregate(prom=Avg('nota'))['prom']
-    
-    # Estadísticas adicionales
-    total_asignaturas = calificaciones.count()
-    aprobadas = calificaciones.filter(nota__gte=60).count() if total_asignaturas > 0 else 0
-    reprobadas = total_asignaturas - aprobadas
-    
-    # Calcular créditos totales (suma de créditos de asignaturas calificadas)
-    creditos_totales = sum(cal.asignatura.creditos for cal in calificaciones)
+    # Solo mostrar las calificaciones del estudiante autenticado. La consulta
+    # se evalúa al renderizar, y solo si el fragmento cacheado de la tabla no
+    # está vigente para la versión actual de sus notas.
+    calificaciones = (
+        Calificacion.objects.filter(estudiante_id=pk).select_related('asignatura').order_by('asignatura__codigo')
+    )
+    # El resumen se lee de la tabla desnormalizada; si aún no existe se
+    # calcula en una sola pasada sobre las calificaciones y no se cachea.
+    try:
+        resumen = estudiante.resumen.como_dict()
+    except ResumenEstudiante.DoesNotExist:
+        calificaciones = [calificacion async for calificacion in calificaciones]
+        resumen = resumen_desde_calificaciones(calificaciones)
+        version = None
+    else:
+        # Ya memoizada por precargar_version_notas
+        version = await sync_to_async(version_de_notas)(request)
     
-    return render(
+    # La plantilla base lee request.user, que se carga perezosamente de la
+    # base de datos: se renderiza en un hilo, fuera del event loop.
+    return await sync_to_async(render)(
         request,
         'notas_estudiante.html',
         {
             'estudiante': estudiante,
             'calificaciones': calificaciones,
-            'promedio': promedio,
-            'total_asignaturas': total_asignaturas,
-            'aprobadas': aprobadas,
-            'reprobadas': reprobadas,
-            'creditos_totales': creditos_totales,
+            **resumen,
+            'version_notas': version,
+            'tiempo_fragmento': settings.FRAGMENTOS_TIMEOUT if version else 0,
             'cambiar_clave_form': CambiarClaveForm(estudiante),
         },
     )
 
 
 @estudiante_owner_required
+def horario_estudiante(request, pk):
+    # Índice precalculado por estudiante: en un acierto de cache no hay consultas
+    return render(request, 'horario_estudiante.html', {'estudiante': request.estudiante, **horario_semanal(pk)})
+
+
+@estudiante_owner_required
+def inscribir_asignatura(request, pk):
+    if request.method != 'POST':
+        return redirect('horario_estudiante', pk=pk)
+
+    codigo = request.POST.get('codigo', '').strip()
+    asignatura = Asignatura.objects.filter(codigo__iexact=codigo).only('codigo').first()
+    if asignatura is None:
+        messages.error(request, f'No existe la asignatura {codigo}.')
+        return redirect('horario_estudiante', pk=pk)
+    try:
+        inscribir(pk, asignatura.pk)
+    except InscripcionError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, f'Te inscribiste en {asignatura.codigo}.')
+        logger.info(f'Estudiante {pk} se inscribió en {asignatura.codigo}')
+    return redirect('horario_estudiante', pk=pk)
+
+
+@estudiante_owner_required
+def constancia_pdf(request, pk):
+    estudiante = request.estudiante
+    ruta = solicitar_constancia(estudiante, espera=settings.CONSTANCIAS_ESPERA)
+    if ruta is None:
+        # Se está generando: el navegador reintenta solo
+        response = render(request, 'constancia_pendiente.html', {'estudiante': estudiante}, status=202)
+        response['Retry-After'] = '2'
+        response['Refresh'] = '2'
+        return response
+    return FileResponse(
+        open(ruta, 'rb'),
+        content_type='application/pdf',
+        as_attachment=True,
+        filename=f'constancia_{estudiante.matricula}.pdf',
+    )
+
+
+@estudiante_owner_required
+@limitar('cambiar_clave', por=('estudiante',), destino='notas_estudiante')
 def cambiar_clave(request, pk):
-    estudiante = get_object_or_404(Estudiante, pk=pk)
     if request.method != 'POST':
         return redirect('notas_estudiante', pk=pk)
     
+    # request.estudiante no trae la clave: se carga al verificarla
+    estudiante = request.estudiante
+
     form = CambiarClaveForm(estudiante, request.POST)
     if form.is_valid():
         try:
@@ -334,6 +414,8 @@ def cambiar_clave(request, pk):
             logger.error(f'Error cambiando contraseña estudiante {pk}: {str(e)}', exc_info=True)
             messages.error(request, 'Error al actualizar la contraseña. Intenta nuevamente.')
     else:
+        # Cuenta para el límite: la contraseña actual pudo ser incorrecta
+        request.intento_fallido = True
         messages.error(request, 'Corrige los errores del formulario.')
     
     return redirect('notas_estudiante', pk=pk)
@@ -341,9 +423,19 @@ def cambiar_clave(request, pk):
 
 def notas_logout(request):
     """Cerrar sesión de estudiante"""
-    estudiante_nombre = request.session.get('estudiante_nombre', 'Estudiante')
+    estudiante = request.estudiante
+    estudiante_nombre = f'{estudiante.nombre} {estudiante.apellido}' if estudiante else 'Estudiante'
     request.session.flush()
     messages.success(request, f'Sesión cerrada. Hasta luego, {estudiante_nombre}!')
     return redirect('dashboard')
 
 
+def metricas(request):
+    """Métricas por vista en formato de texto de Prometheus (solo administradores o con token)"""
+    autorizacion = request.headers.get('Authorization', '')
+    con_token = bool(settings.METRICAS_TOKEN) and constant_time_compare(
+        autorizacion, f'Bearer {settings.METRICAS_TOKEN}'
+    )
+    if not con_token and not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponseForbidden('Acceso denegado.')
+    return HttpResponse(registro.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
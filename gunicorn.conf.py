@@ -0,0 +1,22 @@
+"""Configuración de gunicorn (se carga sola al arrancar desde la raíz del proyecto).
+
+SERVIDOR_MODO=wsgi (por defecto): workers sync sobre universidad.wsgi.
+SERVIDOR_MODO=asgi: workers de uvicorn sobre universidad.asgi. Las vistas
+async de login y notas no bloquean al worker mientras se calcula el hash de la
+clave, que corre en un pool de CLAVES_HILOS hilos (ver gestion/hashers.py).
+
+Workers: WEB_CONCURRENCY (por defecto 1, como gunicorn; os.cpu_count() en un
+contenedor cuenta los núcleos del host). Puerto: PORT.
+"""
+import os
+
+modo = os.getenv('SERVIDOR_MODO', 'wsgi')
+if modo == 'asgi':
+    wsgi_app = 'universidad.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+elif modo == 'wsgi':
+    wsgi_app = 'universidad.wsgi:application'
+else:
+    raise RuntimeError(f'SERVIDOR_MODO inválido: {modo} (usa wsgi o asgi)')
+
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
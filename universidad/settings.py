@@ -1,5 +1,8 @@
 from pathlib import Path
+import json
 import os
+import sys
+import tempfile
 import dj_database_url
 from dotenv import load_dotenv
 
@@ -14,10 +17,10 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'demo-secret-key-change-in-prod')
 # Configuración de depuración
 DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
-import os
-
 ALLOWED_HOSTS = [
     'sistema-academico-5nz0.onrender.com',
+    # Hosts adicionales separados por coma (p. ej. 127.0.0.1 para pruebas de carga locales)
+    *filter(None, os.getenv('ALLOWED_HOSTS_EXTRA', '').split(',')),
 ]
 
 
@@ -35,10 +38,13 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Después de WhiteNoise para no medir archivos estáticos
+    'gestion.metricas.MetricasMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'gestion.identidad.EstudianteMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -49,8 +55,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Plantillas compiladas una vez por proceso; en desarrollo el
+            # autoreload de runserver vacía esta cache al editar una plantilla.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -63,6 +76,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'universidad.wsgi.application'
 ASGI_APPLICATION = 'universidad.asgi.application'
+# wsgi | asgi: modo en que corre gunicorn (ver gunicorn.conf.py)
+SERVIDOR_MODO = os.getenv('SERVIDOR_MODO', 'wsgi')
 
 # Configuración de la base de datos
 # Usar SQLite si no existe DATABASE_URL
@@ -72,8 +87,10 @@ if DATABASE_URL:
     DATABASES = {
         'default': dj_database_url.parse(
             DATABASE_URL,
-            conn_max_age=600,
-            ssl_require=True
+            # Bajo ASGI cada petición usa hilos nuevos: las conexiones persistentes no se reutilizarían
+            conn_max_age=0 if SERVIDOR_MODO == 'asgi' else 600,
+            # DATABASE_SSL=False para un PostgreSQL local sin TLS
+            ssl_require=os.getenv('DATABASE_SSL', 'True') == 'True'
         )
     }
 else:
@@ -82,6 +99,15 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Las transacciones toman el candado de escritura al empezar y esperan
+                # a las demás (hasta ``timeout`` s) en lugar de fallar con
+                # "database is locked" a mitad de camino (inscripciones concurrentes)
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            # Archivo y no memoria compartida: las pruebas con hilos escriben en paralelo
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
         }
     }
 
@@ -110,15 +136,110 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# Cache configuration (usando cache en memoria para desarrollo)
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Cache configuration
+# Con varios workers de gunicorn la cache debe ser compartida entre procesos:
+# - REDIS_URL definido: Redis (recomendado en producción)
+# - CACHE_BACKEND=file (por defecto): archivos en CACHE_DIR
+# - CACHE_BACKEND=db: tablas en la base de datos (ejecutar `manage.py createcachetable`)
+# - CACHE_BACKEND=locmem: memoria local de cada proceso (solo desarrollo)
+# Con archivos, base de datos o locmem cada alias tiene su propio espacio y
+# clear() vacía solo ese alias. En Redis todos comparten la misma base (solo
+# cambia KEY_PREFIX): clear() ejecuta FLUSHDB y borra todos los alias.
+# `manage.py test` usa siempre locmem, para no tocar la cache de desarrollo.
+PRUEBAS = len(sys.argv) > 1 and sys.argv[1] == 'test'
+REDIS_URL = os.getenv('REDIS_URL')
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'file')
+CACHE_DIR = Path(os.getenv('CACHE_DIR', BASE_DIR / '.cache'))
+CACHE_ALIASES = ('default', 'ratelimit', 'sessions', 'stats', 'template_fragments')
+
+
+def _cache_config(alias):
+    if PRUEBAS:
+        return {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': alias,
+        }
+    if REDIS_URL:
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': alias,
+        }
+    if CACHE_BACKEND == 'db':
+        return {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': f'cache_{alias}',
+        }
+    if CACHE_BACKEND == 'locmem':
+        return {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': alias,
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(CACHE_DIR / alias),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
+
+
+CACHES = {alias: _cache_config(alias) for alias in CACHE_ALIASES}
+# Segundos que se conservan los fragmentos de plantilla ({% cache %}, alias
+# template_fragments); las claves llevan la versión de los datos que muestran.
+FRAGMENTOS_TIMEOUT = int(os.getenv('FRAGMENTOS_TIMEOUT', '600'))
+
+# Constancias en PDF: caché en disco (debe ser compartida entre workers)
+# y hilos que las generan fuera del ciclo de la petición.
+CONSTANCIAS_DIR = Path(os.getenv(
+    'CONSTANCIAS_DIR',
+    Path(tempfile.gettempdir()) / 'sistema_academico_pruebas' / 'constancias' if PRUEBAS else CACHE_DIR / 'constancias',
+))
+CONSTANCIAS_TRABAJADORES = int(os.getenv('CONSTANCIAS_TRABAJADORES', '2'))
+# Segundos que la vista espera a una constancia nueva antes de responder 202
+CONSTANCIAS_ESPERA = float(os.getenv('CONSTANCIAS_ESPERA', '0.5'))
+
+# Límites de intentos fallidos (ver gestion/limites.py): nombre -> [máximo, ventana en segundos].
+# LIMITES_PETICIONES acepta un JSON para ajustar o agregar límites; LIMITES_ACTIVOS=False
+# los desactiva (p. ej. en pruebas de carga desde una sola IP).
+LIMITES_PETICIONES = {
+    'login_ip': [30, 300],
+    'login_matricula': [5, 300],
+    'cambiar_clave': [5, 300],
+    **json.loads(os.getenv('LIMITES_PETICIONES', '{}')),
 }
+LIMITES_ACTIVOS = os.getenv('LIMITES_ACTIVOS', 'True') == 'True'
+# Proxies confiables delante de la aplicación (0: se usa REMOTE_ADDR). Con 1 o más,
+# la IP del cliente se toma de X-Forwarded-For; sin esto, detrás del proxy todos
+# los clientes comparten la dirección y el límite por IP.
+LIMITES_PROXIES = int(os.getenv('LIMITES_PROXIES', '0'))
+
+# Política de hash de las claves de estudiantes (calibrar con `manage.py calibrar_hash`).
+# CLAVES_ALGORITMO: argon2 | scrypt | pbkdf2_sha256
+# CLAVES_PARAMETROS: JSON con atributos del hasher, p. ej. {"time_cost": 2, "memory_cost": 65536}
+# Las claves con otra política se re-hashean en el siguiente login correcto.
+CLAVES_ALGORITMO = os.getenv('CLAVES_ALGORITMO', 'pbkdf2_sha256')
+CLAVES_PARAMETROS = json.loads(os.getenv('CLAVES_PARAMETROS', '{}'))
+# Hilos que calculan hashes para las vistas async (login); acota la CPU por worker
+CLAVES_HILOS = int(os.getenv('CLAVES_HILOS', os.cpu_count() or 1))
+
+# Token opcional para que Prometheus lea /metrics sin sesión de administrador
+# (cabecera "Authorization: Bearer <token>")
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
 
 # Session configuration
+# SESSION_BACKEND elige dónde viven las sesiones:
+# - cached_db (por defecto): lectura desde la cache 'sessions', escritura en cache y base de datos
+# - cache: solo la cache 'sessions' (requiere Redis u otra cache compartida y persistente)
+# - signed_cookies: el contenido va firmado en la cookie; cerrar sesión no invalida copias robadas
+# - db: base de datos en cada petición (comportamiento anterior)
+# Con db y cached_db, `manage.py limpiar_sesiones` borra las vencidas por lotes.
+MOTORES_SESION = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}
+SESSION_ENGINE = MOTORES_SESION[os.getenv('SESSION_BACKEND', 'cached_db')]
+SESSION_CACHE_ALIAS = 'sessions'
 SESSION_COOKIE_AGE = 3600  # 1 hora
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
@@ -148,6 +269,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        # Una línea JSON por petición; METRICAS_LOG_NIVEL=WARNING para silenciarlas
+        # (por defecto en `manage.py test`, para no tapar la salida de las pruebas)
+        'gestion.metricas': {
+            'level': os.getenv('METRICAS_LOG_NIVEL', 'WARNING' if PRUEBAS else 'INFO'),
+        },
     },
 }
 